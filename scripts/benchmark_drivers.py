@@ -0,0 +1,122 @@
+"""Compare the psycopg2 and psycopg 3 backends of DatabaseProvider on the same workload.
+
+Creates a scratch table, then for each driver times a bulk INSERT (COPY path), a small
+INSERT (executemany) and a per-row UPDATE (executemany) and checks both drivers leave the
+table with identical contents. Usage (from the project root):
+
+    python scripts/benchmark_drivers.py --host localhost --database db --user postgres --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import getpass
+from pathlib import Path
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+
+from src.db.provider import DRIVERS, ConnectionSettings, DatabaseProvider, driver_available  # noqa: E402
+
+TABLE = "importdatadb_driver_benchmark"
+
+
+def build_records(rows: int) -> List[Dict[str, object]]:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "codigo": f"C{idx:08d}",
+            "descricao": f"Produto {idx}",
+            "quantidade": idx % 1000,
+            "preco": Decimal(idx % 10_000) / 100,
+            "ativo": idx % 3 != 0,
+            "cadastro": date(2024, 1, 1) + timedelta(days=idx % 365),
+            "alterado_em": start + timedelta(seconds=idx),
+        }
+        for idx in range(rows)
+    ]
+
+
+def reset_table(provider: DatabaseProvider) -> None:
+    with provider._write_transaction() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS public.{TABLE}"))
+        conn.execute(
+            text(
+                f"CREATE TABLE public.{TABLE} ("
+                "codigo varchar(20) PRIMARY KEY, descricao text, quantidade integer, preco numeric(12,2), "
+                "ativo boolean, cadastro date, alterado_em timestamp)"
+            )
+        )
+    provider.refresh_metadata()
+
+
+def table_checksum(provider: DatabaseProvider) -> str:
+    with provider.engine.connect() as conn:
+        return str(
+            conn.execute(
+                text(f"SELECT md5(string_agg(t::text, '|' ORDER BY codigo)) FROM public.{TABLE} t")
+            ).scalar()
+        )
+
+
+def timed(label: str, func) -> float:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:8.2f}s")
+    return elapsed
+
+
+def run(driver: str, args: argparse.Namespace, password: str) -> str:
+    provider = DatabaseProvider(ConnectionSettings(driver=driver))
+    provider.connect(args.host, args.port, args.database, args.user, password)
+    try:
+        print(f"{driver}:")
+        reset_table(provider)
+        records = build_records(args.rows)
+        timed("INSERT (COPY)", lambda: provider.execute_insert(TABLE, records))
+        small = build_records(args.rows + args.small_rows)[args.rows :]
+        timed(f"INSERT {len(small)} (executemany)", lambda: provider.execute_insert(TABLE, small))
+        updates = [
+            {"codigo": record["codigo"], "quantidade": int(record["quantidade"]) + 1}
+            for record in records[: args.update_rows]
+        ]
+        timed(f"UPDATE {len(updates)} (executemany)", lambda: provider.execute_update(TABLE, updates, "codigo"))
+        return table_checksum(provider)
+    finally:
+        with provider._write_transaction() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS public.{TABLE}"))
+        provider.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--small-rows", type=int, default=400)
+    parser.add_argument("--update-rows", type=int, default=5_000)
+    args = parser.parse_args()
+    password = getpass.getpass("Senha: ")
+
+    checksums: Dict[str, str] = {}
+    for driver in DRIVERS:
+        if not driver_available(driver):
+            print(f"{driver}: não instalado, ignorado")
+            continue
+        checksums[driver] = run(driver, args, password)
+    if len(set(checksums.values())) > 1:
+        print("ATENÇÃO: os drivers gravaram conteúdos diferentes")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+COALESCE_NONE = "none"
+COALESCE_LAST = "last"
+COALESCE_MERGE_NON_NULL = "merge_non_null"
+COALESCE_POLICIES = (COALESCE_NONE, COALESCE_LAST, COALESCE_MERGE_NON_NULL)
+
+
+@dataclass
+class CoalesceStats:
+    input_rows: int = 0
+    output_rows: int = 0
+
+    @property
+    def avoided_writes(self) -> int:
+        return self.input_rows - self.output_rows
+
+
+class RecordCoalescer:
+    """Folds records sharing the same key into one write, in a single streaming pass.
+
+    ``last``: the last occurrence of a key replaces the earlier ones (what sequential UPDATEs
+    would leave in the table). ``merge_non_null``: later non-null values overwrite, nulls keep
+    what earlier rows set. Records can be fed in chunks; memory grows with distinct keys, not
+    rows. Output keeps the order of each key's first occurrence and the Excel row of its last.
+    Records without a key are passed through untouched.
+    """
+
+    def __init__(self, key_column: str, policy: str = COALESCE_LAST) -> None:
+        if policy not in COALESCE_POLICIES:
+            raise ValueError(f"Política de chaves repetidas desconhecida: {policy}")
+        self.key_column = key_column
+        self.policy = policy
+        self.stats = CoalesceStats()
+        self._records: List[Dict[str, object]] = []
+        self._rows: List[int] = []
+        self._positions: Dict[object, int] = {}
+
+    def feed(self, records: Iterable[Dict[str, object]], row_numbers: Optional[Iterable[int]] = None) -> None:
+        rows = iter(row_numbers) if row_numbers is not None else None
+        for record in records:
+            row = next(rows) if rows is not None else self.stats.input_rows + 1
+            self.stats.input_rows += 1
+            key = record.get(self.key_column)
+            position = self._positions.get(key) if key is not None else None
+            if position is None or self.policy == COALESCE_NONE:
+                if key is not None:
+                    self._positions[key] = len(self._records)
+                self._records.append(dict(record))
+                self._rows.append(row)
+                continue
+            if self.policy == COALESCE_LAST:
+                self._records[position] = dict(record)
+            else:
+                merged = self._records[position]
+                for column, value in record.items():
+                    if value is not None:
+                        merged[column] = value
+            self._rows[position] = row
+
+    def result(self) -> Tuple[List[Dict[str, object]], List[int]]:
+        self.stats.output_rows = len(self._records)
+        return self._records, self._rows
+
+
+def coalesce_records(
+    records: Iterable[Dict[str, object]],
+    key_column: str,
+    policy: str = COALESCE_LAST,
+    row_numbers: Optional[Iterable[int]] = None,
+) -> Tuple[List[Dict[str, object]], List[int], CoalesceStats]:
+    coalescer = RecordCoalescer(key_column, policy)
+    coalescer.feed(records, row_numbers)
+    coalesced, rows = coalescer.result()
+    return coalesced, rows, coalescer.stats
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+import heapq
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+import unicodedata
+
+# Same default spirit as pg_trgm's similarity_threshold (0.3), a bit stricter for auto-suggestions.
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_MAX_CANDIDATES = 3
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(value: object) -> Set[str]:
+    """pg_trgm-style trigrams: lowercase, accents removed, each word padded with two spaces before, one after."""
+    text = unicodedata.normalize("NFKD", str(value).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    grams: Set[str] = set()
+    for word in _WORD_RE.findall(text):
+        padded = f"  {word} "
+        grams.update(padded[idx : idx + 3] for idx in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    label: str
+    ident: object
+    score: float
+
+
+class TrigramIndex:
+    """Inverted trigram index over the labels of one lookup table.
+
+    Built once from the ``(id, label)`` pairs; a query only touches the posting lists of its
+    own trigrams, so matching a few hundred values against 100k labels stays interactive.
+    Similarity is the pg_trgm one: shared trigrams / trigrams in either string.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[object, object]]) -> None:
+        self._labels: List[str] = []
+        self._ids: List[object] = []
+        self._sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        seen: Set[str] = set()
+        for ident, label in pairs:
+            if label is None:
+                continue
+            text = str(label).strip()
+            key = text.casefold()
+            if not text or key in seen:
+                continue
+            grams = trigrams(text)
+            if not grams:
+                continue
+            seen.add(key)
+            position = len(self._labels)
+            self._labels.append(text)
+            self._ids.append(ident)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def best_matches(
+        self, value: object, limit: int = FUZZY_MAX_CANDIDATES, threshold: float = FUZZY_MIN_SIMILARITY
+    ) -> List[FuzzyMatch]:
+        grams = trigrams(value)
+        if not grams:
+            return []
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting:
+                shared.update(posting)
+        size = len(grams)
+        scored = (
+            (count / (size + self._sizes[position] - count), position) for position, count in shared.items()
+        )
+        best = heapq.nlargest(limit, (item for item in scored if item[0] >= threshold))
+        return [FuzzyMatch(self._labels[position], self._ids[position], score) for score, position in best]
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.core.lookups import build_lookup_dict
+
+ROW_COLUMN = "linha_excel"
+# Metadata columns written after the key: the database the keys came from and ``exclusive``.
+SOURCE_COLUMN = "__origem"
+EXCLUSIVE_COLUMN = "__exclusiva"
+
+
+@dataclass
+class GeneratedKeyMap:
+    """Excel row -> generated primary key of one INSERT, with the values written for each row.
+
+    Saved as CSV with columns ``linha_excel``, ``<table>.<primary_key>``, ``__origem``,
+    ``__exclusiva`` and the record columns, so a later import can resolve FK descriptions of
+    this table from the file (``lookup_pairs``) instead of querying the database. ``source``
+    is the ``host:port/database`` the keys were generated on; ``exclusive`` means the table had
+    no rows before the insert, so no older row can share a label with the mapped ones.
+    """
+
+    table: str
+    primary_key: str
+    rows: List[int]
+    keys: List[object]
+    records: List[Dict[str, object]] = field(default_factory=list)
+    source: Optional[str] = None
+    exclusive: bool = False
+    _lookup_dicts: Dict[Tuple[str, bool], Tuple[Dict[str, object], List[str]]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @property
+    def key_header(self) -> str:
+        return f"{self.table}.{self.primary_key}"
+
+    def columns(self) -> List[str]:
+        return list(dict.fromkeys(col for record in self.records[:1] for col in record if col != self.primary_key))
+
+    def lookup_pairs(self, label_column: str) -> List[Tuple[object, object]]:
+        return [(key, record.get(label_column)) for key, record in zip(self.keys, self.records)]
+
+    def lookup_dict(self, label_column: str, trim_whitespace: bool = True) -> Tuple[Dict[str, object], List[str]]:
+        """``build_lookup_dict`` of ``lookup_pairs``, built once per label column."""
+        cache_key = (label_column, trim_whitespace)
+        if cache_key not in self._lookup_dicts:
+            self._lookup_dicts[cache_key] = build_lookup_dict(self.lookup_pairs(label_column), trim_whitespace)
+        return self._lookup_dicts[cache_key]
+
+    def to_frame(self) -> pd.DataFrame:
+        columns = self.columns()
+        data: Dict[str, List[object]] = {
+            ROW_COLUMN: list(self.rows),
+            self.key_header: list(self.keys),
+            SOURCE_COLUMN: [self.source] * len(self.rows),
+            EXCLUSIVE_COLUMN: [int(self.exclusive)] * len(self.rows),
+        }
+        for col in columns:
+            data[col] = [record.get(col) for record in self.records]
+        return pd.DataFrame(data, columns=[ROW_COLUMN, self.key_header, SOURCE_COLUMN, EXCLUSIVE_COLUMN, *columns])
+
+    def write_csv(self, path: Path) -> Path:
+        self.to_frame().to_csv(path, index=False)
+        return path
+
+    @classmethod
+    def read_csv(cls, path: Path) -> "GeneratedKeyMap":
+        df = pd.read_csv(path, dtype=object, keep_default_na=False, na_values=[""])
+        headers = list(df.columns)
+        if len(headers) < 2 or headers[0] != ROW_COLUMN or "." not in headers[1]:
+            raise ValueError(f"Arquivo de chaves geradas inválido: esperado '{ROW_COLUMN}, <tabela>.<pk>, ...'")
+        table, primary_key = headers[1].rsplit(".", 1)
+        df = df.astype(object).where(df.notna(), None)
+        source: Optional[str] = None
+        exclusive = False
+        record_columns = headers[2:]
+        if headers[2:4] == [SOURCE_COLUMN, EXCLUSIVE_COLUMN]:
+            record_columns = headers[4:]
+            if len(df.index):
+                source = df[SOURCE_COLUMN].iloc[0]
+                exclusive = str(df[EXCLUSIVE_COLUMN].iloc[0]) == "1"
+        return cls(
+            table=table,
+            primary_key=primary_key,
+            rows=[int(value) for value in df[ROW_COLUMN]],
+            keys=list(df[headers[1]]),
+            records=[dict(zip(record_columns, values)) for values in df[record_columns].itertuples(index=False)],
+            source=source,
+            exclusive=exclusive,
+        )
+
+    def covers(self, label_column: str) -> bool:
+        return bool(self.records) and label_column in self.records[0]
+
+
+def find_key_map(
+    maps: Dict[Tuple[str, str], GeneratedKeyMap],
+    table: str,
+    id_column: str,
+    label_column: str,
+    source: Optional[str],
+) -> Optional[GeneratedKeyMap]:
+    """The map that may answer lookups of ``table`` without the database, if any.
+
+    Only maps generated on ``source`` into a table that was empty (``exclusive``) qualify:
+    otherwise a label could also match an older row, which only the database can tell.
+    """
+    key_map = maps.get((table, id_column))
+    if key_map is None or source is None or key_map.source != source or not key_map.exclusive:
+        return None
+    return key_map if key_map.covers(label_column) else None
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from src.db.provider import LOOKUP_TRIM_WHITESPACE
+
+
+class UnresolvedForeignKeyError(ValueError):
+    """FK descriptions not found in their lookup tables.
+
+    ``missing`` maps each lookup ``(excel_column, table, id_column, label_column)`` to the
+    unresolved sheet values (as written in the sheet -> value looked up after conversions).
+    """
+
+    def __init__(self, message: str, missing: Dict[Tuple[str, str, str, str], Dict[str, str]]) -> None:
+        super().__init__(message)
+        self.missing = missing
+
+
+def normalize_lookup_key(value: object, trim_whitespace: bool = True) -> str:
+    """Key used to match an Excel description against a lookup label.
+
+    Trimmed and lowercased the way targeted lookups do it on the server
+    (``lower(btrim(label))``), so a label fetched by key and one found by a full scan agree.
+    """
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except Exception:
+        # pd.isna may not support the value type; ignore and continue.
+        pass
+    text = str(value)
+    if trim_whitespace:
+        text = text.strip(LOOKUP_TRIM_WHITESPACE)
+    return text.lower()
+
+
+def add_lookup_pairs(
+    cache: Dict[str, object],
+    duplicates: List[str],
+    pairs: Iterable[Tuple[object, object]],
+    trim_whitespace: bool = True,
+) -> None:
+    """Merge ``(id, label)`` pairs into ``cache``, collecting labels that map to several ids."""
+    for ident, label in pairs:
+        normalized = normalize_lookup_key(label, trim_whitespace)
+        if not normalized:
+            continue
+        existing = cache.get(normalized)
+        if existing is None:
+            cache[normalized] = ident
+        elif existing != ident:
+            duplicates.append(str(label))
+
+
+def build_lookup_dict(
+    pairs: Iterable[Tuple[object, object]], trim_whitespace: bool = True
+) -> Tuple[Dict[str, object], List[str]]:
+    cache: Dict[str, object] = {}
+    duplicates: List[str] = []
+    add_lookup_pairs(cache, duplicates, pairs, trim_whitespace)
+    return cache, duplicates
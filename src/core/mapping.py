@@ -4,7 +4,8 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional
 
 
-from src.db.provider import ColumnInfo
+from src.core.coalesce import COALESCE_NONE
+from src.db.provider import COMMIT_ALL, ColumnInfo
 
 
 @dataclass
@@ -14,6 +15,8 @@ class ForeignKeyLookup:
     foreign_table: str
     foreign_id_column: str
     foreign_label_column: str
+    # Labels missing from the foreign table are inserted there instead of failing the import.
+    create_missing: bool = False
 
 
 @dataclass
@@ -40,6 +43,17 @@ class MappingSelection:
     split_operator: Optional[str]
     split_length: Optional[int]
     split_extra_column: Optional[str]
+    parallelism: int = 1
+    commit_mode: str = COMMIT_ALL
+    server_side_validation: bool = False
+    isolate_errors: bool = False
+    fast_bulk_load: bool = False
+    disable_triggers: bool = False
+    coalesce_policy: str = COALESCE_NONE
+    skip_existing_key: Optional[str] = None
+    soft_delete_column: Optional[str] = None
+    soft_deleted_value: Optional[str] = None
+    soft_active_value: Optional[str] = None
 
     def mapped_table_columns(self, columns: List[ColumnInfo]) -> List[str]:
         mapped: List[str] = []
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.core.coalesce import COALESCE_NONE, coalesce_records
+from src.core.key_map import GeneratedKeyMap
+from src.core.mapping import MappingSelection
+from src.db.lookup_cache import LookupCache
+from src.db.provider import DatabaseProvider, RejectedRow, RowRejectionError, database_error_message
+from src.db.staging import find_new_rows, insert_returning_keys
+
+KeyMaps = Dict[Tuple[str, str], GeneratedKeyMap]
+# Builds the records of one mapping (and their Excel rows) with the keys generated so far.
+RecordBuilder = Callable[[MappingSelection, KeyMaps], Tuple[List[Dict[str, object]], List[int]]]
+
+MULTI_TABLE_OPERATIONS = ("INSERT", "UPDATE")
+
+
+def batch_support_error(selection: MappingSelection) -> Optional[str]:
+    """Why ``selection`` cannot run in a batch, or ``None`` when it can."""
+    if selection.operation not in MULTI_TABLE_OPERATIONS:
+        return f"Operação não suportada em lote: {selection.operation}"
+    if selection.server_side_validation:
+        # The batch resolves FKs in memory against the keys of earlier levels; staging would bypass them.
+        return f"Validação no servidor não é suportada em lote ({selection.table_name}); desative a opção."
+    return None
+
+
+@dataclass
+class PreparedTable:
+    selection: MappingSelection
+    records: List[Dict[str, object]]
+    rows: List[int]
+
+
+@dataclass
+class TableJobResult:
+    table: str
+    operation: str
+    affected: int = 0
+    seconds: float = 0.0
+    key_map: Optional[GeneratedKeyMap] = None
+    error: Optional[str] = None
+    skipped: bool = False
+    skipped_existing: int = 0
+    avoided_writes: int = 0
+    rejected: List[RejectedRow] = field(default_factory=list)
+
+
+@dataclass
+class MultiTableReport:
+    levels: List[List[str]] = field(default_factory=list)
+    results: List[TableJobResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(result.error is None and not result.skipped for result in self.results)
+
+    def summary(self) -> str:
+        lines = [f"Ordem: {' -> '.join(' | '.join(level) for level in self.levels)}"]
+        for result in self.results:
+            if result.skipped:
+                lines.append(f"- {result.table}: não executada (falha em tabela anterior)")
+            elif result.error:
+                lines.append(f"- {result.table}: ERRO {result.error}")
+            else:
+                line = f"- {result.table}: {result.operation} {result.affected} registros em {result.seconds:.1f}s"
+                if result.skipped_existing:
+                    line += f", {result.skipped_existing} já existentes ignorados"
+                if result.avoided_writes:
+                    line += f", {result.avoided_writes} gravações evitadas por chaves repetidas"
+                if result.rejected:
+                    line += f", {len(result.rejected)} linhas rejeitadas"
+                lines.append(line)
+        return "\n".join(lines)
+
+
+def dependency_levels(
+    provider: DatabaseProvider, selections: Sequence[MappingSelection], schema: str = "public"
+) -> List[List[MappingSelection]]:
+    """Group mappings in levels: each table comes after the tables it references (FK metadata or lookups)."""
+    by_table: Dict[str, MappingSelection] = {}
+    for selection in selections:
+        if selection.table_name in by_table:
+            raise ValueError(f"A tabela {selection.table_name} aparece em mais de um mapeamento do lote")
+        by_table[selection.table_name] = selection
+    depends: Dict[str, set[str]] = {}
+    for table, selection in by_table.items():
+        metadata = provider.get_table_metadata(table, schema)
+        referenced = {fk.referred_table for fk in (metadata.foreign_keys if metadata else [])}
+        referenced |= {lookup.foreign_table for lookup in selection.fk_lookups}
+        depends[table] = {name for name in referenced if name in by_table and name != table}
+    levels: List[List[MappingSelection]] = []
+    done: set[str] = set()
+    while len(done) < len(by_table):
+        ready = sorted(table for table in by_table if table not in done and depends[table] <= done)
+        if not ready:
+            pending = sorted(table for table in by_table if table not in done)
+            raise ValueError(f"Dependência circular entre as tabelas: {', '.join(pending)}")
+        levels.append([by_table[table] for table in ready])
+        done.update(ready)
+    return levels
+
+
+class MultiTableJob:
+    """Imports several sheet -> table mappings in FK order over one connection pool.
+
+    Tables of the same level do not reference each other and are written concurrently; keys
+    generated by a level are kept in ``key_maps`` so the next levels resolve their FK
+    descriptions in memory, and the ``lookup_cache`` entries of every table a level wrote are
+    dropped so lookups of the next levels see its rows. Each table commits on its own: when a
+    level fails, later levels are skipped and the tables already written stay committed.
+    """
+
+    def __init__(
+        self,
+        provider: DatabaseProvider,
+        selections: Sequence[MappingSelection],
+        schema: str = "public",
+        lookup_cache: Optional[LookupCache] = None,
+    ) -> None:
+        for selection in selections:
+            error = batch_support_error(selection)
+            if error:
+                raise ValueError(error)
+        self.provider = provider
+        self.schema = schema
+        self.lookup_cache = lookup_cache
+        self.levels = dependency_levels(provider, selections, schema)
+        self.key_maps: KeyMaps = {}
+        self.report = MultiTableReport(levels=[[s.table_name for s in level] for level in self.levels])
+
+    def run(
+        self, build_records: RecordBuilder, cancel_checker: Optional[Callable[[], bool]] = None
+    ) -> MultiTableReport:
+        """Headless run: build each level's records, then write the level in parallel."""
+        for level in self.levels:
+            if cancel_checker and cancel_checker():
+                raise RuntimeError("Operação cancelada pelo usuário")
+            prepared = [PreparedTable(s, *build_records(s, self.key_maps)) for s in level]
+            if not self.write_level(prepared):
+                break
+        return self.report
+
+    def write_level(self, prepared: Sequence[PreparedTable]) -> bool:
+        """Write one level concurrently; returns ``False`` (and marks the rest skipped) on failure."""
+        workers = max(1, min(len(prepared), self.provider.max_parallelism()))
+        # Partitioned writes only when a table has the pool to itself, so tables never starve each other.
+        partitioned = workers == 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ImportDataDB-table") as pool:
+            results = list(pool.map(lambda item: self._write(item, partitioned), prepared))
+        if self.lookup_cache is not None:
+            # Failed tables too: partitions may have committed before the error.
+            for item in prepared:
+                self.lookup_cache.invalidate(item.selection.table_name)
+        for result in results:
+            if result.key_map is not None:
+                self.key_maps[(result.key_map.table, result.key_map.primary_key)] = result.key_map
+        self.report.results.extend(results)
+        if any(result.error for result in results):
+            written = {result.table for result in self.report.results}
+            self.report.results.extend(
+                TableJobResult(s.table_name, s.operation, skipped=True)
+                for level in self.levels
+                for s in level
+                if s.table_name not in written
+            )
+            return False
+        return True
+
+    def _write(self, prepared: PreparedTable, partitioned: bool) -> TableJobResult:
+        selection = prepared.selection
+        parallelism = selection.parallelism if partitioned else 1
+        result = TableJobResult(selection.table_name, selection.operation)
+        records, rows = prepared.records, list(prepared.rows)
+        started = time.perf_counter()
+        try:
+            if selection.operation == "UPDATE":
+                if not selection.join_column:
+                    raise ValueError("Selecione uma coluna de junção")
+                if selection.coalesce_policy != COALESCE_NONE:
+                    records, rows, stats = coalesce_records(
+                        records, selection.join_column, selection.coalesce_policy, rows
+                    )
+                    result.avoided_writes = stats.avoided_writes
+                try:
+                    result.affected = self.provider.execute_update(
+                        selection.table_name,
+                        records,
+                        selection.join_column,
+                        self.schema,
+                        parallelism=parallelism,
+                        commit_mode=selection.commit_mode,
+                        row_numbers=rows,
+                        isolate_errors=selection.isolate_errors,
+                    )
+                except RowRejectionError as rejection:
+                    result.affected, result.rejected = rejection.committed, rejection.rejected
+            else:
+                if selection.skip_existing_key:
+                    new_indexes = find_new_rows(
+                        self.provider, selection.table_name, records, [selection.skip_existing_key], self.schema
+                    )
+                    result.skipped_existing = len(records) - len(new_indexes)
+                    records = [records[idx] for idx in new_indexes]
+                    rows = [rows[idx] for idx in new_indexes]
+                # Key maps may replace FK lookups only when no older row can share a label.
+                exclusive = bool(selection.autogenerate_pk and selection.primary_key) and not (
+                    self.provider.table_has_rows(selection.table_name, self.schema)
+                )
+                keys = self._insert(selection, records, rows, parallelism, result)
+                if keys is not None and selection.primary_key:
+                    rejected = {row.index for row in result.rejected}
+                    kept = [idx for idx in range(len(keys)) if idx not in rejected]
+                    result.key_map = GeneratedKeyMap(
+                        selection.table_name,
+                        selection.primary_key,
+                        [rows[idx] for idx in kept],
+                        [keys[idx] for idx in kept],
+                        [records[idx] for idx in kept],
+                        source=self.provider.identity,
+                        exclusive=exclusive,
+                    )
+        except Exception as exc:  # noqa: BLE001
+            result.error = database_error_message(exc)
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _insert(
+        self,
+        selection: MappingSelection,
+        records: List[Dict[str, object]],
+        rows: List[int],
+        parallelism: int,
+        result: TableJobResult,
+    ) -> Optional[List[object]]:
+        """Write ``records`` into ``result`` (affected/rejected rows); returns the generated keys, if any."""
+        table, primary_key = selection.table_name, selection.primary_key
+        if not (selection.autogenerate_pk and primary_key):
+            self._execute_insert(selection, records, rows, None, parallelism, result)
+            return None
+        if self.provider.generated_key_spec(table, primary_key, self.schema):
+            keys = self.provider.allocate_generated_keys(table, primary_key, len(records), self.schema)
+            self._execute_insert(selection, records, rows, keys, parallelism, result)
+            return keys
+        metadata = self.provider.get_table_metadata(table, self.schema)
+        column = metadata.column(primary_key) if metadata else None
+        if column is not None and column.default:
+            keys = insert_returning_keys(
+                self.provider,
+                table,
+                records,
+                primary_key,
+                self.schema,
+                parallelism=parallelism,
+                isolate_errors=selection.isolate_errors,
+                fast_bulk_load=selection.fast_bulk_load,
+                disable_triggers=selection.disable_triggers,
+            )
+            result.affected = len(keys)
+            return keys
+        self._execute_insert(selection, records, rows, None, parallelism, result)
+        return None
+
+    def _execute_insert(
+        self,
+        selection: MappingSelection,
+        records: List[Dict[str, object]],
+        rows: List[int],
+        keys: Optional[List[object]],
+        parallelism: int,
+        result: TableJobResult,
+    ) -> None:
+        try:
+            result.affected = self.provider.execute_insert(
+                selection.table_name,
+                records,
+                self.schema,
+                autogenerate_pk=selection.autogenerate_pk,
+                primary_key=selection.primary_key,
+                parallelism=parallelism,
+                commit_mode=selection.commit_mode,
+                row_numbers=rows,
+                generated_keys=keys,
+                isolate_errors=selection.isolate_errors,
+                fast_bulk_load=selection.fast_bulk_load,
+                disable_triggers=selection.disable_triggers,
+            )
+        except RowRejectionError as rejection:
+            result.affected, result.rejected = rejection.committed, rejection.rejected
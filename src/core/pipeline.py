@@ -0,0 +1,580 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Type, TypeVar
+import unicodedata
+
+import pandas as pd
+
+from src.core.lookups import UnresolvedForeignKeyError, add_lookup_pairs, normalize_lookup_key
+from src.core.mapping import ForeignKeyLookup, MappingSelection
+from src.db.provider import LOOKUP_TRIM_WHITESPACE
+from src.excel.reader import ExcelReader
+
+# Sheet rows per chunk: bounds the frames and record dicts alive at once.
+DEFAULT_CHUNK_ROWS = 10_000
+# Examples listed in error messages that collect problems across the whole sheet.
+ERROR_EXAMPLES = 5
+
+LookupKey = Tuple[str, str, str]
+# Labels wanted per lookup -> normalized label -> id. Raises ValueError for ambiguous labels.
+LookupResolver = Callable[[Dict[LookupKey, Set[str]]], Dict[LookupKey, Dict[str, object]]]
+# Inserts missing labels in the lookup table and returns their ``(id, label)`` pairs.
+# Returns the ``(id, label)`` pairs of the labels and how many of them it actually inserted.
+LabelCreator = Callable[[ForeignKeyLookup, List[str]], Tuple[Iterable[Tuple[object, object]], int]]
+
+S = TypeVar("S", bound="Stage")
+
+
+def _is_missing(value: object) -> bool:
+    if value is None:
+        return True
+    try:
+        return bool(pd.isna(value))
+    except Exception:
+        # pd.isna may not support the value type (or returns an array); treat it as present.
+        return False
+
+
+def is_nullish(value: object) -> bool:
+    return _is_missing(value) or not str(value).strip()
+
+
+def normalize_for_duplicates(value: object) -> str:
+    """Whitespace collapsed, accents removed, casefolded: the key used to detect duplicated rows."""
+    if _is_missing(value):
+        return ""
+    text = " ".join(str(value).split())
+    normalized = unicodedata.normalize("NFKD", text)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return normalized.casefold()
+
+
+def convert_lookup_value(
+    conversions: Dict[str, Dict[str, str]], column: str, value: object, trim_whitespace: bool = True
+) -> object:
+    """Apply the loaded FK conversions (sheet text -> lookup text) of ``column``."""
+    if value is None:
+        return value
+    mapping = conversions.get(column)
+    if not mapping:
+        return value
+    text = str(value)
+    if trim_whitespace:
+        text = text.strip()
+    return mapping.get(text, value)
+
+
+def trim_whitespace(frame: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    for col in columns or list(frame.columns):
+        if col in frame.columns:
+            frame[col] = frame[col].map(lambda value: value.strip() if isinstance(value, str) else value)
+    return frame
+
+
+def replace_values(frame: pd.DataFrame, replacements: Dict[str, Dict[str, str]]) -> pd.DataFrame:
+    for column, mapping in replacements.items():
+        if column not in frame.columns or not mapping:
+            continue
+        frame[column] = frame[column].map(lambda value: mapping.get(value, value) if isinstance(value, str) else value)
+    return frame
+
+
+@dataclass
+class Chunk:
+    """A slice of the sheet moving through the pipeline.
+
+    ``rows`` holds the Excel row of each ``frame`` row. Once ``MapColumns`` has run, ``records``
+    holds one dict per remaining frame row, in the same order.
+    """
+
+    frame: pd.DataFrame
+    rows: List[int]
+    records: List[Dict[str, object]] = field(default_factory=list)
+
+    def keep(self, mask: Sequence[bool]) -> "Chunk":
+        if all(mask):
+            return self
+        records = [record for record, kept in zip(self.records, mask) if kept] if self.records else []
+        return Chunk(self.frame[list(mask)], [row for row, kept in zip(self.rows, mask) if kept], records)
+
+
+class Stage(ABC):
+    """One operator of an ``ImportPipeline``.
+
+    ``process`` turns a chunk into the next one; ``finish`` runs once after the last chunk.
+    Stages without state across chunks can process chunks in any order or concurrently;
+    ``DropDuplicates``, ``ResolveForeignKeys`` and ``ValidateLengths`` must see them in order.
+    """
+
+    @abstractmethod
+    def process(self, chunk: Chunk) -> Chunk:
+        """Transform ``chunk``; may return it mutated or a new (filtered) chunk."""
+
+    def finish(self) -> None:
+        """Stages that collect problems across chunks raise them here."""
+
+
+class TrimWhitespace(Stage):
+    def __init__(self, columns: Optional[Sequence[str]] = None) -> None:
+        self.columns = columns
+
+    def process(self, chunk: Chunk) -> Chunk:
+        trim_whitespace(chunk.frame, self.columns)
+        return chunk
+
+
+class ReplaceValues(Stage):
+    """Similarity replacements: exact sheet text -> chosen text, per column."""
+
+    def __init__(self, replacements: Dict[str, Dict[str, str]]) -> None:
+        self.replacements = replacements
+
+    def process(self, chunk: Chunk) -> Chunk:
+        replace_values(chunk.frame, self.replacements)
+        return chunk
+
+
+class SplitByLength(Stage):
+    """Move values longer (``gt``) or shorter (``lt``) than ``length`` to ``extra_column``.
+
+    When the sheet already has ``extra_column``, ``rename`` provides another name; the name
+    actually used is left in ``extra_column``.
+    """
+
+    def __init__(
+        self,
+        column: str,
+        operator: Optional[str],
+        length: int,
+        extra_column: str,
+        trim_whitespace: bool = False,
+        rename: Optional[Callable[[], str]] = None,
+    ) -> None:
+        self.column = column
+        self.operator = operator
+        self.length = length
+        self.extra_column = extra_column
+        self.trim_whitespace = trim_whitespace
+        self.rename = rename
+        self._checked = False
+
+    def _moves(self, value: object) -> bool:
+        if _is_missing(value):
+            return False
+        text = str(value).strip() if self.trim_whitespace else str(value)
+        if self.operator == "gt":
+            return len(text) > self.length
+        return self.operator == "lt" and len(text) < self.length
+
+    def process(self, chunk: Chunk) -> Chunk:
+        frame = chunk.frame
+        if self.column not in frame.columns:
+            raise ValueError(f"Coluna '{self.column}' não encontrada para separação por tamanho")
+        if not self._checked:
+            self._checked = True
+            if self.extra_column in frame.columns:
+                self.extra_column = self.rename() if self.rename else f"{self.extra_column}_1"
+        values = frame[self.column].tolist()
+        mask = [self._moves(value) for value in values]
+        frame[self.extra_column] = pd.Series(
+            [value if moved else None for value, moved in zip(values, mask)], index=frame.index, dtype=object
+        )
+        frame[self.column] = pd.Series(
+            [None if moved else value for value, moved in zip(values, mask)], index=frame.index, dtype=object
+        )
+        return chunk
+
+
+class DropDuplicates(Stage):
+    """Keep the first row of each normalized ``column`` value, across chunks.
+
+    Only the normalized keys seen so far are kept, not the rows.
+    """
+
+    def __init__(self, column: str) -> None:
+        self.column = column
+        self.total = 0
+        self.kept = 0
+        self._seen: set[str] = set()
+
+    def process(self, chunk: Chunk) -> Chunk:
+        if self.column not in chunk.frame.columns:
+            raise ValueError(f"Coluna '{self.column}' não encontrada para remover duplicados")
+        mask: List[bool] = []
+        for key in chunk.frame[self.column].map(normalize_for_duplicates):
+            mask.append(key not in self._seen)
+            self._seen.add(key)
+        self.total += len(mask)
+        self.kept += sum(mask)
+        return chunk.keep(mask)
+
+
+class MapColumns(Stage):
+    """Build one record per row (sheet column -> table column), skipping rows with every mapped cell empty."""
+
+    def __init__(
+        self,
+        column_mapping: Sequence[Tuple[str, str]],
+        normalize_cell: Callable[[object], object],
+        extra_columns: Sequence[str] = (),
+    ) -> None:
+        self.column_mapping = list(column_mapping)
+        self.normalize_cell = normalize_cell
+        # Columns read by later stages (FK descriptions) that must exist in the sheet as well.
+        self.extra_columns = list(extra_columns)
+        self.skipped_rows = 0
+
+    def process(self, chunk: Chunk) -> Chunk:
+        sources = [sheet_col for sheet_col, _ in self.column_mapping]
+        needed = dict.fromkeys([*sources, *self.extra_columns])
+        missing = [col for col in needed if col not in chunk.frame.columns]
+        if missing:
+            raise ValueError(f"Colunas da planilha não encontradas: {', '.join(missing)}")
+        if not sources:
+            chunk.records = [{} for _ in chunk.rows]
+            return chunk
+        mask = [
+            not all(is_nullish(value) for value in values)
+            for values in chunk.frame[sources].itertuples(index=False, name=None)
+        ]
+        self.skipped_rows += len(mask) - sum(mask)
+        chunk = chunk.keep(mask)
+        targets = [table_col for _, table_col in self.column_mapping]
+        chunk.records = [
+            {target: self.normalize_cell(value) for target, value in zip(targets, values)}
+            for values in chunk.frame[sources].itertuples(index=False, name=None)
+        ]
+        return chunk
+
+
+class ApplyDefaults(Stage):
+    def __init__(self, defaults: Dict[str, object]) -> None:
+        self.defaults = defaults
+
+    def process(self, chunk: Chunk) -> Chunk:
+        for record in chunk.records:
+            for col, value in self.defaults.items():
+                record.setdefault(col, value)
+        return chunk
+
+
+class ResolveForeignKeys(Stage):
+    """Fill FK columns from the descriptions in the sheet.
+
+    Without ``resolver`` the (converted) description itself is written, for server-side
+    resolution. With it, each chunk asks ``resolver`` only for the labels no earlier chunk
+    asked for, and unresolved descriptions are collected and raised by ``finish`` as
+    ``UnresolvedForeignKeyError`` (with ``fail_fast``, at the end of the first chunk that has
+    any, for callers that write each chunk as it comes). Labels of ``create_missing`` lookups
+    are collected across the whole stream and inserted by ``finish`` with one ``create_labels``
+    call per lookup, which then fills the FK column of the records already yielded; nothing is
+    created when other descriptions are unresolved. ``created`` counts the rows it reports as
+    inserted (labels another importer created meanwhile are not counted) per
+    ``table.label_column``.
+    """
+
+    def __init__(
+        self,
+        lookups: Sequence[ForeignKeyLookup],
+        resolver: Optional[LookupResolver] = None,
+        conversions: Optional[Dict[str, Dict[str, str]]] = None,
+        trim_whitespace: bool = True,
+        create_labels: Optional[LabelCreator] = None,
+        fail_fast: bool = False,
+    ) -> None:
+        if create_labels is not None and fail_fast:
+            raise ValueError("Descrições ausentes são criadas ao final da leitura; não combine com fail_fast")
+        self.lookups = list(lookups)
+        self.resolver = resolver
+        self.conversions = conversions or {}
+        self.trim_whitespace = trim_whitespace
+        self.create_labels = create_labels
+        self.fail_fast = fail_fast
+        self.known: Dict[LookupKey, Dict[str, object]] = {}
+        self.created: Dict[str, int] = {}
+        self.missing: Dict[Tuple[str, str, str, str], Dict[str, str]] = {}
+        self._requested: Dict[LookupKey, set[str]] = {}
+        # Labels to create per lookup (normalized -> text) and the record fields waiting for their ids.
+        self._to_create: Dict[LookupKey, Dict[str, str]] = {}
+        self._waiting: List[Tuple[Dict[str, object], ForeignKeyLookup, str]] = []
+        self._unresolved: List[str] = []
+        self._unresolved_count = 0
+
+    @staticmethod
+    def _key(fk: ForeignKeyLookup) -> LookupKey:
+        return (fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column)
+
+    def process(self, chunk: Chunk) -> Chunk:
+        sheet_values = {fk.excel_column: chunk.frame[fk.excel_column].tolist() for fk in self.lookups}
+        converted = {
+            column: [convert_lookup_value(self.conversions, column, value, self.trim_whitespace) for value in values]
+            for column, values in sheet_values.items()
+        }
+        if self.resolver is None:
+            for idx, record in enumerate(chunk.records):
+                for fk in self.lookups:
+                    value = converted[fk.excel_column][idx]
+                    record[fk.target_column] = None if is_nullish(value) else value
+            return chunk
+        normalized = {
+            column: [normalize_lookup_key(value, self.trim_whitespace) for value in values]
+            for column, values in converted.items()
+        }
+        self._resolve(normalized)
+        for idx, (record, excel_row) in enumerate(zip(chunk.records, chunk.rows)):
+            for fk in self.lookups:
+                label = normalized[fk.excel_column][idx]
+                if not label:
+                    self._add_unresolved(
+                        f"Linha {excel_row} coluna '{fk.excel_column}' vazia para preencher {fk.target_column}"
+                    )
+                    continue
+                key = self._key(fk)
+                mapped = self.known.get(key, {}).get(label)
+                if mapped is not None:
+                    record[fk.target_column] = mapped
+                    continue
+                if fk.create_missing and self.create_labels is not None:
+                    text = str(converted[fk.excel_column][idx])
+                    self._to_create.setdefault(key, {}).setdefault(
+                        label, text.strip(LOOKUP_TRIM_WHITESPACE) if self.trim_whitespace else text
+                    )
+                    record[fk.target_column] = None
+                    self._waiting.append((record, fk, label))
+                    continue
+                preview = str(converted[fk.excel_column][idx])
+                sheet_text = str(sheet_values[fk.excel_column][idx])
+                if self.trim_whitespace:
+                    sheet_text = sheet_text.strip()
+                self.missing.setdefault((fk.excel_column, *key), {})[sheet_text] = preview
+                self._add_unresolved(
+                    f"Linha {excel_row}: valor '{preview}' não encontrado em "
+                    f"{fk.foreign_table}.{fk.foreign_label_column} para preencher {fk.target_column}"
+                )
+        if self.fail_fast:
+            self.finish()
+        return chunk
+
+    def _resolve(self, normalized: Dict[str, List[str]]) -> None:
+        wanted: Dict[LookupKey, set[str]] = {}
+        for fk in self.lookups:
+            key = self._key(fk)
+            requested = self._requested.setdefault(key, set())
+            wanted.setdefault(key, set()).update(
+                label for label in normalized[fk.excel_column] if label and label not in requested
+            )
+        wanted = {key: labels for key, labels in wanted.items() if labels}
+        if not wanted:
+            return
+        for key, cache in self.resolver(wanted).items():
+            self.known.setdefault(key, {}).update(cache)
+        for key, labels in wanted.items():
+            self._requested[key] |= labels
+
+    def _create_missing(self) -> None:
+        fks = {self._key(fk): fk for fk in self.lookups if fk.create_missing}
+        for key, labels in self._to_create.items():
+            fk = fks[key]
+            pairs, inserted = self.create_labels(fk, list(labels.values()))
+            add_lookup_pairs(self.known.setdefault(key, {}), [], pairs, self.trim_whitespace)
+            if inserted:
+                name = f"{fk.foreign_table}.{fk.foreign_label_column}"
+                self.created[name] = self.created.get(name, 0) + inserted
+        self._to_create = {}
+        for record, fk, label in self._waiting:
+            mapped = self.known.get(self._key(fk), {}).get(label)
+            if mapped is None:
+                raise ValueError(
+                    f"A descrição '{label}' não foi criada em {fk.foreign_table}.{fk.foreign_label_column}"
+                )
+            record[fk.target_column] = mapped
+        self._waiting = []
+
+    def _add_unresolved(self, message: str) -> None:
+        self._unresolved_count += 1
+        if len(self._unresolved) < ERROR_EXAMPLES:
+            self._unresolved.append(message)
+
+    def finish(self) -> None:
+        if not self._unresolved_count:
+            if self._to_create or self._waiting:
+                self._create_missing()
+            return
+        details = "\n".join(self._unresolved)
+        remaining = self._unresolved_count - len(self._unresolved)
+        if remaining > 0:
+            details += f"\n...mais {remaining} ocorrências sem correspondência."
+        raise UnresolvedForeignKeyError("Não foi possível resolver os relacionamentos FK:\n" + details, self.missing)
+
+
+class DropColumns(Stage):
+    """Remove table columns from the records (e.g. an autogenerated primary key)."""
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        self.columns = list(columns)
+
+    def process(self, chunk: Chunk) -> Chunk:
+        for record in chunk.records:
+            for col in self.columns:
+                record.pop(col, None)
+        return chunk
+
+
+class ValidateLengths(Stage):
+    """Collect values longer than their column's ``max_length``; ``finish`` raises ValueError."""
+
+    def __init__(self, limits: Dict[str, int]) -> None:
+        self.limits = limits
+        self._examples: List[str] = []
+        self._count = 0
+
+    def process(self, chunk: Chunk) -> Chunk:
+        self.check(chunk.records, chunk.rows)
+        return chunk
+
+    def check(self, records: Sequence[Dict[str, object]], rows: Sequence[int]) -> None:
+        for record, excel_row in zip(records, rows):
+            for col_name, max_len in self.limits.items():
+                value = record.get(col_name)
+                if value is None or len(str(value)) <= max_len:
+                    continue
+                self._count += 1
+                if len(self._examples) < ERROR_EXAMPLES:
+                    text_value = str(value)
+                    preview = text_value if len(text_value) <= 40 else f"{text_value[:37]}..."
+                    self._examples.append(
+                        f"Linha {excel_row} coluna '{col_name}': {len(text_value)} > {max_len} "
+                        f"caracteres (valor: {preview})"
+                    )
+
+    def finish(self) -> None:
+        if not self._count:
+            return
+        lines = list(self._examples)
+        remaining = self._count - len(lines)
+        if remaining > 0:
+            lines.append(f"...mais {remaining} ocorrencias com tamanho acima do limite.")
+        raise ValueError("Valores excedem o tamanho permitido para a coluna:\n" + "\n".join(lines))
+
+
+def sheet_chunks(
+    reader: ExcelReader, selection: MappingSelection, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Iterator[Chunk]:
+    for frame in reader.iter_dataframe(
+        selection.sheet_name,
+        selection.header_row,
+        chunk_rows,
+        data_start_row=selection.data_start_row,
+        data_end_row=selection.data_end_row,
+        col_start=selection.start_column,
+        col_end=selection.end_column,
+    ):
+        yield Chunk(frame, [int(row) for row in frame.index])
+
+
+class ImportPipeline:
+    """Sheet -> records as a chain of ``Stage`` operators applied chunk by chunk.
+
+    ``iter_chunks`` streams the transformed chunks (stage ``finish`` checks run after the last
+    one); ``run`` collects every record with its Excel row. ``timings`` accumulates the seconds
+    spent in each stage.
+    """
+
+    def __init__(
+        self,
+        source: Iterable[Chunk],
+        stages: Sequence[Stage],
+        cancel_checker: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.source = source
+        self.stages = list(stages)
+        self.cancel_checker = cancel_checker
+        self.timings: Dict[str, float] = {}
+
+    @classmethod
+    def for_selection(
+        cls,
+        reader: ExcelReader,
+        selection: MappingSelection,
+        resolver: Optional[LookupResolver] = None,
+        conversions: Optional[Dict[str, Dict[str, str]]] = None,
+        fk_trim_whitespace: bool = True,
+        create_labels: Optional[LabelCreator] = None,
+        rename_extra_column: Optional[Callable[[], str]] = None,
+        cancel_checker: Optional[Callable[[], bool]] = None,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        fail_fast: bool = False,
+    ) -> "ImportPipeline":
+        """The stages configured by a mapping; FK descriptions are resolved only with ``resolver``.
+
+        ``fail_fast`` makes FK errors surface with the chunk that has them (see ``ResolveForeignKeys``).
+        """
+        stages: List[Stage] = []
+        if selection.trim_whitespace:
+            stages.append(TrimWhitespace())
+        if selection.similarity_replacements:
+            stages.append(ReplaceValues(selection.similarity_replacements))
+        if selection.split_column and selection.split_length is not None and selection.split_extra_column:
+            stages.append(
+                SplitByLength(
+                    selection.split_column,
+                    selection.split_operator,
+                    selection.split_length,
+                    selection.split_extra_column,
+                    selection.trim_whitespace,
+                    rename_extra_column,
+                )
+            )
+        if selection.remove_duplicate_rows and selection.duplicate_check_column:
+            stages.append(DropDuplicates(selection.duplicate_check_column))
+        autogenerated = selection.primary_key if selection.autogenerate_pk else None
+        stages.append(
+            MapColumns(
+                [(s, t) for s, t in selection.column_mapping if not autogenerated or t != autogenerated],
+                reader._normalize_cell,
+                [fk.excel_column for fk in selection.fk_lookups],
+            )
+        )
+        if selection.default_values:
+            stages.append(ApplyDefaults(selection.default_values))
+        if selection.fk_lookups:
+            stages.append(
+                ResolveForeignKeys(
+                    selection.fk_lookups,
+                    resolver,
+                    conversions,
+                    fk_trim_whitespace,
+                    create_labels if any(fk.create_missing for fk in selection.fk_lookups) else None,
+                    fail_fast,
+                )
+            )
+        if autogenerated:
+            stages.append(DropColumns([autogenerated]))
+        return cls(sheet_chunks(reader, selection, chunk_rows), stages, cancel_checker)
+
+    def stage(self, kind: Type[S]) -> Optional[S]:
+        return next((stage for stage in self.stages if isinstance(stage, kind)), None)
+
+    def iter_chunks(self) -> Iterator[Chunk]:
+        for chunk in self.source:
+            if self.cancel_checker and self.cancel_checker():
+                raise RuntimeError("Operação cancelada pelo usuário")
+            for stage in self.stages:
+                started = time.perf_counter()
+                chunk = stage.process(chunk)
+                name = type(stage).__name__
+                self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+            yield chunk
+        for stage in self.stages:
+            stage.finish()
+
+    def run(self) -> Tuple[List[Dict[str, object]], List[int]]:
+        records: List[Dict[str, object]] = []
+        rows: List[int] = []
+        for chunk in self.iter_chunks():
+            records.extend(chunk.records)
+            rows.extend(chunk.rows)
+        return records, rows
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+from typing import Awaitable, Dict, Iterable, List, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.db.metadata import ColumnInfo, SchemaMetadata, TableMetadata, load_schema_metadata
+from src.db.provider import (
+    ConnectionSettings,
+    LOOKUP_STREAM_BATCH_SIZE,
+    build_lookup_statement,
+    lookup_label_params,
+)
+from src.version import APP_NAME
+
+T = TypeVar("T")
+
+
+def asyncpg_available() -> bool:
+    return importlib.util.find_spec("asyncpg") is not None
+
+
+class AsyncDatabaseProvider:
+    """asyncio counterpart of ``DatabaseProvider`` (SQLAlchemy asyncio + asyncpg).
+
+    Read-only: every call checks out its own pooled connection, so independent metadata
+    queries and targeted lookup fetches can be awaited together with ``gather``. Writes go
+    through ``DatabaseProvider``.
+    """
+
+    def __init__(self, settings: Optional[ConnectionSettings] = None) -> None:
+        self.engine: Optional[AsyncEngine] = None
+        self.settings = settings or ConnectionSettings()
+        self._schemas: Dict[str, SchemaMetadata] = {}
+
+    @property
+    def available(self) -> bool:
+        return asyncpg_available()
+
+    async def connect(self, host: str, port: int, database: str, user: str, password: str) -> None:
+        if not self.available:
+            raise RuntimeError("Driver asyncpg não instalado (pip install asyncpg)")
+        await self.dispose()
+        settings = self.settings
+        server_settings: Dict[str, str] = {"application_name": APP_NAME}
+        if settings.statement_timeout_ms is not None:
+            server_settings["statement_timeout"] = str(int(settings.statement_timeout_ms))
+        if settings.lock_timeout_ms is not None:
+            server_settings["lock_timeout"] = str(int(settings.lock_timeout_ms))
+        url = f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{database}"
+        self.engine = create_async_engine(
+            url,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+            pool_use_lifo=True,
+            connect_args={"timeout": settings.connect_timeout, "server_settings": server_settings},
+        )
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def dispose(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+        self._schemas.clear()
+
+    async def gather(self, *operations: Awaitable[T]) -> List[T]:
+        return list(await asyncio.gather(*operations))
+
+    async def refresh_metadata(self, schema: str = "public") -> SchemaMetadata:
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        async with self.engine.connect() as conn:
+            loaded = await conn.run_sync(load_schema_metadata, schema)
+        self._schemas[schema] = loaded
+        return loaded
+
+    async def _schema(self, schema: str) -> SchemaMetadata:
+        cached = self._schemas.get(schema)
+        if cached is None:
+            cached = await self.refresh_metadata(schema)
+        return cached
+
+    async def list_tables(self, schema: str = "public") -> List[str]:
+        if not self.engine:
+            return []
+        return sorted((await self._schema(schema)).tables, key=str.casefold)
+
+    async def get_table_metadata(self, table_name: str, schema: str = "public") -> Optional[TableMetadata]:
+        if not self.engine:
+            return None
+        metadata = (await self._schema(schema)).tables.get(table_name)
+        if metadata is None:
+            metadata = (await self.refresh_metadata(schema)).tables.get(table_name)
+        return metadata
+
+    async def get_columns(self, table_name: str, schema: str = "public") -> List[ColumnInfo]:
+        table = await self.get_table_metadata(table_name, schema)
+        return list(table.columns) if table else []
+
+    async def fetch_lookup_values(
+        self,
+        table: str,
+        id_column: str,
+        label_column: str,
+        schema: str = "public",
+        labels: Optional[Iterable[str]] = None,
+        trim_whitespace: bool = True,
+    ) -> List[tuple[object, object]]:
+        if not self.engine:
+            return []
+        values: List[tuple[object, object]] = []
+        async with self.engine.connect() as conn:
+            if labels is None:
+                stmt = build_lookup_statement(table, id_column, label_column, schema)
+                result = await conn.stream(stmt.execution_options(yield_per=LOOKUP_STREAM_BATCH_SIZE))
+                async for row in result:
+                    values.append((row[0], row[1]))
+                return values
+            stmt = build_lookup_statement(
+                table, id_column, label_column, schema, targeted=True, trim_whitespace=trim_whitespace
+            )
+            for chunk in lookup_label_params(labels):
+                result = await conn.execute(stmt, {"labels": chunk})
+                values.extend((row[0], row[1]) for row in result)
+        return values
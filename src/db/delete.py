@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.db.provider import COMMIT_ALL, COMMIT_PARTITION, DatabaseProvider
+from src.db.staging import ROW_COLUMN, key_match_condition, stage_key_rows
+
+# Above this many keys, "commit per partition" deletes and commits in chunks of this size.
+DELETE_CHUNK_ROWS = 50_000
+
+
+@dataclass
+class DeleteReport:
+    requested: int
+    matched: int = 0
+    deleted_rows: int = 0
+    unmatched: List[int] = field(default_factory=list)
+    applied: bool = False
+
+    def summary(self) -> str:
+        action = "excluídas" if self.applied else "seriam excluídas"
+        return (
+            f"DELETE: {self.matched} de {self.requested} chaves encontradas | "
+            f"{len(self.unmatched)} não encontradas | {self.deleted_rows} linhas {action}"
+        )
+
+
+class KeyDeleter:
+    """Deletes the rows whose key is listed in the sheet with ``DELETE ... USING`` a staged key table.
+
+    Keys are COPYed into a temp table and joined on the server, one statement per transaction.
+    With ``COMMIT_PARTITION`` and more than ``chunk_size`` keys, each chunk is staged, deleted
+    and committed on its own so locks and WAL stay bounded on very large lists.
+    ``unmatched`` holds the indexes of the records whose key was not found.
+    """
+
+    def __init__(
+        self, provider: DatabaseProvider, schema: str = "public", chunk_size: int = DELETE_CHUNK_ROWS
+    ) -> None:
+        self.provider = provider
+        self.schema = schema
+        self.chunk_size = chunk_size
+
+    def preview(self, table: str, records: List[Dict[str, object]], key_columns: Sequence[str]) -> DeleteReport:
+        self._validate(records, key_columns)
+        report = DeleteReport(requested=len(records))
+        with self.provider._rollback_transaction() as conn:
+            self._delete_chunk(conn, table, records, key_columns, 0, report, apply=False)
+        return report
+
+    def apply(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        key_columns: Sequence[str],
+        commit_mode: str = COMMIT_ALL,
+    ) -> DeleteReport:
+        self._validate(records, key_columns)
+        report = DeleteReport(requested=len(records))
+        chunk_size = self.chunk_size if commit_mode == COMMIT_PARTITION else max(len(records), 1)
+        for offset in range(0, len(records), chunk_size):
+            with self.provider._write_transaction() as conn:
+                self._delete_chunk(
+                    conn, table, records[offset : offset + chunk_size], key_columns, offset, report, apply=True
+                )
+        report.applied = True
+        return report
+
+    def _validate(self, records: List[Dict[str, object]], key_columns: Sequence[str]) -> None:
+        if not self.provider.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        if not key_columns:
+            raise ValueError("Selecione uma coluna de chave")
+        missing = [col for col in key_columns if records and col not in records[0]]
+        if missing:
+            raise ValueError(f"Coluna(s) de chave sem valor nos registros: {', '.join(missing)}")
+
+    def _delete_chunk(
+        self,
+        conn: Connection,
+        table: str,
+        records: Sequence[Dict[str, object]],
+        key_columns: Sequence[str],
+        offset: int,
+        report: DeleteReport,
+        apply: bool,
+    ) -> None:
+        if not records:
+            return
+        target = f"{self.schema}.{table}"
+        match = key_match_condition(key_columns)
+        staged = stage_key_rows(self.provider, conn, table, key_columns, records, self.schema)
+        unmatched = [
+            offset + idx
+            for idx in conn.execute(
+                text(
+                    f"SELECT s.{ROW_COLUMN} FROM {staged} s WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {target} t WHERE {match}) ORDER BY s.{ROW_COLUMN}"
+                )
+            ).scalars()
+        ]
+        report.unmatched.extend(unmatched)
+        report.matched += len(records) - len(unmatched)
+        if apply:
+            result = conn.execute(text(f"DELETE FROM {target} t USING {staged} s WHERE {match}"))
+            report.deleted_rows += max(result.rowcount or 0, 0)
+        else:
+            report.deleted_rows += int(
+                conn.execute(
+                    text(f"SELECT count(*) FROM {target} t WHERE EXISTS (SELECT 1 FROM {staged} s WHERE {match})")
+                ).scalar()
+                or 0
+            )
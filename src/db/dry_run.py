@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.core.coalesce import COALESCE_NONE, coalesce_records
+from src.db.provider import COPY_MIN_ROWS, DatabaseProvider, build_update_statement
+
+DRY_RUN_SAMPLE_ROWS = 500
+# Share of the statement time spent in triggers (FK checks included) worth pointing out.
+TRIGGER_TIME_WARNING_RATIO = 0.5
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+@dataclass
+class DryRunReport:
+    operation: str
+    table: str
+    total_rows: int
+    sample_rows: int
+    sample_seconds: float = 0.0
+    wal_bytes: Optional[int] = None
+    plan_lines: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    execution_ms: Optional[float] = None
+    trigger_ms: float = 0.0
+
+    @property
+    def estimated_seconds(self) -> float:
+        if not self.sample_rows:
+            return 0.0
+        return self.sample_seconds / self.sample_rows * self.total_rows
+
+    @property
+    def estimated_wal_bytes(self) -> Optional[float]:
+        if self.wal_bytes is None or not self.sample_rows:
+            return None
+        return self.wal_bytes / self.sample_rows * self.total_rows
+
+    def summary(self) -> str:
+        lines = [
+            f"Simulação (dry-run) de {self.operation} em {self.table} — transação desfeita ao final",
+            f"Amostra: {self.sample_rows} de {self.total_rows} linhas em {format_duration(self.sample_seconds)}",
+            f"Tempo estimado total (1 conexão): {format_duration(self.estimated_seconds)}",
+        ]
+        estimated_wal = self.estimated_wal_bytes
+        if estimated_wal is not None:
+            lines.append(f"WAL estimado: {format_bytes(estimated_wal)} (amostra: {format_bytes(self.wal_bytes or 0)})")
+        else:
+            lines.append("WAL estimado: indisponível neste servidor")
+        if self.plan_lines:
+            lines.extend(["", "Plano (EXPLAIN ANALYZE, BUFFERS) de uma linha:", *self.plan_lines])
+            if self.execution_ms is not None:
+                lines.append(f"Execução: {self.execution_ms:.2f} ms | Triggers/FKs: {self.trigger_ms:.2f} ms")
+        if self.warnings:
+            lines.extend(["", "Alertas:", *(f"- {warning}" for warning in self.warnings)])
+        return "\n".join(lines)
+
+
+class DryRunner:
+    """Runs the real write on an evenly spread sample inside a transaction that is rolled back.
+
+    One statement is profiled with ``EXPLAIN (ANALYZE, BUFFERS)``, the sample is timed and the
+    WAL position is read before and after to project duration and WAL volume for all rows.
+    INSERTs go through the same writer as ``execute_insert`` (bulk-reserved keys, COPY for
+    large loads); UPDATEs fold repeated keys with ``coalesce_policy`` first, as the import
+    does. The WAL figure includes concurrent activity on the server, and sequence values
+    reserved for the sample are not returned (``nextval`` is not transactional).
+    """
+
+    def __init__(
+        self, provider: DatabaseProvider, schema: str = "public", sample_size: int = DRY_RUN_SAMPLE_ROWS
+    ) -> None:
+        self.provider = provider
+        self.schema = schema
+        self.sample_size = sample_size
+
+    def run(
+        self,
+        operation: str,
+        table: str,
+        records: List[Dict[str, object]],
+        join_column: Optional[str] = None,
+        autogenerate_pk: bool = False,
+        primary_key: Optional[str] = None,
+        coalesce_policy: str = COALESCE_NONE,
+    ) -> DryRunReport:
+        if not self.provider.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        if operation == "UPDATE" and not join_column:
+            raise ValueError("Selecione uma coluna de junção")
+        if operation == "UPDATE" and join_column and coalesce_policy != COALESCE_NONE:
+            # Time and project only the writes the real UPDATE sends after folding repeated keys.
+            records, _, _ = coalesce_records(records, join_column, coalesce_policy)
+        sample = self._sample(records)
+        report = DryRunReport(operation=operation, table=table, total_rows=len(records), sample_rows=len(sample))
+        if not sample:
+            return report
+        if operation == "UPDATE":
+            stmt = build_update_statement(table, list(sample[0].keys()), join_column or "", self.schema)
+            params = sample
+
+            def write(conn: Connection) -> None:
+                conn.execute(stmt, params)
+
+        else:
+            # The writer execute_insert would pick for all the records: reserved keys as plain
+            # values, COPY from COPY_MIN_ROWS rows on.
+            params, columns, overriding = self.provider._prepare_insert_records(
+                table, sample, self.schema, autogenerate_pk, primary_key
+            )
+            stmt = self.provider._insert_statement(table, columns, self.schema, overriding)
+            writer = self.provider._insert_writer(
+                table, columns, self.schema, overriding, len(records) >= COPY_MIN_ROWS
+            )
+
+            def write(conn: Connection) -> None:
+                writer(conn, params)
+
+        with self.provider.engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                self.provider._apply_bulk_settings(conn)
+                self._explain(conn, stmt.text, params[0], report, join_column)
+                wal_before = self._wal_lsn(conn)
+                started = time.perf_counter()
+                write(conn)
+                report.sample_seconds = time.perf_counter() - started
+                wal_after = self._wal_lsn(conn)
+                if wal_before and wal_after:
+                    report.wal_bytes = int(
+                        conn.execute(
+                            text("SELECT pg_wal_lsn_diff(CAST(:after AS pg_lsn), CAST(:before AS pg_lsn))"),
+                            {"after": wal_after, "before": wal_before},
+                        ).scalar()
+                        or 0
+                    )
+            finally:
+                transaction.rollback()
+        return report
+
+    def _sample(self, records: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        if len(records) <= self.sample_size:
+            return list(records)
+        step = len(records) / self.sample_size
+        return [records[int(idx * step)] for idx in range(self.sample_size)]
+
+    def _wal_lsn(self, conn: Connection) -> Optional[str]:
+        savepoint = conn.begin_nested()
+        try:
+            value = conn.execute(text("SELECT pg_current_wal_insert_lsn()::text")).scalar()
+            savepoint.commit()
+            return value
+        except Exception:  # noqa: BLE001
+            # Standbys and restricted roles cannot read the WAL position.
+            savepoint.rollback()
+            return None
+
+    def _explain(
+        self,
+        conn: Connection,
+        sql: str,
+        params: Dict[str, object],
+        report: DryRunReport,
+        join_column: Optional[str],
+    ) -> None:
+        # Profiled row is rolled back so the timed sample runs on the same starting state.
+        savepoint = conn.begin_nested()
+        try:
+            raw = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+        finally:
+            savepoint.rollback()
+        document = json.loads(raw) if isinstance(raw, str) else raw
+        if not document:
+            return
+        root = document[0]
+        report.execution_ms = root.get("Execution Time")
+        report.trigger_ms = sum(float(trigger.get("Time", 0.0)) for trigger in root.get("Triggers", []))
+        self._walk(root.get("Plan", {}), 0, report, join_column)
+        if report.execution_ms and report.trigger_ms / report.execution_ms >= TRIGGER_TIME_WARNING_RATIO:
+            slow = ", ".join(
+                trigger.get("Trigger Name", "?")
+                for trigger in sorted(root.get("Triggers", []), key=lambda t: -float(t.get("Time", 0.0)))[:3]
+            )
+            report.warnings.append(
+                f"Triggers/verificações de FK consomem {report.trigger_ms / report.execution_ms:.0%} "
+                f"do tempo por linha ({slow})."
+            )
+
+    def _walk(self, node: Dict[str, object], depth: int, report: DryRunReport, join_column: Optional[str]) -> None:
+        node_type = str(node.get("Node Type", "?"))
+        relation = node.get("Relation Name")
+        details = [
+            f"linhas={node.get('Actual Rows', '?')}",
+            f"tempo={node.get('Actual Total Time', '?')}ms",
+            f"buffers hit/read={node.get('Shared Hit Blocks', 0)}/{node.get('Shared Read Blocks', 0)}",
+        ]
+        index_name = node.get("Index Name")
+        label = f"{node_type} em {relation}" if relation else node_type
+        if index_name:
+            label += f" usando {index_name}"
+        report.plan_lines.append(f"{'  ' * depth}{label} ({', '.join(details)})")
+        if node_type == "Seq Scan" and relation == report.table and report.operation == "UPDATE":
+            metadata = self.provider.get_table_metadata(report.table, self.schema)
+            size = f" (~{int(metadata.estimated_rows)} linhas)" if metadata and metadata.estimated_rows >= 0 else ""
+            report.warnings.append(
+                f"UPDATE faz Seq Scan em {report.table}{size} para localizar {join_column}: cada linha da "
+                f"planilha percorre a tabela inteira. Crie um índice em {report.table}({join_column})."
+            )
+        for child in node.get("Plans", []) or []:
+            self._walk(child, depth + 1, report, join_column)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from src.db.provider import DatabaseProvider
+from src.version import APP_NAME
+
+LookupKey = Tuple[str, str, str]
+
+VALIDATE_STATS = "stats"
+VALIDATE_XMIN = "xmin"
+VALIDATE_TTL = "ttl"
+
+STATS_TTL_SECONDS = 10 * 60
+# Bumped when the normalized label keys or the entry layout change, so old entries are missed.
+_KEY_FORMAT = 3
+# ``xmin`` validation scans the table; above this many estimated rows (pg_class.reltuples) the
+# scan would cost more than the targeted fetch it guards, so those tables use ``stats``.
+XMIN_MAX_ROWS = 50_000
+
+# Modification counters of pg_stat_user_tables plus the relfilenode (changes on TRUNCATE/
+# VACUUM FULL). Cheap, but approximate: backends flush their counters to the statistics
+# lazily, so a just-committed write may not be visible yet, and after a statistics reset the
+# counters can climb back to a value an old entry was saved with. Either way a stale entry
+# would be hit, so ``stats`` entries are also bounded by ``STATS_TTL_SECONDS``.
+_STATS_SIGNATURE_SQL = """
+SELECT c.relfilenode::text || ':' || coalesce(s.n_tup_ins, 0) || ':' || coalesce(s.n_tup_upd, 0)
+       || ':' || coalesce(s.n_tup_del, 0)
+FROM pg_class c
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE c.oid = to_regclass(:name)
+"""
+
+
+@dataclass
+class LookupCacheEntry:
+    """Normalized label -> id dictionary of one lookup; ``complete`` when the whole table was read.
+
+    Only labels that were found are kept: a label missing from ``values`` is fetched again
+    instead of being reported as absent, since it may have been inserted since.
+    """
+
+    signature: Optional[str]
+    saved_at: float
+    values: Dict[str, object] = field(default_factory=dict)
+    duplicates: List[str] = field(default_factory=list)
+    complete: bool = False
+
+    def covers(self, labels: Set[str]) -> bool:
+        return all(label in self.values for label in labels)
+
+    def unresolved(self, labels: Set[str]) -> Set[str]:
+        return {label for label in labels if label not in self.values}
+
+
+class LookupCache:
+    """On-disk cache of FK lookup dictionaries shared across sessions.
+
+    An entry is reused while it is younger than ``ttl_seconds`` and the table signature is
+    unchanged: ``stats`` (the default) compares ``pg_stat_user_tables`` modification counters
+    (one catalog row), which can lag behind or repeat, so its entries also expire after
+    ``STATS_TTL_SECONDS``; ``xmin`` compares ``count(*)`` + ``max(xmin)``, exact but a scan of
+    the table, so it only applies to tables estimated below ``XMIN_MAX_ROWS`` rows and larger
+    ones fall back to ``stats``; ``ttl`` trusts the age alone.
+    """
+
+    def __init__(
+        self,
+        provider: DatabaseProvider,
+        directory: Optional[Path] = None,
+        ttl_seconds: float = 24 * 3600,
+        validation: str = VALIDATE_STATS,
+        schema: str = "public",
+    ) -> None:
+        if validation not in (VALIDATE_STATS, VALIDATE_XMIN, VALIDATE_TTL):
+            raise ValueError(f"Validação de cache desconhecida: {validation}")
+        self.provider = provider
+        self.directory = directory or Path.home() / f".{APP_NAME.lower()}" / "lookup_cache"
+        self.ttl_seconds = ttl_seconds
+        self.validation = validation
+        self.schema = schema
+        self._lock = threading.Lock()
+
+    def validation_for(self, table: str) -> str:
+        """The validation actually applied to ``table``: ``xmin`` only for tables known to be small."""
+        if self.validation != VALIDATE_XMIN:
+            return self.validation
+        metadata = self.provider.get_table_metadata(table, self.schema)
+        if metadata is None or metadata.estimated_rows < 0 or metadata.estimated_rows > XMIN_MAX_ROWS:
+            return VALIDATE_STATS
+        return VALIDATE_XMIN
+
+    def signature(self, table: str, validation: Optional[str] = None) -> Optional[str]:
+        validation = validation or self.validation_for(table)
+        if validation == VALIDATE_TTL or not self.provider.engine:
+            return None
+        with self.provider.engine.connect() as conn:
+            if validation == VALIDATE_XMIN:
+                value = conn.execute(
+                    text(
+                        f"SELECT count(*) || ':' || coalesce(max(xmin::text::bigint), 0) FROM {self.schema}.{table}"
+                    )
+                ).scalar()
+            else:
+                value = conn.execute(text(_STATS_SIGNATURE_SQL), {"name": f"{self.schema}.{table}"}).scalar()
+        return str(value) if value is not None else None
+
+    def load(self, key: LookupKey, trim_whitespace: bool) -> Tuple[Optional[LookupCacheEntry], Optional[str]]:
+        """Valid cached entry (or ``None``) and the current signature to store a refreshed one with."""
+        validation = self.validation_for(key[0])
+        signature = self.signature(key[0], validation)
+        path = self._path(key, trim_whitespace)
+        if path is None or not path.exists():
+            return None, signature
+        try:
+            with path.open("rb") as handle:
+                entry = pickle.load(handle)
+        except Exception:  # noqa: BLE001
+            # Unreadable or written by an incompatible version: treat as a miss.
+            return None, signature
+        if not isinstance(entry, LookupCacheEntry):
+            return None, signature
+        ttl = min(self.ttl_seconds, STATS_TTL_SECONDS) if validation == VALIDATE_STATS else self.ttl_seconds
+        if time.time() - entry.saved_at > ttl:
+            return None, signature
+        if validation != VALIDATE_TTL and (signature is None or entry.signature != signature):
+            return None, signature
+        return entry, signature
+
+    def store(self, key: LookupKey, trim_whitespace: bool, entry: LookupCacheEntry) -> None:
+        path = self._path(key, trim_whitespace)
+        if path is None:
+            return
+        with self._lock:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                with tmp_path.open("wb") as handle:
+                    pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except OSError:
+                # The cache is an optimization; a read-only or full disk must not fail the import.
+                return
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.directory.exists():
+                for path in self.directory.glob("*.pickle"):
+                    path.unlink(missing_ok=True)
+
+    def invalidate(self, table: str) -> None:
+        """Drop every entry of ``table`` (any id/label columns); call it after writing to the table.
+
+        The ``stats`` signature lags behind just-committed writes, so without this an entry
+        saved before the import would still be hit right after it.
+        """
+        prefix = self._table_prefix(table)
+        if prefix is None:
+            return
+        with self._lock:
+            if self.directory.exists():
+                for path in self.directory.glob(f"{prefix}-*.pickle"):
+                    path.unlink(missing_ok=True)
+
+    def _table_prefix(self, table: str) -> Optional[str]:
+        engine = self.provider.engine
+        if engine is None:
+            return None
+        url = engine.url
+        identity = repr((_KEY_FORMAT, url.host, url.port, url.database, self.schema, table))
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, key: LookupKey, trim_whitespace: bool) -> Optional[Path]:
+        prefix = self._table_prefix(key[0])
+        if prefix is None:
+            return None
+        digest = hashlib.sha1(repr((*key[1:], trim_whitespace)).encode("utf-8")).hexdigest()
+        return self.directory / f"{prefix}-{digest}.pickle"
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    type: str
+    nullable: bool
+    primary_key: bool
+    max_length: Optional[int] = None
+    default: Optional[str] = None
+    identity: bool = False
+
+
+@dataclass
+class ForeignKeyInfo:
+    name: str
+    columns: List[str]
+    referred_schema: str
+    referred_table: str
+    referred_columns: List[str]
+
+
+@dataclass
+class UniqueConstraintInfo:
+    name: str
+    columns: List[str]
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    columns: List[Optional[str]]
+    unique: bool
+    primary: bool
+    method: str
+    definition: str
+    backs_constraint: bool
+    opclasses: List[str] = field(default_factory=list)
+    # False for leftovers of a failed CREATE INDEX CONCURRENTLY (or one still building): the
+    # planner never uses them and ON CONFLICT cannot infer them.
+    valid: bool = True
+
+
+@dataclass
+class TableMetadata:
+    schema: str
+    name: str
+    oid: int
+    estimated_rows: float
+    columns: List[ColumnInfo] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    foreign_keys: List[ForeignKeyInfo] = field(default_factory=list)
+    unique_constraints: List[UniqueConstraintInfo] = field(default_factory=list)
+    indexes: List[IndexInfo] = field(default_factory=list)
+
+    def column(self, name: str) -> Optional[ColumnInfo]:
+        for col in self.columns:
+            if col.name == name:
+                return col
+        return None
+
+
+@dataclass
+class SchemaMetadata:
+    schema: str
+    tables: Dict[str, TableMetadata]
+    signature: Optional[str]
+    loaded_at: float
+    checked_at: float
+    # Table names looked up and not found since the last fingerprint check.
+    missing: Set[str] = field(default_factory=set)
+
+
+_TABLES_SQL = """
+SELECT c.oid, c.relname, c.reltuples
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')
+"""
+
+_COLUMNS_SQL = """
+SELECT a.attrelid,
+       a.attname,
+       format_type(a.atttypid, a.atttypmod) AS type_name,
+       a.attnotnull,
+       CASE WHEN a.atttypid IN (1042, 1043) AND a.atttypmod > 0 THEN a.atttypmod - 4 END AS max_length,
+       pg_get_expr(d.adbin, d.adrelid) AS default_expr,
+       a.attidentity <> '' AS is_identity
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE n.nspname = :schema AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY a.attrelid, a.attnum
+"""
+
+_CONSTRAINTS_SQL = """
+SELECT con.conrelid,
+       con.conname,
+       con.contype,
+       ARRAY(
+           SELECT a.attname
+           FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+           JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+           ORDER BY k.ord
+       ) AS columns,
+       fn.nspname AS referred_schema,
+       fc.relname AS referred_table,
+       ARRAY(
+           SELECT a.attname
+           FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+           JOIN pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+           ORDER BY k.ord
+       ) AS referred_columns
+FROM pg_constraint con
+JOIN pg_class c ON c.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_class fc ON fc.oid = con.confrelid
+LEFT JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+WHERE n.nspname = :schema AND con.contype IN ('p', 'u', 'f')
+ORDER BY con.conrelid, con.conname
+"""
+
+_INDEXES_SQL = """
+SELECT i.indrelid,
+       ic.relname AS index_name,
+       i.indisunique,
+       i.indisprimary,
+       am.amname,
+       pg_get_indexdef(i.indexrelid) AS definition,
+       i.indisvalid AND i.indisready AS valid,
+       EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = i.indexrelid) AS backs_constraint,
+       ARRAY(
+           SELECT a.attname
+           FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+           LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+           ORDER BY k.ord
+       ) AS columns,
+       ARRAY(
+           SELECT opc.opcname
+           FROM unnest(i.indclass::oid[]) WITH ORDINALITY AS k(opcoid, ord)
+           JOIN pg_opclass opc ON opc.oid = k.opcoid
+           ORDER BY k.ord
+       ) AS opclasses
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_am am ON am.oid = ic.relam
+WHERE n.nspname = :schema
+ORDER BY i.indrelid, ic.relname
+"""
+
+# Cheap fingerprint of the catalog rows of a schema. Any DDL (create/drop/alter of tables,
+# columns, indexes or constraints) inserts or updates catalog rows and changes it; pg_index is
+# included because a concurrent index build only flips indisvalid there when it finishes.
+_SIGNATURE_SQL = """
+SELECT concat_ws(
+    '/',
+    (SELECT count(*) || ':' || coalesce(max(c.xmin::text::bigint), 0)
+       FROM pg_class c WHERE c.relnamespace = n.oid),
+    (SELECT count(*) || ':' || coalesce(max(a.xmin::text::bigint), 0)
+       FROM pg_attribute a JOIN pg_class c ON c.oid = a.attrelid
+      WHERE c.relnamespace = n.oid AND c.relkind IN ('r', 'p')),
+    (SELECT count(*) || ':' || coalesce(max(con.xmin::text::bigint), 0)
+       FROM pg_constraint con WHERE con.connamespace = n.oid),
+    (SELECT count(*) || ':' || coalesce(max(i.xmin::text::bigint), 0)
+       FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+      WHERE c.relnamespace = n.oid)
+)
+FROM pg_namespace n
+WHERE n.nspname = :schema
+"""
+
+
+class SchemaMetadataCache:
+    """Caches catalog metadata per schema, loaded with a handful of bulk ``pg_catalog`` queries.
+
+    Entries are reused until ``refresh`` is called or, at most every ``ddl_check_interval``
+    seconds, a one-row catalog fingerprint shows that DDL ran on the schema. A lookup of an
+    unknown table checks the fingerprint right away (the table may have just been created) and
+    the miss is remembered until the next check.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, ddl_check_interval: float = 30.0) -> None:
+        self.engine = engine
+        self.ddl_check_interval = ddl_check_interval
+        self._schemas: Dict[str, SchemaMetadata] = {}
+        self._lock = threading.RLock()
+
+    def bind(self, engine: Optional[Engine]) -> None:
+        with self._lock:
+            self.engine = engine
+            self._schemas.clear()
+
+    def invalidate(self, schema: Optional[str] = None) -> None:
+        with self._lock:
+            if schema is None:
+                self._schemas.clear()
+            else:
+                self._schemas.pop(schema, None)
+
+    def refresh(self, schema: str = "public") -> SchemaMetadata:
+        with self._lock:
+            self._schemas.pop(schema, None)
+            return self.schema(schema)
+
+    def schema(self, schema: str = "public", force_check: bool = False) -> SchemaMetadata:
+        if not self.engine:
+            now = time.monotonic()
+            return SchemaMetadata(schema=schema, tables={}, signature=None, loaded_at=now, checked_at=now)
+        with self._lock:
+            cached = self._schemas.get(schema)
+            now = time.monotonic()
+            if cached is not None and not force_check and now - cached.checked_at < self.ddl_check_interval:
+                return cached
+            with self.engine.connect() as conn:
+                if cached is not None:
+                    signature = schema_signature(conn, schema)
+                    if signature == cached.signature:
+                        cached.checked_at = now
+                        cached.missing.clear()
+                        return cached
+                loaded = load_schema_metadata(conn, schema)
+            self._schemas[schema] = loaded
+            return loaded
+
+    def table(self, table_name: str, schema: str = "public") -> Optional[TableMetadata]:
+        with self._lock:
+            cached = self.schema(schema)
+            metadata = cached.tables.get(table_name)
+            if metadata is not None or not self.engine or table_name in cached.missing:
+                return metadata
+            # Table may have been created after the last load; reload only if the schema changed.
+            current = self.schema(schema, force_check=True)
+            metadata = current.tables.get(table_name)
+            if metadata is None:
+                current.missing.add(table_name)
+            return metadata
+
+
+def schema_signature(conn: Connection, schema: str) -> Optional[str]:
+    value = conn.execute(text(_SIGNATURE_SQL), {"schema": schema}).scalar()
+    return str(value) if value is not None else None
+
+
+def load_schema_metadata(conn: Connection, schema: str) -> SchemaMetadata:
+    """Load every table of ``schema`` with four catalog queries (also usable through ``run_sync``)."""
+    params = {"schema": schema}
+    signature = schema_signature(conn, schema)
+    by_oid: Dict[int, TableMetadata] = {}
+    for oid, name, reltuples in conn.execute(text(_TABLES_SQL), params):
+        by_oid[oid] = TableMetadata(
+            schema=schema,
+            name=name,
+            oid=oid,
+            # reltuples is -1 for tables that were never vacuumed/analyzed (unknown size).
+            estimated_rows=float(reltuples) if reltuples is not None else -1.0,
+        )
+
+    for row in conn.execute(text(_CONSTRAINTS_SQL), params):
+        table = by_oid.get(row.conrelid)
+        if table is None:
+            continue
+        columns = list(row.columns or [])
+        if row.contype == "p":
+            table.primary_key = columns
+        elif row.contype == "u":
+            table.unique_constraints.append(UniqueConstraintInfo(name=row.conname, columns=columns))
+        else:
+            table.foreign_keys.append(
+                ForeignKeyInfo(
+                    name=row.conname,
+                    columns=columns,
+                    referred_schema=row.referred_schema,
+                    referred_table=row.referred_table,
+                    referred_columns=list(row.referred_columns or []),
+                )
+            )
+
+    for row in conn.execute(text(_COLUMNS_SQL), params):
+        table = by_oid.get(row.attrelid)
+        if table is None:
+            continue
+        table.columns.append(
+            ColumnInfo(
+                name=row.attname,
+                type=row.type_name or "",
+                nullable=not row.attnotnull,
+                primary_key=row.attname in table.primary_key,
+                max_length=row.max_length,
+                default=row.default_expr,
+                identity=bool(row.is_identity),
+            )
+        )
+
+    for row in conn.execute(text(_INDEXES_SQL), params):
+        table = by_oid.get(row.indrelid)
+        if table is None:
+            continue
+        table.indexes.append(
+            IndexInfo(
+                name=row.index_name,
+                columns=list(row.columns or []),
+                unique=bool(row.indisunique),
+                primary=bool(row.indisprimary),
+                method=row.amname,
+                definition=row.definition,
+                backs_constraint=bool(row.backs_constraint),
+                opclasses=list(row.opclasses or []),
+                valid=bool(row.valid),
+            )
+        )
+
+    now = time.monotonic()
+    tables = {table.name: table for table in by_oid.values()}
+    return SchemaMetadata(schema=schema, tables=tables, signature=signature, loaded_at=now, checked_at=now)
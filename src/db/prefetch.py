@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from src.db.lookup_cache import LookupCache, LookupCacheEntry, LookupKey
+from src.db.metadata import TableMetadata
+from src.db.provider import DatabaseProvider
+
+
+@dataclass
+class PrefetchedLookup:
+    entry: Optional[LookupCacheEntry]
+    signature: Optional[str]
+    pairs: Optional[List[tuple[object, object]]] = None
+
+
+class LookupPrefetcher:
+    """Fetches FK lookup tables and table metadata on pooled connections in the background.
+
+    Started as soon as the mapping is known, so the downloads overlap with the spreadsheet
+    parse. Small lookup tables (up to ``full_fetch_max_rows`` estimated rows) are downloaded
+    whole; larger ones only get their metadata warmed and are fetched later with the labels
+    the sheet actually uses. With a ``cache``, valid complete entries skip the download.
+    """
+
+    def __init__(
+        self,
+        provider: DatabaseProvider,
+        full_fetch_max_rows: int,
+        schema: str = "public",
+        trim_whitespace: bool = True,
+        cache: Optional[LookupCache] = None,
+    ) -> None:
+        self.provider = provider
+        self.full_fetch_max_rows = full_fetch_max_rows
+        self.schema = schema
+        self.trim_whitespace = trim_whitespace
+        self.cache = cache
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lookups: Dict[LookupKey, Future] = {}
+        self._tables: Dict[str, Future] = {}
+
+    def start(self, lookups: Iterable[LookupKey], tables: Iterable[str] = ()) -> "LookupPrefetcher":
+        if not self.provider.engine:
+            return self
+        keys = list(dict.fromkeys(lookups))
+        table_names = list(dict.fromkeys([*tables, *(key[0] for key in keys)]))
+        if not keys and not table_names:
+            return self
+        workers = max(1, min(len(keys) + len(table_names), self.provider.max_parallelism()))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ImportDataDB-prefetch")
+        for table in table_names:
+            self._tables[table] = self._executor.submit(self.provider.get_table_metadata, table, self.schema)
+        for key in keys:
+            self._lookups[key] = self._executor.submit(self._prefetch, key)
+        return self
+
+    def _prefetch(self, key: LookupKey) -> PrefetchedLookup:
+        entry, signature = self.cache.load(key, self.trim_whitespace) if self.cache else (None, None)
+        if entry is not None and entry.complete:
+            return PrefetchedLookup(entry, signature)
+        return PrefetchedLookup(entry, signature, self._fetch_if_small(key))
+
+    def _fetch_if_small(self, key: LookupKey) -> Optional[List[tuple[object, object]]]:
+        table, id_column, label_column = key
+        metadata = self.provider.get_table_metadata(table, self.schema)
+        estimated_rows = metadata.estimated_rows if metadata else -1
+        if estimated_rows < 0 or estimated_rows > self.full_fetch_max_rows:
+            return None
+        return self.provider.fetch_lookup_values(
+            table, id_column, label_column, self.schema, trim_whitespace=self.trim_whitespace
+        )
+
+    def table_metadata(self, table: str) -> Optional[TableMetadata]:
+        future = self._tables.get(table)
+        if future is None:
+            return self.provider.get_table_metadata(table, self.schema)
+        return future.result()
+
+    def lookup(self, key: LookupKey) -> PrefetchedLookup:
+        """Cached entry and/or whole lookup table (when small enough), waiting if still downloading."""
+        future = self._lookups.get(key)
+        if future is not None:
+            return future.result()
+        if self.cache:
+            return PrefetchedLookup(*self.cache.load(key, self.trim_whitespace))
+        return PrefetchedLookup(None, None)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            # Downloads already running finish on their own; nothing waits for them here.
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,57 +1,553 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from datetime import date, datetime
+from decimal import Decimal
+import importlib.util
+import io
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import uuid
+import zlib
 
-from sqlalchemy import create_engine, inspect, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.elements import TextClause
+
+from src.db.metadata import ColumnInfo, SchemaMetadataCache, TableMetadata
+from src.version import APP_NAME
+
+# Whitespace trimmed from lookup labels that commonly shows up in spreadsheets (incl. NBSP).
+# The Python side strips exactly these characters so its keys match the server's btrim().
+LOOKUP_TRIM_WHITESPACE = " \t\n\r\xa0"
+_LOOKUP_TRIM_CHARS = " || ".join(f"chr({ord(char)})" for char in LOOKUP_TRIM_WHITESPACE)
+LOOKUP_LABELS_PER_QUERY = 10_000
+LOOKUP_STREAM_BATCH_SIZE = 20_000
+
+# Commit semantics for parallel writes.
+COMMIT_ALL = "all"
+COMMIT_PARTITION = "partition"
+PARALLEL_MIN_ROWS_PER_PARTITION = 1_000
+
+# INSERTs of at least this many plain-value rows go through COPY.
+COPY_MIN_ROWS = 500
+COPY_BATCH_ROWS = 50_000
+# Rows inserted (and rolled back) with the indexes in place to estimate fast bulk load savings.
+BULK_CALIBRATION_ROWS = 2_000
+# ALTER TABLE clause restoring each pg_trigger.tgenabled mode (origin, replica, always).
+_TRIGGER_ENABLE_CLAUSES = {"O": "ENABLE", "R": "ENABLE REPLICA", "A": "ENABLE ALWAYS"}
+# Below this many rows a sequential scan per UPDATE is cheap enough not to suggest an index.
+JOIN_INDEX_MIN_TABLE_ROWS = 10_000
+TEMP_INDEX_PREFIX = "importdatadb_tmp_"
+
+DRIVER_PSYCOPG2 = "psycopg2"
+DRIVER_PSYCOPG = "psycopg"
+DRIVERS = (DRIVER_PSYCOPG2, DRIVER_PSYCOPG)
+
+# Python types accepted per column type for binary COPY (psycopg 3). Anything else, e.g. a
+# spreadsheet string going into a numeric column, falls back to text COPY, where the server
+# parses the value exactly like on the psycopg2 path.
+_BINARY_COPY_TYPES: Dict[str, tuple] = {
+    "int2": (int,),
+    "int4": (int,),
+    "int8": (int,),
+    "float4": (float,),
+    "float8": (float,),
+    "numeric": (Decimal,),
+    "text": (str,),
+    "varchar": (str,),
+    "bpchar": (str,),
+    "bool": (bool,),
+    "date": (date,),
+    "timestamp": (datetime,),
+    "timestamptz": (datetime,),
+    "uuid": (uuid.UUID,),
+}
+
+_NEXTVAL_RE = re.compile(r"nextval\('([^']+)'(?:::regclass)?\)")
+
+
+@dataclass(frozen=True)
+class GeneratedKeySpec:
+    column: str
+    sequence: str
+    # Zero-padded text keys (LPAD semantics: padded, then cut to ``width``).
+    width: Optional[int] = None
+    identity: bool = False
+
+    def format(self, value: int) -> object:
+        if self.width is None:
+            return value
+        return str(value).rjust(self.width, "0")[: self.width]
+
+
+APP_MANAGED_KEYS: Dict[tuple[str, str, str], GeneratedKeySpec] = {
+    ("public", "estoque", "codigo_fixo"): GeneratedKeySpec(
+        column="codigo_fixo", sequence="public.codigo_fixo_estoque_seq", width=5
+    ),
+}
+
+
+def attach_generated_keys(
+    records: List[Dict[str, object]], primary_key: str, keys: Sequence[object]
+) -> List[Dict[str, object]]:
+    if len(keys) != len(records):
+        raise ValueError(f"Quantidade de chaves geradas ({len(keys)}) difere dos registros ({len(records)}).")
+    return [
+        {primary_key: key, **{k: v for k, v in record.items() if k != primary_key}}
+        for key, record in zip(keys, records)
+    ]
+
+
+def driver_available(driver: str) -> bool:
+    return importlib.util.find_spec(driver) is not None
+
+
+def binary_copy_accepts(type_name: str, value: object) -> bool:
+    if value is None:
+        return True
+    accepted = _BINARY_COPY_TYPES.get(type_name)
+    if not accepted or (isinstance(value, bool) and bool not in accepted):
+        return False
+    if type_name == "date" and isinstance(value, datetime):
+        return False
+    return isinstance(value, accepted)
+
+
+def copy_text_value(value: object) -> str:
+    """Encode a value for COPY ... FROM STDIN in text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        text_value = value.isoformat(sep=" ")
+    elif isinstance(value, date):
+        text_value = value.isoformat()
+    else:
+        text_value = str(value)
+    return (
+        text_value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def partition_key_text(value: object) -> str:
+    """Text a partition key value is hashed by.
+
+    Values the database compares as equal (``5``, ``'5'``, ``5.0``, ``Decimal('5.00')``) give
+    the same text. Strings are also trimmed and casefolded: that can only put distinct keys in
+    one partition, never split equal ones.
+    """
+    if value is None:
+        return ""
+    text_value = str(value).strip()
+    try:
+        number = Decimal(text_value)
+    except (ArithmeticError, ValueError):
+        return text_value.casefold()
+    if not number.is_finite():
+        return text_value.casefold()
+    return str(number.normalize())
+
+
+def _quote_identifier(name: str) -> str:
+    """Quote a catalog name (e.g. a trigger's ``tgname``) for use in DDL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def build_update_statement(table: str, columns: List[str], join_column: str, schema: str = "public") -> TextClause:
+    set_clause = ", ".join(f"{col} = :{col}" for col in columns if col != join_column)
+    return text(f"UPDATE {schema}.{table} SET {set_clause} WHERE {join_column} = :{join_column}")
+
+
+def build_lookup_statement(
+    table: str,
+    id_column: str,
+    label_column: str,
+    schema: str = "public",
+    targeted: bool = False,
+    trim_whitespace: bool = True,
+) -> TextClause:
+    """SELECT of ``(id, label)``; targeted statements take normalized labels in ``:labels``."""
+    sql = f"SELECT {id_column} AS id, {label_column} AS label FROM {schema}.{table}"
+    if targeted:
+        sql += f" WHERE {lookup_key_sql(label_column, trim_whitespace)} = ANY(:labels)"
+    return text(sql)
+
+
+def lookup_key_sql(expr: str, trim_whitespace: bool = True) -> str:
+    """SQL equivalent of ``normalize_lookup_key`` applied to the column or expression ``expr``."""
+    key = f"{expr}::text"
+    if trim_whitespace:
+        key = f"btrim({key}, {_LOOKUP_TRIM_CHARS})"
+    return f"lower({key})"
+
+
+def lookup_label_params(labels: Iterable[str]) -> List[List[str]]:
+    """Chunks of labels for targeted lookups.
+
+    ``labels`` are keys of ``normalize_lookup_key``, which folds with ``str.lower()`` like the
+    server's ``lower()``; ``str.casefold()`` would turn e.g. ``ß`` into ``ss`` and miss rows.
+    """
+    wanted = sorted({label for label in labels if label})
+    return [wanted[start : start + LOOKUP_LABELS_PER_QUERY] for start in range(0, len(wanted), LOOKUP_LABELS_PER_QUERY)]
+
+
+@dataclass
+class ConnectionSettings:
+    """Pool and session tuning applied by ``DatabaseProvider.connect``."""
+
+    # psycopg2 or psycopg (3): the latter pipelines executemany and uses binary COPY.
+    driver: str = DRIVER_PSYCOPG2
+    # psycopg 3 only: statements run this many times on a connection become server-side prepared.
+    prepare_threshold: Optional[int] = 5
+    pool_size: int = 5
+    max_overflow: int = 5
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    connect_timeout: int = 10
+    # TCP keepalives keep idle VPN connections from being silently dropped.
+    keepalives_idle: int = 60
+    statement_timeout_ms: Optional[int] = None
+    lock_timeout_ms: Optional[int] = 60_000
+    warm_up_connections: int = 2
+    # Applied with SET LOCAL only inside write transactions (INSERT/UPDATE). synchronous_commit
+    # stays at the server setting unless explicitly opted in: "off" can lose the last
+    # acknowledged commits if the server crashes.
+    bulk_synchronous_commit: Optional[str] = None
+    bulk_work_mem: Optional[str] = "64MB"
+
+
+@dataclass
+class PoolHealth:
+    connected: bool
+    pool_size: int = 0
+    checked_out: int = 0
+    checked_in: int = 0
+    overflow: int = 0
+    latency_ms: Optional[float] = None
+    server_version: Optional[str] = None
+    error: Optional[str] = None
+
+    def summary(self) -> str:
+        if not self.connected:
+            return f"Sem conexão ({self.error})" if self.error else "Sem conexão"
+        latency = f"{self.latency_ms:.0f} ms" if self.latency_ms is not None else "--"
+        return (
+            f"pool {self.checked_in + self.checked_out}/{self.pool_size} "
+            f"(em uso {self.checked_out}, overflow {max(self.overflow, 0)}) | latência {latency}"
+        )
+
+
+@dataclass
+class PartitionError:
+    partition: int
+    first_index: int
+    rows: List[int]
+    message: str
+
+    def describe(self) -> str:
+        if len(self.rows) == 1:
+            location = f"linha {self.rows[0]}"
+        else:
+            location = f"linhas {min(self.rows)}-{max(self.rows)} ({len(self.rows)} registros)"
+        return f"Partição {self.partition + 1}, {location}: {self.message}"
+
+
+class ParallelWriteError(RuntimeError):
+    def __init__(self, errors: List[PartitionError], committed: int) -> None:
+        self.errors = errors
+        self.committed = committed
+        lines = [error.describe() for error in errors[:5]]
+        if len(errors) > 5:
+            lines.append(f"...mais {len(errors) - 5} partições com erro.")
+        super().__init__(
+            f"Falha na gravação paralela ({committed} registros gravados):\n" + "\n".join(lines)
+        )
+
+
+class BlockingIndexBuildError(RuntimeError):
+    """CREATE INDEX CONCURRENTLY failed; a regular build would block writes to the table."""
+
+    def __init__(self, table: str, column: str, reason: str) -> None:
+        self.table = table
+        self.column = column
+        super().__init__(
+            f"Não foi possível criar o índice em {table}.{column} sem bloquear a tabela (CONCURRENTLY): {reason}"
+        )
 
 
 @dataclass
-class ColumnInfo:
-    name: str
-    type: str
-    nullable: bool
-    primary_key: bool
-    max_length: Optional[int] = None
+class RejectedRow:
+    index: int
+    row: int
+    record: Dict[str, object]
+    message: str
+
+    def describe(self) -> str:
+        return f"Linha {self.row}: {self.message}"
+
+
+class RowRejectionError(RuntimeError):
+    """Raised after the accepted rows were committed, listing the rows the database rejected."""
+
+    def __init__(self, rejected: List[RejectedRow], committed: int) -> None:
+        self.rejected = rejected
+        self.committed = committed
+        lines = [row.describe() for row in rejected[:5]]
+        if len(rejected) > 5:
+            lines.append(f"...mais {len(rejected) - 5} linhas rejeitadas.")
+        super().__init__(
+            f"{len(rejected)} linhas rejeitadas ({committed} registros gravados):\n" + "\n".join(lines)
+        )
+
+
+def database_error_message(exc: BaseException) -> str:
+    """Driver message of ``exc`` (without the SQL/parameters SQLAlchemy appends) on one line."""
+    original = getattr(exc, "orig", None) or exc
+    lines = [line.strip() for line in str(original).splitlines() if line.strip()]
+    return " | ".join(lines) or exc.__class__.__name__
+
+
+@dataclass
+class CreatedLookupLabels:
+    """Result of ``insert_lookup_labels``: every requested label's ``(id, label)`` pair and how many were new."""
+
+    pairs: List[tuple[object, object]]
+    inserted: int = 0
+
+
+@dataclass
+class BulkLoadReport:
+    rows: int
+    dropped_indexes: List[str]
+    disabled_triggers: int = 0
+    load_seconds: float = 0.0
+    rebuild_seconds: float = 0.0
+    analyze_seconds: float = 0.0
+    estimated_indexed_seconds: Optional[float] = None
+
+    @property
+    def saved_seconds(self) -> Optional[float]:
+        """Calibrated insert time with indexes minus the actual load + rebuild time."""
+        if self.estimated_indexed_seconds is None:
+            return None
+        return self.estimated_indexed_seconds - (self.load_seconds + self.rebuild_seconds)
+
+    def summary(self) -> str:
+        lines = [
+            f"Carga rápida: {self.rows} registros em {self.load_seconds:.1f}s",
+            f"Índices recriados: {len(self.dropped_indexes)} em {self.rebuild_seconds:.1f}s"
+            f" | ANALYZE: {self.analyze_seconds:.1f}s",
+        ]
+        if self.disabled_triggers:
+            lines.append(f"Triggers desativados durante a carga: {self.disabled_triggers}")
+        saved = self.saved_seconds
+        if saved is not None:
+            lines.append(
+                f"Tempo estimado com índices: {self.estimated_indexed_seconds:.1f}s (economia estimada: {saved:.1f}s)"
+            )
+        return "\n".join(lines)
+
+
+@dataclass
+class JoinIndexAdvice:
+    table: str
+    column: str
+    index_name: Optional[str]
+    estimated_rows: float
+    update_rows: int
+
+    @property
+    def indexed(self) -> bool:
+        return self.index_name is not None
+
+    @property
+    def scanned_rows(self) -> float:
+        """Rows read by the UPDATEs: a full scan per statement without index, ~1 with one."""
+        if self.indexed or self.estimated_rows < 0:
+            return float(self.update_rows)
+        return self.estimated_rows * self.update_rows
+
+    @property
+    def recommend_index(self) -> bool:
+        return not self.indexed and (self.estimated_rows < 0 or self.estimated_rows >= JOIN_INDEX_MIN_TABLE_ROWS)
+
+    def describe(self) -> str:
+        if self.indexed:
+            return f"{self.table}.{self.column} usa o índice {self.index_name}."
+        size = f"~{int(self.estimated_rows)}" if self.estimated_rows >= 0 else "tamanho desconhecido de"
+        return (
+            f"{self.table}.{self.column} não tem índice: cada um dos {self.update_rows} UPDATEs percorre "
+            f"{size} linhas (~{int(self.scanned_rows)} linhas lidas no total)."
+        )
 
 
 class DatabaseProvider:
-    def __init__(self) -> None:
+    def __init__(self, settings: Optional[ConnectionSettings] = None) -> None:
         self.engine: Optional[Engine] = None
+        self.settings = settings or ConnectionSettings()
+        self.metadata = SchemaMetadataCache()
+        self.last_bulk_load: Optional[BulkLoadReport] = None
 
     def connect(self, host: str, port: int, database: str, user: str, password: str) -> None:
-        url = f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
-        self.engine = create_engine(url, future=True)
+        settings = self.settings
+        if settings.driver not in DRIVERS:
+            raise ValueError(f"Driver desconhecido: {settings.driver}")
+        if not driver_available(settings.driver):
+            raise RuntimeError(f"Driver {settings.driver} não instalado (pip install {settings.driver})")
+        url = f"postgresql+{settings.driver}://{user}:{password}@{host}:{port}/{database}"
+        self.dispose()
+        self.engine = create_engine(
+            url,
+            future=True,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+            pool_pre_ping=settings.pool_pre_ping,
+            pool_use_lifo=True,
+            connect_args=self._connect_args(),
+        )
         # quick test connection
         with self.engine.connect() as conn:
             conn.execute(text("SELECT 1"))
+        self.metadata.bind(self.engine)
+        self.warm_up()
+
+    def _connect_args(self) -> Dict[str, object]:
+        settings = self.settings
+        options: List[str] = []
+        if settings.statement_timeout_ms is not None:
+            options.append(f"-c statement_timeout={int(settings.statement_timeout_ms)}")
+        if settings.lock_timeout_ms is not None:
+            options.append(f"-c lock_timeout={int(settings.lock_timeout_ms)}")
+        args: Dict[str, object] = {
+            "application_name": APP_NAME,
+            "connect_timeout": settings.connect_timeout,
+            "keepalives": 1,
+            "keepalives_idle": settings.keepalives_idle,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+        }
+        if options:
+            args["options"] = " ".join(options)
+        if settings.driver == DRIVER_PSYCOPG:
+            args["prepare_threshold"] = settings.prepare_threshold
+        return args
+
+    def dispose(self) -> None:
+        if self.engine is not None:
+            self.engine.dispose()
+            self.engine = None
+        self.metadata.bind(None)
+
+    def warm_up(self, connections: Optional[int] = None) -> int:
+        """Open pooled connections up front so the first operations do not pay the handshake."""
+        if not self.engine:
+            return 0
+        target = connections if connections is not None else self.settings.warm_up_connections
+        target = max(0, min(target, self.settings.pool_size))
+        opened: List[Connection] = []
+        try:
+            for _ in range(target):
+                conn = self.engine.connect()
+                opened.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            for conn in opened:
+                conn.close()
+        return len(opened)
+
+    def health(self) -> PoolHealth:
+        if not self.engine:
+            return PoolHealth(connected=False)
+        pool = self.engine.pool
+        try:
+            started = time.perf_counter()
+            with self.engine.connect() as conn:
+                server_version = conn.execute(text("SHOW server_version")).scalar()
+            latency_ms = (time.perf_counter() - started) * 1000
+        except Exception as exc:  # noqa: BLE001
+            return PoolHealth(connected=False, error=str(exc))
+        return PoolHealth(
+            connected=True,
+            pool_size=getattr(pool, "size", lambda: 0)(),
+            checked_out=getattr(pool, "checkedout", lambda: 0)(),
+            checked_in=getattr(pool, "checkedin", lambda: 0)(),
+            overflow=getattr(pool, "overflow", lambda: 0)(),
+            latency_ms=latency_ms,
+            server_version=str(server_version) if server_version is not None else None,
+        )
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[Connection]:
+        """Transaction for bulk writes with the session tuning from ``ConnectionSettings``."""
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        with self.engine.begin() as conn:
+            self._apply_bulk_settings(conn)
+            yield conn
+
+    @contextmanager
+    def _rollback_transaction(self) -> Iterator[Connection]:
+        """Transaction for previews: temp tables go away and nothing is committed."""
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        with self.engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                yield conn
+            finally:
+                transaction.rollback()
+
+    def _apply_bulk_settings(self, conn: Connection) -> None:
+        settings = self.settings
+        if settings.bulk_synchronous_commit:
+            conn.execute(
+                text("SELECT set_config('synchronous_commit', :value, true)"),
+                {"value": settings.bulk_synchronous_commit},
+            )
+        if settings.bulk_work_mem:
+            conn.execute(text("SELECT set_config('work_mem', :value, true)"), {"value": settings.bulk_work_mem})
 
     def list_tables(self, schema: str = "public") -> List[str]:
         if not self.engine:
             return []
-        inspector = inspect(self.engine)
-        return sorted(inspector.get_table_names(schema=schema), key=str.casefold)
+        return sorted(self.metadata.schema(schema).tables, key=str.casefold)
 
     def get_columns(self, table_name: str, schema: str = "public") -> List[ColumnInfo]:
+        table = self.get_table_metadata(table_name, schema)
+        return list(table.columns) if table else []
+
+    def get_table_metadata(self, table_name: str, schema: str = "public") -> Optional[TableMetadata]:
         if not self.engine:
-            return []
-        inspector = inspect(self.engine)
-        pk = set(inspector.get_pk_constraint(table_name, schema=schema).get("constrained_columns", []))
-        columns = []
-        for col in inspector.get_columns(table_name, schema=schema):
-            col_type = col.get("type")
-            max_length = getattr(col_type, "length", None)
-            columns.append(
-                ColumnInfo(
-                    name=col["name"],
-                    type=str(col_type or ""),
-                    nullable=bool(col.get("nullable", True)),
-                    primary_key=col["name"] in pk,
-                    max_length=max_length,
-                )
-            )
-        return columns
+            return None
+        return self.metadata.table(table_name, schema)
+
+    def refresh_metadata(self, schema: str = "public") -> None:
+        if self.engine:
+            self.metadata.refresh(schema)
+
+    @property
+    def identity(self) -> Optional[str]:
+        """``host:port/database`` of the connection, to tag data that is only valid on that database."""
+        if not self.engine:
+            return None
+        url = self.engine.url
+        return f"{url.host}:{url.port}/{url.database}"
+
+    def table_has_rows(self, table: str, schema: str = "public") -> bool:
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        with self.engine.connect() as conn:
+            return bool(conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {schema}.{table})")).scalar())
 
     def execute_insert(
         self,
@@ -60,62 +556,814 @@ class DatabaseProvider:
         schema: str = "public",
         autogenerate_pk: bool = False,
         primary_key: Optional[str] = None,
+        parallelism: int = 1,
+        commit_mode: str = COMMIT_ALL,
+        row_numbers: Optional[Sequence[int]] = None,
+        generated_keys: Optional[Sequence[object]] = None,
+        isolate_errors: bool = False,
+        fast_bulk_load: bool = False,
+        disable_triggers: bool = False,
     ) -> int:
+        """Insert ``records``; with ``autogenerate_pk`` sequence-backed keys are reserved in bulk.
+
+        ``generated_keys`` lets the caller pass keys it already reserved with
+        ``allocate_generated_keys`` (e.g. to write them back to a file). With ``isolate_errors``
+        failing rows are located by bisection, the rest is committed and ``RowRejectionError``
+        lists the rejected ones. ``fast_bulk_load`` runs the load through ``_fast_bulk_load``
+        (single connection) and leaves its report in ``last_bulk_load``.
+        """
+        self.last_bulk_load = None
         if not self.engine or not records:
             return 0
 
+        records_to_use, columns, overriding = self._prepare_insert_records(
+            table, records, schema, autogenerate_pk, primary_key, generated_keys
+        )
+        base_writer = self._insert_writer(table, columns, schema, overriding, len(records_to_use) >= COPY_MIN_ROWS)
+        writer = base_writer
+        rejected: List[RejectedRow] = []
+        if isolate_errors:
+            writer = self._isolating_writer(writer, records_to_use, row_numbers, rejected)
+        workers = self._effective_parallelism(parallelism, len(records_to_use))
+        if fast_bulk_load:
+            self.last_bulk_load = self._fast_bulk_load(
+                table, schema, writer, base_writer, records_to_use, disable_triggers
+            )
+            written = len(records_to_use)
+        elif workers > 1:
+            key = self._insert_partition_key(table, schema, columns, primary_key if autogenerate_pk else None)
+            if key:
+                partitions = self._partition_by_key(records_to_use, key, workers)
+            else:
+                partitions = self._partition_by_range(len(records_to_use), workers)
+            written = self._write_partitioned(writer, records_to_use, partitions, commit_mode, row_numbers)
+        else:
+            with self._write_transaction() as conn:
+                writer(conn, records_to_use)
+            written = len(records_to_use)
+        return self._raise_rejected(rejected, written)
+
+    def _fast_bulk_load(
+        self,
+        table: str,
+        schema: str,
+        writer: Callable[[Connection, List[Dict[str, object]]], object],
+        base_writer: Callable[[Connection, List[Dict[str, object]]], object],
+        records: List[Dict[str, object]],
+        disable_triggers: bool,
+    ) -> BulkLoadReport:
+        """Load with secondary indexes dropped (and user triggers disabled), then rebuild and ANALYZE.
+
+        Only plain indexes are dropped: primary keys, unique indexes and indexes backing
+        constraints stay, so integrity is still enforced row by row. Only enabled user triggers
+        are disabled, by name, and each is re-enabled in its original mode (origin, replica or
+        always). Everything runs in one transaction; PostgreSQL DDL is transactional, so any
+        failure rolls the indexes and triggers back to their original definitions. Before dropping, a sample is inserted and
+        rolled back to calibrate the per-row cost with indexes, used to estimate the time saved.
+        """
+        metadata = self.get_table_metadata(table, schema)
+        indexes = [
+            index
+            for index in (metadata.indexes if metadata else [])
+            if not (index.primary or index.unique or index.backs_constraint)
+        ]
+        report = BulkLoadReport(rows=len(records), dropped_indexes=[index.name for index in indexes])
+        qualified = f"{schema}.{table}"
+        with self._write_transaction() as conn:
+            if indexes and len(records) >= BULK_CALIBRATION_ROWS * 4:
+                sample = records[:BULK_CALIBRATION_ROWS]
+                savepoint = conn.begin_nested()
+                started = time.perf_counter()
+                try:
+                    base_writer(conn, sample)
+                    elapsed = time.perf_counter() - started
+                    report.estimated_indexed_seconds = elapsed / len(sample) * len(records)
+                except Exception:  # noqa: BLE001
+                    # Calibration is best effort; the real load reports its own errors.
+                    pass
+                finally:
+                    savepoint.rollback()
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX {schema}.{index.name}"))
+            triggers: List[tuple[str, str]] = []
+            if disable_triggers:
+                triggers = [
+                    (str(name), str(mode))
+                    for name, mode in conn.execute(
+                        text(
+                            "SELECT tgname, tgenabled FROM pg_trigger "
+                            "WHERE tgrelid = CAST(:table AS regclass) AND NOT tgisinternal AND tgenabled <> 'D' "
+                            "ORDER BY tgname"
+                        ),
+                        {"table": qualified},
+                    )
+                ]
+                report.disabled_triggers = len(triggers)
+                for name, _ in triggers:
+                    conn.execute(text(f"ALTER TABLE {qualified} DISABLE TRIGGER {_quote_identifier(name)}"))
+
+            started = time.perf_counter()
+            writer(conn, records)
+            report.load_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for index in indexes:
+                conn.execute(text(index.definition))
+            for name, mode in triggers:
+                # Only the triggers disabled above, each back in its own mode; already disabled ones stay so.
+                clause = _TRIGGER_ENABLE_CLAUSES.get(mode, "ENABLE")
+                conn.execute(text(f"ALTER TABLE {qualified} {clause} TRIGGER {_quote_identifier(name)}"))
+            report.rebuild_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            conn.execute(text(f"ANALYZE {qualified}"))
+            report.analyze_seconds = time.perf_counter() - started
+        if indexes:
+            self.metadata.invalidate(schema)
+        return report
+
+    def _prepare_insert_records(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        schema: str,
+        autogenerate_pk: bool,
+        primary_key: Optional[str],
+        generated_keys: Optional[Sequence[object]] = None,
+    ) -> tuple[List[Dict[str, object]], List[str], bool]:
+        """Records as ``execute_insert`` writes them, their columns and whether identity keys are overridden.
+
+        Sequence-backed keys are reserved in bulk (unless ``generated_keys`` are given) and
+        written as plain values; other generated keys are left to the column default.
+        """
         records_to_use = records
-        generated_values: Dict[str, str] = {}
+        overriding = False
         if autogenerate_pk and primary_key:
-            records_to_use = [{k: v for k, v in record.items() if k != primary_key} for record in records]
-            generated_pk_sql = self._generated_pk_sql(table, schema, primary_key)
-            if generated_pk_sql:
-                generated_values[primary_key] = generated_pk_sql
+            spec = self.generated_key_spec(table, primary_key, schema)
+            if spec:
+                keys = generated_keys
+                if keys is None:
+                    keys = self.allocate_generated_keys(table, primary_key, len(records), schema)
+                records_to_use = attach_generated_keys(records, primary_key, keys)
+                overriding = spec.identity
+            else:
+                records_to_use = [{k: v for k, v in record.items() if k != primary_key} for record in records]
 
-        with self.engine.begin() as conn:
-            data_columns = list(records_to_use[0].keys())
-            columns = ", ".join([*generated_values.keys(), *data_columns])
-            placeholders = ", ".join([*generated_values.values(), *(f":{col}" for col in data_columns)])
-            if not columns:
-                raise ValueError("Nenhuma coluna disponivel para INSERT.")
-            stmt = text(f"INSERT INTO {schema}.{table} ({columns}) VALUES ({placeholders})")
-            conn.execute(stmt, records_to_use)
-        return len(records_to_use)
-
-    def _generated_pk_sql(self, table: str, schema: str, primary_key: str) -> Optional[str]:
-        """Return SQL expression for known application-managed primary keys."""
-        if schema == "public" and table == "estoque" and primary_key == "codigo_fixo":
-            return "LPAD(nextval('public.codigo_fixo_estoque_seq'::regclass)::text, 5, '0')"
+        columns = list(records_to_use[0].keys())
+        if not columns:
+            raise ValueError("Nenhuma coluna disponivel para INSERT.")
+        return records_to_use, columns, overriding
+
+    def _insert_statement(self, table: str, columns: List[str], schema: str, overriding: bool) -> TextClause:
+        overriding_sql = " OVERRIDING SYSTEM VALUE" if overriding else ""
+        return text(
+            f"INSERT INTO {schema}.{table} ({', '.join(columns)}){overriding_sql} "
+            f"VALUES ({', '.join(f':{col}' for col in columns)})"
+        )
+
+    def _insert_writer(
+        self, table: str, columns: List[str], schema: str, overriding: bool, use_copy: bool
+    ) -> Callable[[Connection, List[Dict[str, object]]], None]:
+        """Writer for plain-value INSERTs: COPY for large loads, executemany otherwise."""
+        if use_copy:
+            return lambda conn, batch: self._copy_records(conn, table, columns, batch, schema)
+        stmt = self._insert_statement(table, columns, schema, overriding)
+        return lambda conn, batch: conn.execute(stmt, batch)
+
+    def _copy_records(
+        self,
+        conn: Connection,
+        table: str,
+        columns: List[str],
+        records: List[Dict[str, object]],
+        schema: str = "public",
+    ) -> None:
+        """COPY ``records`` into ``schema.table`` on the DBAPI connection behind ``conn``."""
+        if self.settings.driver == DRIVER_PSYCOPG:
+            self._copy_records_psycopg(conn, table, columns, records, schema)
+            return
+        copy_sql = f"COPY {schema}.{table} ({', '.join(columns)}) FROM STDIN"
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            for start in range(0, len(records), COPY_BATCH_ROWS):
+                batch = records[start : start + COPY_BATCH_ROWS]
+                buffer = io.StringIO()
+                for record in batch:
+                    buffer.write("\t".join(copy_text_value(record.get(col)) for col in columns))
+                    buffer.write("\n")
+                buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+        finally:
+            cursor.close()
+
+    def _copy_records_psycopg(
+        self,
+        conn: Connection,
+        table: str,
+        columns: List[str],
+        records: List[Dict[str, object]],
+        schema: str = "public",
+    ) -> None:
+        """psycopg 3 COPY: binary when every value matches its column type, text otherwise."""
+        type_rows = conn.execute(
+            text(
+                "SELECT a.attname, a.atttypid::int, t.typname FROM pg_attribute a "
+                "JOIN pg_type t ON t.oid = a.atttypid "
+                "WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = ANY(:columns)"
+            ),
+            {"table": f"{schema}.{table}", "columns": list(columns)},
+        ).all()
+        types = {row[0]: (row[1], row[2]) for row in type_rows}
+        binary = len(types) == len(columns) and all(
+            binary_copy_accepts(types[col][1], record.get(col)) for record in records for col in columns
+        )
+        copy_sql = f"COPY {schema}.{table} ({', '.join(columns)}) FROM STDIN"
+        if binary:
+            copy_sql += " (FORMAT BINARY)"
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            with cursor.copy(copy_sql) as copy:
+                if binary:
+                    copy.set_types([types[col][0] for col in columns])
+                for record in records:
+                    copy.write_row([record.get(col) for col in columns])
+        finally:
+            cursor.close()
+
+    def generated_key_spec(self, table: str, primary_key: str, schema: str = "public") -> Optional[GeneratedKeySpec]:
+        """How keys of ``primary_key`` are generated: known app-managed keys, then sequence-backed columns."""
+        known = APP_MANAGED_KEYS.get((schema, table, primary_key))
+        if known:
+            return known
+        metadata = self.get_table_metadata(table, schema)
+        column = metadata.column(primary_key) if metadata else None
+        if column is None:
+            return None
+        if column.default:
+            match = _NEXTVAL_RE.search(column.default)
+            if match:
+                return GeneratedKeySpec(column=primary_key, sequence=match.group(1))
+        if column.identity and self.engine:
+            with self.engine.connect() as conn:
+                sequence = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:table, :column)"),
+                    {"table": f"{schema}.{table}", "column": primary_key},
+                ).scalar()
+            if sequence:
+                return GeneratedKeySpec(column=primary_key, sequence=sequence, identity=True)
         return None
 
-    def execute_update(self, table: str, records: List[Dict[str, object]], join_column: str, schema: str = "public") -> int:
+    def allocate_generated_keys(
+        self, table: str, primary_key: str, count: int, schema: str = "public"
+    ) -> List[object]:
+        """Reserve ``count`` keys from the key's sequence in one round trip, formatted client-side."""
+        spec = self.generated_key_spec(table, primary_key, schema)
+        if spec is None:
+            raise ValueError(f"A coluna {table}.{primary_key} não é gerada por sequência.")
+        if not self.engine or count <= 0:
+            return []
+        with self.engine.connect() as conn:
+            # nextval() is not transactional, so the reservation survives without a commit.
+            values = conn.execute(
+                text("SELECT nextval(CAST(:sequence AS regclass)) FROM generate_series(1, :count)"),
+                {"sequence": spec.sequence, "count": count},
+            ).scalars().all()
+        return [spec.format(value) for value in sorted(values)]
+
+    def execute_update(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        join_column: str,
+        schema: str = "public",
+        parallelism: int = 1,
+        commit_mode: str = COMMIT_ALL,
+        row_numbers: Optional[Sequence[int]] = None,
+        isolate_errors: bool = False,
+    ) -> int:
         if not self.engine or not records:
             return 0
-        with self.engine.begin() as conn:
-            set_clause = ", ".join(f"{col} = :{col}" for col in records[0].keys() if col != join_column)
-            stmt = text(f"UPDATE {schema}.{table} SET {set_clause} WHERE {join_column} = :{join_column}")
-            conn.execute(stmt, records)
-        return len(records)
+        stmt = build_update_statement(table, list(records[0].keys()), join_column, schema)
+        writer = lambda conn, batch: conn.execute(stmt, batch)  # noqa: E731
+        rejected: List[RejectedRow] = []
+        if isolate_errors:
+            writer = self._isolating_writer(writer, records, row_numbers, rejected)
+        workers = self._effective_parallelism(parallelism, len(records))
+        if workers > 1:
+            partitions = self._partition_by_key(records, [join_column], workers)
+            written = self._write_partitioned(writer, records, partitions, commit_mode, row_numbers)
+        else:
+            with self._write_transaction() as conn:
+                writer(conn, records)
+            written = len(records)
+        return self._raise_rejected(rejected, written)
+
+    def _isolating_writer(
+        self,
+        writer: Callable[[Connection, List[Dict[str, object]]], object],
+        records: List[Dict[str, object]],
+        row_numbers: Optional[Sequence[int]],
+        rejected: List[RejectedRow],
+    ) -> Callable[[Connection, List[Dict[str, object]]], object]:
+        """Wrap ``writer`` so a failing batch is bisected under savepoints down to the bad rows.
+
+        Each good half is kept, each failing half is split again, so ``k`` bad rows out of ``n``
+        cost about ``2k log2(n)`` extra statements. Rejections are appended to ``rejected``
+        (shared by the partitions, hence the lock).
+        """
+        positions = {id(record): idx for idx, record in enumerate(records)}
+        lock = threading.Lock()
+
+        def attempt(conn: Connection, batch: List[Dict[str, object]]) -> None:
+            savepoint = conn.begin_nested()
+            try:
+                writer(conn, batch)
+                savepoint.commit()
+                return
+            except Exception as exc:  # noqa: BLE001
+                savepoint.rollback()
+                if len(batch) > 1:
+                    middle = len(batch) // 2
+                    attempt(conn, batch[:middle])
+                    attempt(conn, batch[middle:])
+                    return
+                index = positions.get(id(batch[0]), -1)
+                row = row_numbers[index] if row_numbers is not None and index >= 0 else index + 1
+                with lock:
+                    rejected.append(RejectedRow(index, row, batch[0], database_error_message(exc)))
+
+        return attempt
+
+    def _raise_rejected(self, rejected: List[RejectedRow], written: int) -> int:
+        if not rejected:
+            return written
+        rejected.sort(key=lambda item: item.index)
+        raise RowRejectionError(rejected, written - len(rejected))
+
+    def join_index_advice(
+        self, table: str, column: str, update_rows: int, schema: str = "public"
+    ) -> JoinIndexAdvice:
+        """Check ``pg_index`` (via the metadata cache) for a valid index led by ``column``."""
+        metadata = self.get_table_metadata(table, schema)
+        index_name: Optional[str] = None
+        for index in metadata.indexes if metadata else []:
+            # Partial and expression indexes cannot serve ``WHERE column = :value`` in general.
+            if not index.valid:
+                continue
+            if index.columns and index.columns[0] == column and " WHERE " not in index.definition.upper():
+                if index.method in ("btree", "hash"):
+                    index_name = index.name
+                    break
+        return JoinIndexAdvice(
+            table=table,
+            column=column,
+            index_name=index_name,
+            estimated_rows=metadata.estimated_rows if metadata else -1.0,
+            update_rows=update_rows,
+        )
+
+    def create_temporary_index(
+        self, table: str, column: str, schema: str = "public", allow_blocking: bool = False
+    ) -> str:
+        """Build a helper btree index on ``column``, CONCURRENTLY so the table stays writable.
+
+        Runs in autocommit (CONCURRENTLY cannot run inside a transaction). The name carries a
+        random suffix, so concurrent importers never share or drop each other's index. If the
+        concurrent build fails, e.g. because the role cannot wait on other transactions, the
+        invalid leftover is dropped and ``BlockingIndexBuildError`` is raised: a regular build
+        takes a SHARE lock that blocks every write to the table until it finishes, so it only
+        runs when the caller passes ``allow_blocking``.
+        """
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        name = f"{TEMP_INDEX_PREFIX}{table}_{column}"[:50] + f"_{uuid.uuid4().hex[:12]}"
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = conn.execute(
+                text(
+                    "SELECT NOT (i.indisvalid AND i.indisready) FROM pg_index i "
+                    "JOIN pg_class ic ON ic.oid = i.indexrelid "
+                    "JOIN pg_namespace n ON n.oid = ic.relnamespace "
+                    "WHERE n.nspname = :schema AND ic.relname = :name"
+                ),
+                {"schema": schema, "name": name},
+            ).scalar()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name}"))
+            if allow_blocking:
+                conn.execute(text(f"CREATE INDEX {name} ON {schema}.{table} ({column})"))
+            else:
+                try:
+                    conn.execute(text(f"CREATE INDEX CONCURRENTLY {name} ON {schema}.{table} ({column})"))
+                except DBAPIError as exc:
+                    # A failed concurrent build leaves an invalid index behind.
+                    conn.execute(text(f"DROP INDEX IF EXISTS {schema}.{name}"))
+                    raise BlockingIndexBuildError(table, column, database_error_message(exc)) from exc
+        self.metadata.invalidate(schema)
+        return name
+
+    def drop_temporary_index(self, name: str, schema: str = "public") -> None:
+        if not self.engine:
+            return
+        if not name.startswith(TEMP_INDEX_PREFIX):
+            raise ValueError(f"Índice {name} não foi criado pela importação")
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name}"))
+        self.metadata.invalidate(schema)
+
+    @contextmanager
+    def temporary_index(
+        self, table: str, column: str, schema: str = "public", allow_blocking: bool = False
+    ) -> Iterator[str]:
+        name = self.create_temporary_index(table, column, schema, allow_blocking)
+        try:
+            yield name
+        finally:
+            self.drop_temporary_index(name, schema)
+
+    def max_parallelism(self) -> int:
+        return max(1, self.settings.pool_size + self.settings.max_overflow)
+
+    def _effective_parallelism(self, parallelism: int, total: int) -> int:
+        if parallelism <= 1 or total < PARALLEL_MIN_ROWS_PER_PARTITION * 2:
+            return 1
+        by_size = total // PARALLEL_MIN_ROWS_PER_PARTITION
+        return max(1, min(parallelism, self.max_parallelism(), by_size))
+
+    def _partition_by_range(self, total: int, workers: int) -> List[List[int]]:
+        size = -(-total // workers)
+        return [list(range(start, min(start + size, total))) for start in range(0, total, size)]
+
+    def _prepared_transaction_slots(self) -> int:
+        """``max_prepared_transactions`` of the server (0 disables two-phase commit)."""
+        try:
+            with self.engine.connect() as conn:
+                return int(conn.execute(text("SHOW max_prepared_transactions")).scalar() or 0)
+        except (DBAPIError, ValueError):
+            return 0
+
+    def _insert_partition_key(
+        self, table: str, schema: str, columns: List[str], generated_key: Optional[str]
+    ) -> Optional[List[str]]:
+        """Columns of the first primary key/unique constraint fully present in ``columns``.
+
+        Duplicate unique values split across connections wait on each other's uncommitted rows
+        and can deadlock; hashing the INSERTs by such a key keeps duplicates on one connection.
+        A key made only of freshly generated values cannot repeat and is skipped.
+        """
+        metadata = self.get_table_metadata(table, schema)
+        if metadata is None:
+            return None
+        candidates = [metadata.primary_key] + [constraint.columns for constraint in metadata.unique_constraints]
+        candidates += [
+            index.columns
+            for index in metadata.indexes
+            if index.unique and index.valid and " WHERE " not in index.definition.upper()
+        ]
+        for key in candidates:
+            if not key or any(col is None or col not in columns for col in key) or key == [generated_key]:
+                continue
+            return list(key)
+        return None
+
+    def _partition_by_key(self, records: List[Dict[str, object]], key: Sequence[str], workers: int) -> List[List[int]]:
+        # Same key always lands in the same partition: no row-lock conflicts between
+        # connections and repeated keys keep their relative order (last one wins).
+        partitions: List[List[int]] = [[] for _ in range(workers)]
+        for idx, record in enumerate(records):
+            text_key = "\x1f".join(partition_key_text(record.get(col)) for col in key)
+            bucket = zlib.crc32(text_key.encode("utf-8")) % workers
+            partitions[bucket].append(idx)
+        return [part for part in partitions if part]
+
+    def _write_partitioned(
+        self,
+        writer: Callable[[Connection, List[Dict[str, object]]], object],
+        records: List[Dict[str, object]],
+        partitions: List[List[int]],
+        commit_mode: str,
+        row_numbers: Optional[Sequence[int]],
+    ) -> int:
+        """Run ``writer`` for each partition on its own pooled connection.
+
+        ``COMMIT_ALL``: every partition writes inside an open transaction and they are committed
+        only after every partition succeeded; otherwise all are rolled back. The commits of the
+        connections are still sequential: when the server allows enough prepared transactions
+        (``max_prepared_transactions``), all partitions are first ``PREPARE TRANSACTION``-ed so
+        the final commits cannot fail for data reasons; without it, a failure while committing
+        (e.g. a lost connection) leaves the earlier partitions committed and is reported with
+        the count of committed rows. ``COMMIT_PARTITION``: each partition commits independently.
+        In both modes failures are raised as ``ParallelWriteError`` ordered by source position,
+        with the rows involved.
+        """
+        if commit_mode not in (COMMIT_ALL, COMMIT_PARTITION):
+            raise ValueError(f"Modo de commit desconhecido: {commit_mode}")
+
+        def rows_for(part: List[int]) -> List[int]:
+            if row_numbers is None:
+                return [idx + 1 for idx in part]
+            return [row_numbers[idx] for idx in part]
+
+        errors: List[PartitionError] = []
+        committed = 0
+        if commit_mode == COMMIT_PARTITION:
+
+            def write_and_commit(part: List[int]) -> int:
+                with self._write_transaction() as conn:
+                    writer(conn, [records[idx] for idx in part])
+                return len(part)
+
+            with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                futures = {executor.submit(write_and_commit, part): number for number, part in enumerate(partitions)}
+                for future, number in futures.items():
+                    try:
+                        committed += future.result()
+                    except Exception as exc:  # noqa: BLE001
+                        part = partitions[number]
+                        errors.append(PartitionError(number, part[0], rows_for(part), str(exc)))
+        else:
+            connections: List[Connection] = []
+            transactions = []
+            two_phase = self._prepared_transaction_slots() >= len(partitions)
+            try:
+                for _ in partitions:
+                    conn = self.engine.connect()
+                    connections.append(conn)
+                    transactions.append(conn.begin_twophase() if two_phase else conn.begin())
+                    self._apply_bulk_settings(conn)
+
+                def write(number: int) -> int:
+                    part = partitions[number]
+                    writer(connections[number], [records[idx] for idx in part])
+                    return len(part)
+
+                with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+                    futures = [executor.submit(write, number) for number in range(len(partitions))]
+                    for number, future in enumerate(futures):
+                        try:
+                            future.result()
+                        except Exception as exc:  # noqa: BLE001
+                            part = partitions[number]
+                            errors.append(PartitionError(number, part[0], rows_for(part), str(exc)))
+                if two_phase and not errors:
+                    for number, trans in enumerate(transactions):
+                        try:
+                            trans.prepare()
+                        except Exception as exc:  # noqa: BLE001
+                            part = partitions[number]
+                            errors.append(PartitionError(number, part[0], rows_for(part), str(exc)))
+                            break
+                if errors:
+                    # Prepared transactions are rolled back with ROLLBACK PREPARED.
+                    for trans in transactions:
+                        trans.rollback()
+                elif two_phase:
+                    for number, trans in enumerate(transactions):
+                        try:
+                            trans.commit()
+                            committed += len(partitions[number])
+                        except Exception as exc:  # noqa: BLE001
+                            # Still prepared on the server: it must be finished, not rolled back.
+                            part = partitions[number]
+                            message = f"{exc} (finalize com COMMIT PREPARED '{trans.xid}')"
+                            errors.append(PartitionError(number, part[0], rows_for(part), message))
+                else:
+                    for number, trans in enumerate(transactions):
+                        try:
+                            trans.commit()
+                            committed += len(partitions[number])
+                        except Exception as exc:  # noqa: BLE001
+                            # Without two-phase commit this is the window where a partial outcome is possible.
+                            part = partitions[number]
+                            errors.append(PartitionError(number, part[0], rows_for(part), str(exc)))
+                            for pending in transactions[number + 1 :]:
+                                pending.rollback()
+                            break
+            finally:
+                for conn in connections:
+                    conn.close()
+        if errors:
+            errors.sort(key=lambda error: error.first_index)
+            raise ParallelWriteError(errors, committed)
+        return committed
 
     def fetch_lookup_values(
-        self, table: str, id_column: str, label_column: str, schema: str = "public"
+        self,
+        table: str,
+        id_column: str,
+        label_column: str,
+        schema: str = "public",
+        labels: Optional[Iterable[str]] = None,
+        trim_whitespace: bool = True,
     ) -> List[tuple[object, object]]:
+        return list(
+            self.iter_lookup_values(
+                table, id_column, label_column, schema, labels=labels, trim_whitespace=trim_whitespace
+            )
+        )
+
+    def iter_lookup_values(
+        self,
+        table: str,
+        id_column: str,
+        label_column: str,
+        schema: str = "public",
+        labels: Optional[Iterable[str]] = None,
+        trim_whitespace: bool = True,
+        batch_size: int = LOOKUP_STREAM_BATCH_SIZE,
+    ) -> Iterator[tuple[object, object]]:
+        """Yield ``(id, label)`` pairs; when ``labels`` is given only rows matching them are fetched.
+
+        Full-table fetches stream through a server-side (named) cursor in ``batch_size`` chunks,
+        so callers can fold rows into their own structures without materializing the result.
+        ``labels`` are normalized keys (see ``src.core.lookups.normalize_lookup_key``). They are
+        sent as array parameters and compared with the server-side equivalent of that
+        normalization, so every row sharing a label still comes back and ambiguous labels can be
+        detected by the caller.
+        """
         if not self.engine:
-            return []
+            return
+        if labels is None:
+            stmt = build_lookup_statement(table, id_column, label_column, schema)
+            with self.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+                for row in result:
+                    yield row[0], row[1]
+            return
+
+        wanted = lookup_label_params(labels)
+        if not wanted:
+            return
+        stmt = build_lookup_statement(
+            table, id_column, label_column, schema, targeted=True, trim_whitespace=trim_whitespace
+        )
         with self.engine.connect() as conn:
-            stmt = text(f"SELECT {id_column} AS id, {label_column} AS label FROM {schema}.{table}")
-            rows = conn.execute(stmt).all()
-        values: List[tuple[object, object]] = []
-        for row in rows:
-            if hasattr(row, "_mapping"):
-                mapping = row._mapping
-                id_value = mapping.get("id")
-                label_value = mapping.get("label")
-            elif isinstance(row, dict):
-                id_value = row.get("id")
-                label_value = row.get("label")
-            else:
-                id_value = row[0]
-                label_value = row[1] if len(row) > 1 else None
-            values.append((id_value, label_value))
-        return values
+            for chunk in wanted:
+                for row in conn.execute(stmt, {"labels": chunk}):
+                    yield self._lookup_pair(row)
+
+    def insert_lookup_labels(
+        self,
+        table: str,
+        id_column: str,
+        label_column: str,
+        labels: Sequence[str],
+        schema: str = "public",
+        trim_whitespace: bool = True,
+    ) -> CreatedLookupLabels:
+        """Insert the missing ``labels`` into a lookup table in one statement.
+
+        Returns the ``(id, label)`` pair of every label; ``inserted`` counts only the rows this
+        call's ``INSERT ... RETURNING`` created, not labels that already existed. Labels are
+        compared by ``lookup_key_sql``, so a row differing only in case or outer whitespace
+        counts as existing and is returned instead of being duplicated.
+
+        With a unique constraint/index on ``label_column`` the insert is ``ON CONFLICT DO NOTHING``,
+        so concurrent importers creating the same label never duplicate it; labels that lost the
+        race are read back afterwards. Without one, a transaction-level advisory lock on the table
+        serializes importers and only labels not yet present are inserted.
+        """
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        def key_of(label: str) -> str:
+            return (label.strip(LOOKUP_TRIM_WHITESPACE) if trim_whitespace else label).lower()
+
+        unique: Dict[str, str] = {}
+        for label in labels:
+            if label:
+                unique.setdefault(key_of(label), label)
+        labels = list(unique.values())
+        if not labels:
+            return CreatedLookupLabels([])
+        target = f"{schema}.{table}"
+        columns = [label_column]
+        values = ["l.label"]
+        spec = self.generated_key_spec(table, id_column, schema)
+        metadata = self.get_table_metadata(table, schema)
+        id_info = metadata.column(id_column) if metadata else None
+        if spec and id_info is not None and not id_info.default and not id_info.identity:
+            # App-managed keys have no column default; draw them from the sequence explicitly.
+            nextval = f"nextval('{spec.sequence}'::regclass)"
+            columns.insert(0, id_column)
+            values.insert(0, f"lpad({nextval}::text, {spec.width}, '0')" if spec.width else nextval)
+        source = "SELECT label FROM unnest(CAST(:labels AS text[])) AS l(label)"
+        absent = (
+            f"NOT EXISTS (SELECT 1 FROM {target} t "
+            f"WHERE {lookup_key_sql(f't.{label_column}', trim_whitespace)} = {lookup_key_sql('l.label', trim_whitespace)})"
+        )
+        params = {"labels": labels}
+        try:
+            with self._write_transaction() as conn:
+                if self._has_unique_label(table, label_column, schema):
+                    inserted = conn.execute(
+                        text(
+                            f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(values)} "
+                            f"FROM ({source}) l WHERE {absent} ON CONFLICT ({label_column}) DO NOTHING "
+                            f"RETURNING {id_column} AS id, {label_column} AS label"
+                        ),
+                        params,
+                    ).all()
+                else:
+                    conn.execute(
+                        text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"{APP_NAME}:{target}"}
+                    )
+                    inserted = conn.execute(
+                        text(
+                            f"INSERT INTO {target} ({', '.join(columns)}) SELECT {', '.join(values)} "
+                            f"FROM ({source}) l WHERE {absent} "
+                            f"RETURNING {id_column} AS id, {label_column} AS label"
+                        ),
+                        params,
+                    ).all()
+                pairs = [self._lookup_pair(row) for row in inserted]
+                inserted_count = len(pairs)
+                created = {key_of(str(label)) for _, label in pairs}
+                remaining = [key for key in map(key_of, labels) if key not in created]
+                if remaining:
+                    # Existing rows and labels another importer created first, matched like the lookups.
+                    pairs.extend(
+                        self._lookup_pair(row)
+                        for row in conn.execute(
+                            text(
+                                f"SELECT {id_column} AS id, {label_column} AS label FROM {target} "
+                                f"WHERE {lookup_key_sql(label_column, trim_whitespace)} = ANY(CAST(:labels AS text[]))"
+                            ),
+                            {"labels": remaining},
+                        )
+                    )
+        except DBAPIError as exc:
+            raise ValueError(
+                f"Não foi possível criar as descrições ausentes em {table}.{label_column}: "
+                f"{database_error_message(exc)}"
+            ) from exc
+        return CreatedLookupLabels(pairs, inserted_count)
+
+    def similar_lookup_labels(
+        self,
+        table: str,
+        id_column: str,
+        label_column: str,
+        values: Sequence[str],
+        limit: int = 3,
+        threshold: float = 0.4,
+        schema: str = "public",
+    ) -> Optional[Dict[str, List[tuple[object, str, float]]]]:
+        """Rank labels similar to each of ``values`` with ``pg_trgm`` in one round trip.
+
+        Returns ``value -> [(id, label, similarity)]`` best first, or ``None`` when the extension
+        is not installed so the caller can match on the client. The ``%`` filter is served by a
+        GIN/GiST trigram index on ``label_column`` when there is one (a GiST index also serves
+        the ``<->`` ordering); without it the lookup table is scanned once per value.
+        """
+        if not self.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        values = list(dict.fromkeys(value for value in values if value))
+        with self.engine.connect() as conn:
+            extension_schema = conn.execute(
+                text("SELECT extnamespace::regnamespace::text FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).scalar()
+            if extension_schema is None:
+                return None
+            if not values:
+                return {}
+            conn.execute(
+                text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+                {"threshold": str(threshold)},
+            )
+            rows = conn.execute(
+                text(
+                    f"SELECT v.value, m.id, m.label, m.score "
+                    f"FROM unnest(CAST(:values AS text[])) AS v(value) "
+                    f"CROSS JOIN LATERAL ("
+                    f"SELECT {id_column} AS id, {label_column}::text AS label, "
+                    f"{extension_schema}.similarity({label_column}::text, v.value) AS score "
+                    f"FROM {schema}.{table} "
+                    f"WHERE {label_column} OPERATOR({extension_schema}.%) v.value "
+                    f"ORDER BY {label_column} OPERATOR({extension_schema}.<->) v.value LIMIT :limit"
+                    f") m ORDER BY v.value, m.score DESC"
+                ),
+                {"values": values, "limit": limit},
+            ).all()
+        matches: Dict[str, List[tuple[object, str, float]]] = {}
+        for value, ident, label, score in rows:
+            matches.setdefault(value, []).append((ident, label, float(score)))
+        return matches
+
+    def _has_unique_label(self, table: str, label_column: str, schema: str = "public") -> bool:
+        metadata = self.get_table_metadata(table, schema)
+        if metadata is None:
+            return False
+        if any(constraint.columns == [label_column] for constraint in metadata.unique_constraints):
+            return True
+        # ON CONFLICT can infer a plain (non-partial) unique index as well.
+        return any(
+            index.unique and index.valid and index.columns == [label_column] and " WHERE " not in index.definition
+            for index in metadata.indexes
+        )
+
+    def _lookup_pair(self, row: object) -> tuple[object, object]:
+        if hasattr(row, "_mapping"):
+            mapping = row._mapping
+            return mapping.get("id"), mapping.get("label")
+        if isinstance(row, dict):
+            return row.get("id"), row.get("label")
+        return row[0], (row[1] if len(row) > 1 else None)
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.db.metadata import ColumnInfo, TableMetadata
+from src.db.provider import DatabaseProvider, lookup_key_sql
+
+ROW_COLUMN = "__row"
+# Violations fetched per check; the report only needs enough rows to fix the sheet.
+MAX_VIOLATIONS_PER_CHECK = 1_000
+_TEXT_TYPES = ("text", "character varying", "character", "varchar", "char", "bpchar", "name", "citext")
+
+
+@dataclass
+class StagingLookup:
+    target_column: str
+    foreign_table: str
+    foreign_id_column: str
+    foreign_label_column: str
+
+
+@dataclass
+class StagingViolation:
+    row: int
+    column: str
+    kind: str
+    value: Optional[str]
+    detail: str
+
+
+@dataclass
+class StagingReport:
+    total_rows: int
+    inserted: int = 0
+    violations: List[StagingViolation] = field(default_factory=list)
+    type_checks_skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def summary(self, limit: int = 5) -> str:
+        if self.ok:
+            return f"Linhas validadas: {self.total_rows} | Inseridas: {self.inserted}"
+        lines = [
+            f"Linha {v.row} coluna '{v.column}': {v.detail}" + (f" (valor: {v.value})" if v.value is not None else "")
+            for v in self.violations[:limit]
+        ]
+        remaining = len(self.violations) - len(lines)
+        if remaining > 0:
+            lines.append(f"...mais {remaining} violações.")
+        return "\n".join(lines)
+
+
+class StagingPipeline:
+    """Validates and loads rows server-side through a temporary staging table.
+
+    Raw mapped values are COPYed as text, FK descriptions are resolved with joins against the
+    foreign tables, length/NOT NULL/type checks run as set-based queries and the final
+    ``INSERT ... SELECT`` only runs when no check reported a violation. Everything happens in
+    one transaction; the staging tables are ``ON COMMIT DROP`` temp tables, so they disappear
+    with it whether it commits or rolls back.
+    """
+
+    def __init__(self, provider: DatabaseProvider, schema: str = "public") -> None:
+        self.provider = provider
+        self.schema = schema
+
+    def run(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        row_numbers: Sequence[int],
+        lookups: Sequence[StagingLookup] = (),
+        trim_whitespace: bool = True,
+        autogenerate_pk: bool = False,
+        primary_key: Optional[str] = None,
+        insert: bool = True,
+    ) -> StagingReport:
+        report = StagingReport(total_rows=len(records))
+        if not records:
+            return report
+        metadata = self.provider.get_table_metadata(table, self.schema)
+        if metadata is None:
+            raise ValueError(f"Tabela {self.schema}.{table} não encontrada")
+        columns = [col for col in records[0].keys() if not (autogenerate_pk and col == primary_key)]
+        unknown = [col for col in columns if metadata.column(col) is None]
+        if unknown:
+            raise ValueError(f"Colunas inexistentes em {table}: {', '.join(unknown)}")
+
+        suffix = uuid.uuid4().hex[:12]
+        staging = f"importdatadb_stg_{suffix}"
+        resolved = f"importdatadb_res_{suffix}"
+        with self.provider._write_transaction() as conn:
+            column_defs = ", ".join([f"{ROW_COLUMN} integer", *(f"{col} text" for col in columns)])
+            # Dropped with the transaction, committed or rolled back: no cleanup that could mask the error.
+            conn.execute(text(f"CREATE TEMP TABLE {staging} ({column_defs}) ON COMMIT DROP"))
+            staged = [
+                {ROW_COLUMN: row, **{col: self._as_text(record.get(col)) for col in columns}}
+                for row, record in zip(row_numbers, records)
+            ]
+            self.provider._copy_records(conn, staging, [ROW_COLUMN, *columns], staged, "pg_temp")
+            fk_by_column = {lookup.target_column: lookup for lookup in lookups if lookup.target_column in columns}
+            self._resolve(conn, staging, resolved, columns, fk_by_column, trim_whitespace)
+            report.violations.extend(self._fk_violations(conn, resolved, columns, fk_by_column))
+            report.violations.extend(self._column_violations(conn, resolved, columns, metadata, fk_by_column))
+            type_violations = self._type_violations(conn, resolved, columns, metadata, fk_by_column)
+            if type_violations is None:
+                report.type_checks_skipped = True
+            else:
+                report.violations.extend(type_violations)
+            report.violations.sort(key=lambda v: (v.row, v.column))
+            if insert and report.ok:
+                report.inserted = self._insert(conn, table, resolved, columns, metadata, autogenerate_pk, primary_key)
+        return report
+
+    def _as_text(self, value: object) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, float) and value.is_integer():
+            # pandas reads integer columns with gaps as float; keep them castable to integer types.
+            return str(int(value))
+        return value if isinstance(value, str) else str(value)
+
+    def _resolve(
+        self,
+        conn: Connection,
+        staging: str,
+        resolved: str,
+        columns: List[str],
+        fk_by_column: Dict[str, StagingLookup],
+        trim_whitespace: bool,
+    ) -> None:
+        select_cols = [f"s.{ROW_COLUMN}"]
+        joins: List[str] = []
+        for idx, col in enumerate(columns):
+            lookup = fk_by_column.get(col)
+            if lookup is None:
+                select_cols.append(f"s.{col}")
+                continue
+            alias = f"f{idx}"
+            key_expr = lookup_key_sql(lookup.foreign_label_column, trim_whitespace)
+            staged_key = lookup_key_sql(f"s.{col}", trim_whitespace)
+            foreign = f"{self.schema}.{lookup.foreign_table}"
+            # Only labels present in the staging table are grouped on the foreign side.
+            joins.append(
+                f"LEFT JOIN (SELECT {key_expr} AS k, min({lookup.foreign_id_column}) AS id, "
+                f"count(DISTINCT {lookup.foreign_id_column}) AS n FROM {foreign} "
+                f"WHERE {key_expr} IN (SELECT DISTINCT {lookup_key_sql(col, trim_whitespace)} FROM {staging}) "
+                f"GROUP BY 1) {alias} ON {alias}.k = {staged_key}"
+            )
+            select_cols.extend([f"{alias}.id AS {col}", f"{alias}.n AS __n_{idx}", f"s.{col} AS __raw_{idx}"])
+        conn.execute(
+            text(
+                f"CREATE TEMP TABLE {resolved} ON COMMIT DROP AS "
+                f"SELECT {', '.join(select_cols)} FROM {staging} s {' '.join(joins)}"
+            )
+        )
+
+    def _fetch(
+        self, conn: Connection, sql: str, column: str, kind: str, detail: str, params: Optional[dict] = None
+    ) -> List[StagingViolation]:
+        rows = conn.execute(text(f"{sql} ORDER BY {ROW_COLUMN} LIMIT {MAX_VIOLATIONS_PER_CHECK}"), params or {})
+        return [StagingViolation(row=row[0], column=column, kind=kind, value=row[1], detail=detail) for row in rows]
+
+    def _fk_violations(
+        self, conn: Connection, resolved: str, columns: List[str], fk_by_column: Dict[str, StagingLookup]
+    ) -> List[StagingViolation]:
+        violations: List[StagingViolation] = []
+        for idx, col in enumerate(columns):
+            lookup = fk_by_column.get(col)
+            if lookup is None:
+                continue
+            raw, count = f"__raw_{idx}", f"__n_{idx}"
+            target = f"{lookup.foreign_table}.{lookup.foreign_label_column}"
+            violations += self._fetch(
+                conn,
+                f"SELECT {ROW_COLUMN}, {raw} FROM {resolved} WHERE {raw} IS NULL OR btrim({raw}) = ''",
+                col,
+                "fk",
+                "descrição vazia para relacionamento",
+            )
+            violations += self._fetch(
+                conn,
+                f"SELECT {ROW_COLUMN}, {raw} FROM {resolved} WHERE btrim({raw}) <> '' AND {col} IS NULL",
+                col,
+                "fk",
+                f"descrição não encontrada em {target}",
+            )
+            violations += self._fetch(
+                conn,
+                f"SELECT {ROW_COLUMN}, {raw} FROM {resolved} WHERE {count} > 1",
+                col,
+                "fk",
+                f"descrição duplicada em {target}",
+            )
+        return violations
+
+    def _column_violations(
+        self,
+        conn: Connection,
+        resolved: str,
+        columns: List[str],
+        metadata: TableMetadata,
+        fk_by_column: Dict[str, StagingLookup],
+    ) -> List[StagingViolation]:
+        violations: List[StagingViolation] = []
+        for col in columns:
+            info = metadata.column(col)
+            if info is None:
+                continue
+            if not info.nullable and col not in fk_by_column:
+                violations += self._fetch(
+                    conn,
+                    f"SELECT {ROW_COLUMN}, {col} FROM {resolved} WHERE {col} IS NULL",
+                    col,
+                    "not_null",
+                    "valor obrigatório ausente",
+                )
+            if info.max_length and col not in fk_by_column:
+                violations += self._fetch(
+                    conn,
+                    f"SELECT {ROW_COLUMN}, {col} FROM {resolved} WHERE char_length({col}) > {int(info.max_length)}",
+                    col,
+                    "length",
+                    f"excede {info.max_length} caracteres",
+                )
+        return violations
+
+    def _type_violations(
+        self,
+        conn: Connection,
+        resolved: str,
+        columns: List[str],
+        metadata: TableMetadata,
+        fk_by_column: Dict[str, StagingLookup],
+    ) -> Optional[List[StagingViolation]]:
+        """Values that do not parse as the target type; ``None`` when the server cannot check (< PG 16)."""
+        version = int(conn.execute(text("SHOW server_version_num")).scalar() or 0)
+        if version < 160000:
+            return None
+        violations: List[StagingViolation] = []
+        for col in columns:
+            info = metadata.column(col)
+            if info is None or col in fk_by_column or self._is_text_type(info):
+                continue
+            violations += self._fetch(
+                conn,
+                f"SELECT {ROW_COLUMN}, {col} FROM {resolved} "
+                f"WHERE {col} IS NOT NULL AND NOT pg_input_is_valid({col}, :type_name)",
+                col,
+                "type",
+                f"valor inválido para o tipo {info.type}",
+                {"type_name": info.type},
+            )
+        return violations
+
+    def _is_text_type(self, info: ColumnInfo) -> bool:
+        return info.type.lower().startswith(_TEXT_TYPES)
+
+    def _insert(
+        self,
+        conn: Connection,
+        table: str,
+        resolved: str,
+        columns: List[str],
+        metadata: TableMetadata,
+        autogenerate_pk: bool,
+        primary_key: Optional[str],
+    ) -> int:
+        target_cols: List[str] = []
+        select_exprs: List[str] = []
+        overriding = ""
+        if autogenerate_pk and primary_key:
+            spec = self.provider.generated_key_spec(table, primary_key, self.schema)
+            if spec:
+                nextval = f"nextval('{spec.sequence}'::regclass)"
+                target_cols.append(primary_key)
+                select_exprs.append(f"lpad({nextval}::text, {spec.width}, '0')" if spec.width else nextval)
+                if spec.identity:
+                    overriding = " OVERRIDING SYSTEM VALUE"
+        for col in columns:
+            info = metadata.column(col)
+            target_cols.append(col)
+            select_exprs.append(f"CAST({col} AS {info.type})" if info else col)
+        result = conn.execute(
+            text(
+                f"INSERT INTO {self.schema}.{table} ({', '.join(target_cols)}){overriding} "
+                f"SELECT {', '.join(select_exprs)} FROM {resolved} ORDER BY {ROW_COLUMN}"
+            )
+        )
+        return int(result.rowcount or 0)
+
+
+def stage_key_rows(
+    provider: DatabaseProvider,
+    conn: Connection,
+    table: str,
+    key_columns: Sequence[str],
+    records: Sequence[Dict[str, object]],
+    schema: str = "public",
+    extra_columns: Sequence[str] = (),
+) -> str:
+    """COPY the key (and ``extra_columns``) of each record into a temp table typed like ``table``.
+
+    The temp table lives until the end of the transaction of ``conn``; ``ROW_COLUMN`` holds the
+    record's index in ``records``. Returns the temp table name.
+    """
+    columns = list(dict.fromkeys([*key_columns, *extra_columns]))
+    name = f"importdatadb_keys_{uuid.uuid4().hex[:12]}"
+    conn.execute(
+        text(
+            f"CREATE TEMP TABLE {name} ON COMMIT DROP AS "
+            f"SELECT {', '.join(columns)} FROM {schema}.{table} WITH NO DATA"
+        )
+    )
+    conn.execute(text(f"ALTER TABLE {name} ADD COLUMN {ROW_COLUMN} integer"))
+    staged = [{ROW_COLUMN: idx, **{col: record.get(col) for col in columns}} for idx, record in enumerate(records)]
+    provider._copy_records(conn, name, [*columns, ROW_COLUMN], staged, "pg_temp")
+    # Temp tables are never auto-analyzed; without statistics large joins get poor plans.
+    conn.execute(text(f"ANALYZE {name}"))
+    return name
+
+
+def key_match_condition(key_columns: Sequence[str], left: str = "t", right: str = "s") -> str:
+    return " AND ".join(f"{left}.{col} = {right}.{col}" for col in key_columns)
+
+
+def find_new_rows(
+    provider: DatabaseProvider,
+    table: str,
+    records: Sequence[Dict[str, object]],
+    key_columns: Sequence[str],
+    schema: str = "public",
+) -> List[int]:
+    """Indexes of ``records`` whose key does not exist in ``table`` (one server-side anti-join)."""
+    if not provider.engine or not records:
+        return []
+    missing = [col for col in key_columns if col not in records[0]]
+    if missing:
+        raise ValueError(f"Coluna(s) de chave sem valor nos registros: {', '.join(missing)}")
+    with provider.engine.begin() as conn:
+        staged = stage_key_rows(provider, conn, table, key_columns, records, schema)
+        return list(
+            conn.execute(
+                text(
+                    f"SELECT s.{ROW_COLUMN} FROM {staged} s WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {schema}.{table} t WHERE {key_match_condition(key_columns)}) "
+                    f"ORDER BY s.{ROW_COLUMN}"
+                )
+            ).scalars()
+        )
+
+
+def insert_returning_keys(
+    provider: DatabaseProvider,
+    table: str,
+    records: Sequence[Dict[str, object]],
+    primary_key: str,
+    schema: str = "public",
+    parallelism: int = 1,
+    isolate_errors: bool = False,
+    fast_bulk_load: bool = False,
+    disable_triggers: bool = False,
+) -> List[object]:
+    """INSERT ``records`` with ``primary_key`` filled by its column default; returns the keys in record order.
+
+    For keys not drawn from a sequence (e.g. ``gen_random_uuid()``), which cannot be reserved
+    up front. Records are COPYed into a temp table where the key is materialized as a column
+    with the same default, then inserted from there, so each key stays correlated with its row
+    without relying on the order of ``RETURNING``. The load is one statement in one
+    transaction (all or nothing), so the ``execute_insert`` writer options that change that
+    (``parallelism``, ``isolate_errors``, ``fast_bulk_load``, ``disable_triggers``) are
+    rejected with ``ValueError`` instead of being ignored.
+    """
+    unsupported = [
+        name
+        for name, enabled in (
+            # Same threshold as execute_insert: below it the write would not be split anyway.
+            ("paralelismo", provider._effective_parallelism(parallelism, len(records)) > 1),
+            ("isolar linhas com erro", isolate_errors),
+            ("carga rápida", fast_bulk_load),
+            ("desativar triggers", disable_triggers),
+        )
+        if enabled
+    ]
+    if unsupported:
+        raise ValueError(
+            f"A chave de {table}.{primary_key} é gerada por um valor padrão que não vem de sequência; "
+            f"essa gravação não suporta: {', '.join(unsupported)}. Desative essas opções."
+        )
+    if not provider.engine:
+        raise RuntimeError("Banco de dados não conectado")
+    if not records:
+        return []
+    metadata = provider.get_table_metadata(table, schema)
+    column = metadata.column(primary_key) if metadata else None
+    if column is None or not column.default:
+        raise ValueError(f"A coluna {table}.{primary_key} não tem valor padrão no banco para gerar a chave.")
+    columns = [col for col in records[0].keys() if col != primary_key]
+    if not columns:
+        raise ValueError("Nenhuma coluna disponivel para INSERT.")
+    with provider._write_transaction() as conn:
+        staged = stage_key_rows(provider, conn, table, columns, records, schema)
+        conn.execute(text(f"ALTER TABLE {staged} ADD COLUMN {primary_key} {column.type} DEFAULT {column.default}"))
+        column_list = ", ".join([primary_key, *columns])
+        conn.execute(
+            text(f"INSERT INTO {schema}.{table} ({column_list}) SELECT {column_list} FROM {staged} ORDER BY {ROW_COLUMN}")
+        )
+        return list(conn.execute(text(f"SELECT {primary_key} FROM {staged} ORDER BY {ROW_COLUMN}")).scalars())
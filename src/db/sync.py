@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.db.provider import DatabaseProvider
+from src.db.staging import ROW_COLUMN, key_match_condition, stage_key_rows
+
+
+@dataclass
+class SyncDiff:
+    to_insert: int
+    to_update: int
+    to_delete: int
+    unchanged: int
+    applied: bool = False
+
+    def summary(self) -> str:
+        action = "aplicado" if self.applied else "previsto"
+        return (
+            f"SYNC {action}: {self.to_insert} inclusões | {self.to_update} alterações | "
+            f"{self.to_delete} exclusões | {self.unchanged} sem mudança"
+        )
+
+
+@dataclass
+class SoftDelete:
+    """Mark rows missing from the sheet instead of deleting them (e.g. ``ativo`` false/true)."""
+
+    column: str
+    deleted_value: object
+    active_value: object
+
+
+class TableSynchronizer:
+    """Makes ``table`` mirror the sheet on ``key_column`` with set-based statements.
+
+    The sheet is COPYed into a temp table typed like the target; inserts, changed rows and rows
+    missing from the sheet are computed with joins on the server, so the target table never
+    reaches the client. ``apply`` runs delete, update and insert in one transaction.
+    """
+
+    def __init__(self, provider: DatabaseProvider, schema: str = "public") -> None:
+        self.provider = provider
+        self.schema = schema
+
+    def preview(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        key_column: str,
+        soft_delete: Optional[SoftDelete] = None,
+    ) -> SyncDiff:
+        return self._run(table, records, key_column, soft_delete, apply=False)
+
+    def apply(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        key_column: str,
+        soft_delete: Optional[SoftDelete] = None,
+        autogenerate_pk: bool = False,
+        primary_key: Optional[str] = None,
+    ) -> SyncDiff:
+        return self._run(
+            table, records, key_column, soft_delete, apply=True, autogenerate_pk=autogenerate_pk, primary_key=primary_key
+        )
+
+    def _run(
+        self,
+        table: str,
+        records: List[Dict[str, object]],
+        key_column: str,
+        soft_delete: Optional[SoftDelete],
+        apply: bool,
+        autogenerate_pk: bool = False,
+        primary_key: Optional[str] = None,
+    ) -> SyncDiff:
+        if not self.provider.engine:
+            raise RuntimeError("Banco de dados não conectado")
+        if not records:
+            raise ValueError("SYNC sem registros: a tabela inteira seria excluída")
+        columns = [col for col in records[0].keys() if not (autogenerate_pk and col == primary_key)]
+        if key_column not in columns:
+            raise ValueError(f"A coluna de chave {key_column} precisa estar mapeada para SYNC")
+        value_columns = [col for col in columns if col != key_column]
+        if soft_delete and soft_delete.column in columns:
+            raise ValueError(f"A coluna de exclusão lógica {soft_delete.column} não pode estar mapeada")
+        target = f"{self.schema}.{table}"
+        match = key_match_condition([key_column])
+
+        transaction_scope = self.provider._write_transaction() if apply else self.provider._rollback_transaction()
+        with transaction_scope as conn:
+            staged = stage_key_rows(self.provider, conn, table, [key_column], records, self.schema, value_columns)
+            self._check_keys(conn, staged, key_column)
+            changed = self._changed_condition(value_columns)
+            to_insert = self._count(
+                conn, f"SELECT count(*) FROM {staged} s WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {match})"
+            )
+            matched = self._count(conn, f"SELECT count(*) FROM {staged} s JOIN {target} t ON {match}")
+            update_filter = changed
+            params: Dict[str, object] = {}
+            delete_filter = f"NOT EXISTS (SELECT 1 FROM {staged} s WHERE {match})"
+            if soft_delete:
+                params = {"deleted_value": soft_delete.deleted_value, "active_value": soft_delete.active_value}
+                flag_type = self._type(table, soft_delete.column)
+                # Rows marked deleted that come back in the sheet are reactivated.
+                reactivate = f"t.{soft_delete.column} IS DISTINCT FROM CAST(:active_value AS {flag_type})"
+                update_filter = f"({changed}) OR {reactivate}" if changed else reactivate
+                delete_filter += f" AND t.{soft_delete.column} IS DISTINCT FROM CAST(:deleted_value AS {flag_type})"
+            to_update = 0
+            if update_filter:
+                to_update = self._count(
+                    conn, f"SELECT count(*) FROM {staged} s JOIN {target} t ON {match} WHERE {update_filter}", params
+                )
+            to_delete = self._count(conn, f"SELECT count(*) FROM {target} t WHERE {delete_filter}", params)
+            diff = SyncDiff(to_insert, to_update, to_delete, matched - to_update)
+            if not apply:
+                return diff
+
+            if soft_delete:
+                conn.execute(
+                    text(
+                        f"UPDATE {target} t SET {soft_delete.column} = CAST(:deleted_value AS {flag_type}) "
+                        f"WHERE {delete_filter}"
+                    ),
+                    params,
+                )
+            else:
+                conn.execute(text(f"DELETE FROM {target} t WHERE {delete_filter}"))
+            if update_filter:
+                assignments = [f"{col} = s.{col}" for col in value_columns]
+                if soft_delete:
+                    assignments.append(f"{soft_delete.column} = CAST(:active_value AS {flag_type})")
+                conn.execute(
+                    text(
+                        f"UPDATE {target} t SET {', '.join(assignments)} FROM {staged} s "
+                        f"WHERE {match} AND ({update_filter})"
+                    ),
+                    params,
+                )
+            insert_columns = list(columns)
+            select_exprs = [f"s.{col}" for col in columns]
+            overriding = ""
+            if autogenerate_pk and primary_key:
+                spec = self.provider.generated_key_spec(table, primary_key, self.schema)
+                if spec:
+                    nextval = f"nextval('{spec.sequence}'::regclass)"
+                    insert_columns.insert(0, primary_key)
+                    select_exprs.insert(0, f"lpad({nextval}::text, {spec.width}, '0')" if spec.width else nextval)
+                    overriding = " OVERRIDING SYSTEM VALUE" if spec.identity else ""
+            conn.execute(
+                text(
+                    f"INSERT INTO {target} ({', '.join(insert_columns)}){overriding} "
+                    f"SELECT {', '.join(select_exprs)} FROM {staged} s "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {match}) ORDER BY s.{ROW_COLUMN}"
+                )
+            )
+            diff.applied = True
+            return diff
+
+    def _check_keys(self, conn: Connection, staged: str, key_column: str) -> None:
+        if self._count(conn, f"SELECT count(*) FROM {staged} WHERE {key_column} IS NULL"):
+            raise ValueError(f"Há linhas sem valor na coluna de chave {key_column}")
+        duplicates = [
+            str(value)
+            for value in conn.execute(
+                text(f"SELECT {key_column} FROM {staged} GROUP BY 1 HAVING count(*) > 1 ORDER BY 1 LIMIT 5")
+            ).scalars()
+        ]
+        if duplicates:
+            raise ValueError(f"Chaves repetidas na planilha para {key_column}: {', '.join(duplicates)}")
+
+    def _changed_condition(self, value_columns: Sequence[str]) -> str:
+        if not value_columns:
+            return ""
+        target_cols = ", ".join(f"t.{col}" for col in value_columns)
+        staged_cols = ", ".join(f"s.{col}" for col in value_columns)
+        return f"ROW({target_cols}) IS DISTINCT FROM ROW({staged_cols})"
+
+    def _count(self, conn: Connection, sql: str, params: Optional[Dict[str, object]] = None) -> int:
+        return int(conn.execute(text(sql), params or {}).scalar() or 0)
+
+    def _type(self, table: str, column: str) -> str:
+        metadata = self.provider.get_table_metadata(table, self.schema)
+        info = metadata.column(column) if metadata else None
+        if info is None:
+            raise ValueError(f"Coluna {column} não encontrada em {table}")
+        return info.type
@@ -3,10 +3,21 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 import warnings
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, Iterator, List, Optional, Sequence
 
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
 import pandas as pd
 
+_STREAMABLE_SUFFIXES = (".xlsx", ".xlsm")
+# Strings read_excel turns into NaN by default (keep_default_na=True).
+_NA_STRINGS = frozenset(
+    {
+        "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+        "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+    }
+)
+
 
 @dataclass
 class SheetPreview:
@@ -24,6 +35,8 @@ class ExcelReader:
         if not self.path.exists():
             raise FileNotFoundError(self.path)
         self._sheets_cache: Dict[str, SheetPreview] = {}
+        # Raw sheets (header=None) kept by ``cache_workbook`` so several mappings share one parse.
+        self._raw_cache: Dict[str, pd.DataFrame] = {}
         # Some workbooks use Excel table names as print areas, which triggers noisy openpyxl warnings.
         warnings.filterwarnings(
             "ignore",
@@ -52,6 +65,39 @@ class ExcelReader:
 
         return df
 
+    def cache_workbook(self, sheet_names: Optional[Sequence[str]] = None) -> None:
+        """Parse ``sheet_names`` (all sheets by default) once; later reads slice the cached frames."""
+        wanted = [name for name in (sheet_names or self.sheet_names()) if name not in self._raw_cache]
+        if not wanted:
+            return
+        frames = pd.read_excel(self.path, sheet_name=list(wanted), dtype=object, header=None)
+        self._raw_cache.update(frames)
+
+    def clear_cache(self) -> None:
+        self._raw_cache.clear()
+
+    def _header_names(self, values: Sequence[object]) -> List[object]:
+        """Header cells named the way ``read_excel(header=0)`` names them (``Unnamed: n``, ``a.1``)."""
+        names: List[object] = []
+        counts: Dict[object, int] = {}
+        for idx, value in enumerate(values):
+            name = f"Unnamed: {idx}" if pd.isna(value) else value
+            if name in counts:
+                counts[name] += 1
+                name = f"{name}.{counts[name]}"
+            else:
+                counts[name] = 0
+            names.append(name)
+        return names
+
+    def _slice_cached(self, raw: pd.DataFrame, header_row: int, data_end_row: Optional[int]) -> pd.DataFrame:
+        end = data_end_row if data_end_row is not None else len(raw.index)
+        df = raw.iloc[header_row : max(end, header_row)].copy()
+        header = raw.iloc[header_row - 1].tolist() if header_row - 1 < len(raw.index) else [None] * raw.shape[1]
+        df.columns = self._header_names(header)
+        df.index = range(header_row + 1, header_row + 1 + len(df.index))
+        return df
+
     def _normalize_columns(self, columns: Sequence[object]) -> List[str]:
         normalized: List[str] = []
         seen: Dict[str, int] = {}
@@ -76,7 +122,11 @@ class ExcelReader:
         col_start: Optional[int] = None,
         col_end: Optional[int] = None,
     ) -> pd.DataFrame:
-        # header_row is 1-based Excel row number
+        """Rows between the header and ``data_end_row``, indexed by their Excel row number.
+
+        ``header_row``, ``data_start_row`` and ``data_end_row`` are 1-based Excel rows; blank rows
+        are dropped without renumbering the rows after them.
+        """
         skiprows: Optional[Sequence[int]] = None
         if header_row > 1:
             skiprows = list(range(header_row - 1))
@@ -89,7 +139,13 @@ class ExcelReader:
             # include header row in nrows calculation
             kwargs["nrows"] = max(data_end_row - (header_row - 1), 0)
 
-        df = pd.read_excel(self.path, **kwargs)
+        raw = self._raw_cache.get(sheet_name)
+        if raw is not None:
+            df = self._slice_cached(raw, header_row, data_end_row)
+        else:
+            df = pd.read_excel(self.path, **kwargs)
+            df.index = range(header_row + 1, header_row + 1 + len(df.index))
+        # The index is the Excel row number, recorded before blank rows are dropped.
         df = df.dropna(how="all")
 
         if col_start is not None or col_end is not None:
@@ -99,14 +155,103 @@ class ExcelReader:
 
         df.columns = self._normalize_columns(df.columns)
 
-        first_data_row = header_row + 1
-        if data_start_row and data_start_row > first_data_row:
-            drop_count = data_start_row - first_data_row
-            df = df.iloc[drop_count:]
-
-        df = df.reset_index(drop=True)
+        if data_start_row and data_start_row > header_row + 1:
+            df = df[df.index >= data_start_row]
         return df
 
+    def iter_dataframe(
+        self,
+        sheet_name: str,
+        header_row: int,
+        chunk_rows: int,
+        data_start_row: Optional[int] = None,
+        data_end_row: Optional[int] = None,
+        col_start: Optional[int] = None,
+        col_end: Optional[int] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """The rows of ``_read_dataframe`` in frames of up to ``chunk_rows``.
+
+        ``.xlsx``/``.xlsm`` files are streamed with openpyxl in read-only mode, so only one chunk
+        of the sheet is in memory at a time; other formats and cached sheets are sliced from
+        ``_read_dataframe``. At least one (possibly empty) frame is always yielded.
+        """
+        chunk_rows = max(chunk_rows, 1)
+        if sheet_name not in self._raw_cache and self.path.suffix.lower() in _STREAMABLE_SUFFIXES:
+            yield from self._stream_dataframe(
+                sheet_name, header_row, chunk_rows, data_start_row, data_end_row, col_start, col_end
+            )
+            return
+        df = self._read_dataframe(
+            sheet_name,
+            header_row,
+            data_start_row=data_start_row,
+            data_end_row=data_end_row,
+            col_start=col_start,
+            col_end=col_end,
+        )
+        if df.empty:
+            yield df
+            return
+        for offset in range(0, len(df.index), chunk_rows):
+            yield df.iloc[offset : offset + chunk_rows].copy()
+
+    def _stream_dataframe(
+        self,
+        sheet_name: str,
+        header_row: int,
+        chunk_rows: int,
+        data_start_row: Optional[int],
+        data_end_row: Optional[int],
+        col_start: Optional[int],
+        col_end: Optional[int],
+    ) -> Iterator[pd.DataFrame]:
+        workbook = load_workbook(self.path, read_only=True, data_only=True, keep_links=False)
+        try:
+            sheet = workbook[sheet_name]
+            # The declared dimension may be wrong (some writers emit "A1"); it only widens the frame.
+            declared_width = sheet.max_column or 0
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(min_row=header_row, max_row=data_end_row)
+            header = [self._convert_streamed_cell(cell) for cell in next(rows, ())]
+            while header and header[-1] is None:
+                header.pop()
+            width = max(len(header), declared_width, col_end or 0)
+            header += [None] * (width - len(header))
+            start_idx = (col_start or 1) - 1
+            columns = self._normalize_columns(self._header_names(header)[start_idx:col_end])
+            first_row = max(data_start_row or 0, header_row + 1)
+            index: List[int] = []
+            data: List[List[object]] = []
+            yielded = False
+            for excel_row, row in enumerate(rows, start=header_row + 1):
+                if excel_row < first_row:
+                    continue
+                values = [self._convert_streamed_cell(cell) for cell in row[:width]]
+                if all(value is None for value in values):
+                    continue
+                values += [None] * (width - len(values))
+                index.append(excel_row)
+                data.append(values[start_idx:col_end])
+                if len(data) >= chunk_rows:
+                    yield pd.DataFrame(data, index=index, columns=columns, dtype=object)
+                    index, data, yielded = [], [], True
+            if data or not yielded:
+                yield pd.DataFrame(data, index=index, columns=columns, dtype=object)
+        finally:
+            workbook.close()
+
+    def _convert_streamed_cell(self, cell: object) -> object:
+        """Cell value as ``read_excel(dtype=object)`` returns it, with ``None`` for missing values."""
+        value = getattr(cell, "value", None)
+        if value is None or getattr(cell, "data_type", None) == TYPE_ERROR:
+            return None
+        if isinstance(value, str):
+            return None if value in _NA_STRINGS else value
+        if getattr(cell, "data_type", None) == TYPE_NUMERIC and not isinstance(value, bool):
+            as_int = int(value)
+            return as_int if as_int == value else float(value)
+        return value
+
     def _normalize_cell(self, value: object) -> object:
         """Normalize pandas cell values for DB insertion."""
         if pd.isna(value):
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from PySide6.QtCore import QEventLoop, QObject, Signal
+
+T = TypeVar("T")
+
+
+class AsyncRunner(QObject):
+    """Runs an asyncio loop on a background thread and hands results back to the Qt thread.
+
+    ``submit`` schedules a coroutine and returns immediately; callbacks run on the Qt thread.
+    ``run``/``call`` wait for the result while the Qt event loop keeps processing events, so
+    the window repaints and the progress dialog's cancel button stays responsive. Because that
+    also delivers clicks, ``busy_changed`` reports when a wait starts and ends so the window
+    can block actions that must not run re-entrantly.
+    """
+
+    _completed = Signal(object)
+    busy_changed = Signal(bool)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ImportDataDB-async", daemon=True)
+        self._thread.start()
+        self._waits = 0
+        self._completed.connect(self._dispatch)
+
+    @property
+    def busy(self) -> bool:
+        return self._waits > 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(
+        self,
+        coro: Awaitable[T],
+        on_success: Optional[Callable[[T], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ) -> "Future[T]":
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        future.add_done_callback(lambda done: self._completed.emit((done, on_success, on_error)))
+        return future
+
+    def submit_call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Run a blocking function on the loop's executor (e.g. a ``DatabaseProvider`` call)."""
+
+        async def runner() -> T:
+            return await self._loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+        return self.submit(runner())
+
+    def run(self, coro: Awaitable[T]) -> T:
+        return self.wait(self.submit(coro))
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return self.wait(self.submit_call(func, *args, **kwargs))
+
+    def wait(self, future: "Future[T]") -> T:
+        if not future.done():
+            waiter = QEventLoop()
+            future.add_done_callback(lambda _: self._completed.emit((None, waiter.quit, None)))
+            if not future.done():
+                self._waits += 1
+                if self._waits == 1:
+                    self.busy_changed.emit(True)
+                try:
+                    waiter.exec()
+                finally:
+                    self._waits -= 1
+                    if self._waits == 0:
+                        self.busy_changed.emit(False)
+        return future.result()
+
+    def shutdown(self) -> None:
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+
+    def _dispatch(self, payload: object) -> None:
+        future, on_success, on_error = payload  # type: ignore[misc]
+        if future is None:
+            # Wake-up request from ``wait``.
+            on_success()
+            return
+        exc = future.exception()
+        if exc is not None:
+            if on_error:
+                on_error(exc)
+            return
+        if on_success:
+            on_success(future.result())
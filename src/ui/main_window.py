@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import time
 import traceback
 from collections import Counter
+from contextlib import closing
 from datetime import date
 from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import unicodedata
 
 import pandas as pd
@@ -44,12 +46,55 @@ from PySide6.QtWidgets import (
 )
 
 
+from src.core.coalesce import (
+    COALESCE_LAST,
+    COALESCE_MERGE_NON_NULL,
+    COALESCE_NONE,
+    CoalesceStats,
+    RecordCoalescer,
+)
+from src.core.fuzzy import FUZZY_MAX_CANDIDATES, FUZZY_MIN_SIMILARITY, FuzzyMatch, TrigramIndex
+from src.core.key_map import GeneratedKeyMap, find_key_map
+from src.core.lookups import UnresolvedForeignKeyError, add_lookup_pairs, build_lookup_dict, normalize_lookup_key
 from src.core.mapping import ForeignKeyLookup, MappingSelection
-from src.db.provider import ColumnInfo, DatabaseProvider
+from src.core.multi_table import MultiTableJob, PreparedTable, batch_support_error
+from src.core.pipeline import (
+    Chunk,
+    DropDuplicates,
+    ImportPipeline,
+    MapColumns,
+    ResolveForeignKeys,
+    SplitByLength,
+    ValidateLengths,
+    normalize_for_duplicates,
+    replace_values,
+    trim_whitespace,
+)
+from src.db.async_provider import AsyncDatabaseProvider
+from src.db.provider import (
+    COMMIT_ALL,
+    COMMIT_PARTITION,
+    DRIVER_PSYCOPG,
+    DRIVER_PSYCOPG2,
+    BlockingIndexBuildError,
+    ColumnInfo,
+    DatabaseProvider,
+    RejectedRow,
+    RowRejectionError,
+)
+from src.db.delete import DeleteReport, KeyDeleter
+from src.db.dry_run import DryRunner
+from src.db.lookup_cache import LookupCache, LookupCacheEntry
+from src.db.prefetch import LookupPrefetcher, PrefetchedLookup
+from src.db.staging import StagingLookup, StagingPipeline, StagingReport, find_new_rows, insert_returning_keys
+from src.db.sync import SoftDelete, SyncDiff, TableSynchronizer
 from src.excel.reader import ExcelReader, SheetPreview
+from src.ui.async_runner import AsyncRunner
 from src.ui.excel_selection_dialog import ExcelSelectionDialog
 from src.version import APP_NAME, __version__
 
+# Lookup tables estimated above this size are queried only for the labels present in the sheet.
+TARGETED_LOOKUP_MIN_ROWS = 5_000
 
 
 class MainWindow(QMainWindow):
@@ -59,13 +104,16 @@ class MainWindow(QMainWindow):
         self.resize(1200, 800)
 
         self.database = DatabaseProvider()
+        self.async_database = AsyncDatabaseProvider(self.database.settings)
+        self._async_runner = AsyncRunner(self)
+        self.lookup_cache = LookupCache(self.database)
         self.excel_reader: ExcelReader | None = None
         self.table_columns: List[ColumnInfo] = []
         self.primary_key_column: str | None = None
         self._current_header_excel_row_value = 1
         self._current_first_data_row = 2
+        self._current_preview_rows: List[int] = []
         self._manual_excel_selection_confirmed = False
-        self._foreign_columns_cache: dict[str, List[ColumnInfo]] = {}
         self._pre_validation_remove_duplicates = False
         self._pre_validation_trim_whitespace = False
         self._pre_validation_column: str | None = None
@@ -80,6 +128,15 @@ class MainWindow(QMainWindow):
         self._similarity_replacements: Dict[str, Dict[str, str]] = {}
         self._cancel_requested = False
         self._last_skipped_null_rows = 0
+        self._last_record_rows: List[int] = []
+        # Rows committed by a streamed INSERT, reported when it stops halfway.
+        self._streamed_rows = 0
+        self._last_created_fk_labels: Dict[str, int] = {}
+        self._last_coalesce_stats: CoalesceStats | None = None
+        self._fuzzy_indexes: Dict[tuple[str, str, str], TrigramIndex] = {}
+        self._fuzzy_conversion_file: Path | None = None
+        self._generated_key_maps: Dict[tuple[str, str], GeneratedKeyMap] = {}
+        self._batch_selections: List[MappingSelection] = []
         self.excel_file_path: Path | None = None
         self._last_conversion_file: Path | None = None
         self._relation_conversions: Dict[str, Dict[str, str]] = {}
@@ -93,16 +150,25 @@ class MainWindow(QMainWindow):
         self.user_edit = QLineEdit()
         self.pwd_edit = QLineEdit()
         self.pwd_edit.setEchoMode(QLineEdit.Password)
+        self.driver_combo = QComboBox()
+        self.driver_combo.addItem("psycopg2", DRIVER_PSYCOPG2)
+        self.driver_combo.addItem("psycopg 3 (pipeline + COPY binário)", DRIVER_PSYCOPG)
+        self.async_commit_checkbox = QCheckBox("Commit assíncrono nas gravações (synchronous_commit=off)")
+        self.async_commit_checkbox.setToolTip(
+            "Mais rápido em muitas transações pequenas, mas uma queda do servidor pode perder as últimas "
+            "transações já confirmadas (sem corromper dados). Desativado por padrão."
+        )
 
         self._build_menu()
         self._build_layout()
+        self._async_runner.busy_changed.connect(lambda busy: self._set_actions_enabled(not busy))
 
     def _build_menu(self) -> None:
-        open_action = QAction("Abrir Excel", self)
-        open_action.triggered.connect(self._choose_excel)
+        self.open_excel_action = QAction("Abrir Excel", self)
+        self.open_excel_action.triggered.connect(self._choose_excel)
         menubar = self.menuBar()
         file_menu = menubar.addMenu("Arquivo")
-        file_menu.addAction(open_action)
+        file_menu.addAction(self.open_excel_action)
 
     def _build_layout(self) -> None:
         central = QWidget()
@@ -311,9 +377,17 @@ class MainWindow(QMainWindow):
         panel = QGroupBox("Estrutura do Banco")
         layout = QVBoxLayout(panel)
 
+        tables_header = QHBoxLayout()
+        tables_header.addWidget(QLabel("Tabelas"))
+        tables_header.addStretch()
+        self.refresh_metadata_btn = QPushButton("Atualizar estrutura")
+        self.refresh_metadata_btn.setToolTip("Recarrega tabelas, colunas, chaves e índices do banco")
+        self.refresh_metadata_btn.clicked.connect(self._refresh_database_metadata)
+        tables_header.addWidget(self.refresh_metadata_btn)
+        layout.addLayout(tables_header)
+
         self.table_list = QListWidget()
         self.table_list.itemSelectionChanged.connect(self._on_table_selected)
-        layout.addWidget(QLabel("Tabelas"))
         layout.addWidget(self.table_list)
 
         self.columns_list = QListWidget()
@@ -462,13 +536,24 @@ class MainWindow(QMainWindow):
         self.fk_trim_checkbox.toggled.connect(lambda checked: setattr(self, "_fk_trim_whitespace", bool(checked)))
         fk_layout.addWidget(self.fk_trim_checkbox)
 
+        self.fk_create_missing_checkbox = QCheckBox(
+            "Criar na tabela estrangeira as descrições não encontradas (não é desfeito se a importação falhar)"
+        )
+        self.fk_create_missing_checkbox.setToolTip(
+            "Na execução, depois de ler toda a planilha, insere de uma vez as descrições ausentes (ON CONFLICT na "
+            "coluna de descrição) e usa os IDs gerados (apenas em INSERT e UPDATE). Essa inserção é confirmada "
+            "antes da gravação principal, em transação própria: as descrições criadas permanecem mesmo se a "
+            "importação falhar, for cancelada ou desfeita depois."
+        )
+        fk_layout.addWidget(self.fk_create_missing_checkbox)
+
         self.add_fk_btn = QPushButton("Adicionar relacionamento")
         self.add_fk_btn.clicked.connect(self._add_fk_lookup)
         fk_layout.addWidget(self.add_fk_btn)
 
-        self.fk_table = QTableWidget(0, 5)
+        self.fk_table = QTableWidget(0, 6)
         self.fk_table.setHorizontalHeaderLabels(
-            ["Coluna Tabela", "Coluna Excel", "Tabela FK", "Coluna ID", "Coluna Descrição"]
+            ["Coluna Tabela", "Coluna Excel", "Tabela FK", "Coluna ID", "Coluna Descrição", "Criar ausentes"]
         )
         self.fk_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         fk_layout.addWidget(self.fk_table)
@@ -486,6 +571,19 @@ class MainWindow(QMainWindow):
         conversion_layout.addWidget(self.fk_conversion_status, 1)
         fk_layout.addLayout(conversion_layout)
 
+        key_map_layout = QHBoxLayout()
+        self.key_map_btn = QPushButton("Importar chaves geradas...")
+        self.key_map_btn.setToolTip(
+            "Carrega arquivos *_chaves_geradas.csv de importações anteriores: relacionamentos com aquelas "
+            "tabelas são resolvidos pelo arquivo, sem consultar o banco."
+        )
+        self.key_map_btn.clicked.connect(self._load_generated_key_maps)
+        key_map_layout.addWidget(self.key_map_btn)
+        self.key_map_status = QLabel("Sem chaves geradas carregadas")
+        self.key_map_status.setWordWrap(True)
+        key_map_layout.addWidget(self.key_map_status, 1)
+        fk_layout.addLayout(key_map_layout)
+
         section_layout.addWidget(fk_group)
         return section
 
@@ -498,19 +596,123 @@ class MainWindow(QMainWindow):
         self.insert_radio = QRadioButton("INSERT")
         self.insert_radio.setChecked(True)
         self.update_radio = QRadioButton("UPDATE")
+        self.sync_radio = QRadioButton("SYNC")
+        self.sync_radio.setToolTip(
+            "Espelha a planilha na tabela pela coluna de chave: insere as novas, altera as diferentes e "
+            "exclui (ou marca) as que não estão na planilha, numa única transação."
+        )
         operation_layout.addWidget(self.insert_radio)
         operation_layout.addWidget(self.update_radio)
+        self.delete_radio = QRadioButton("DELETE")
+        self.delete_radio.setToolTip(
+            "Exclui as linhas cujas chaves (coluna de junção) estão na planilha; antes de confirmar, "
+            "mostra quantas chaves foram encontradas."
+        )
+        operation_layout.addWidget(self.sync_radio)
+        operation_layout.addWidget(self.delete_radio)
         section_layout.addLayout(operation_layout)
 
         join_layout = QHBoxLayout()
-        join_layout.addWidget(QLabel("Coluna de junção (UPDATE)"))
+        join_layout.addWidget(QLabel("Coluna de junção / chave"))
         self.join_combo = QComboBox()
         self.join_combo.setMinimumContentsLength(12)
         self.join_combo.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
         self.join_combo.currentTextChanged.connect(lambda text: self._set_combo_tooltip(self.join_combo, text))
         join_layout.addWidget(self.join_combo)
+        join_layout.addWidget(QLabel("Chaves repetidas"))
+        self.coalesce_combo = QComboBox()
+        self.coalesce_combo.addItem("Gravar todas", COALESCE_NONE)
+        self.coalesce_combo.addItem("Manter a última", COALESCE_LAST)
+        self.coalesce_combo.addItem("Mesclar não nulos", COALESCE_MERGE_NON_NULL)
+        self.coalesce_combo.setToolTip(
+            "UPDATE e SYNC: agrupa linhas com a mesma chave de junção enquanto a planilha é lida. 'Manter a última' fica com "
+            "a última linha; 'Mesclar não nulos' combina as linhas, ignorando células vazias."
+        )
+        join_layout.addWidget(self.coalesce_combo)
         section_layout.addLayout(join_layout)
 
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Conexões paralelas"))
+        self.parallelism_spin = QSpinBox()
+        self.parallelism_spin.setMinimum(1)
+        self.parallelism_spin.setMaximum(self.database.max_parallelism())
+        self.parallelism_spin.setValue(1)
+        self.parallelism_spin.setToolTip(
+            "Divide os registros em partições gravadas ao mesmo tempo (INSERT pela chave primária/única "
+            "quando presente, senão por faixa de linhas; UPDATE pela coluna de junção)."
+        )
+        parallel_layout.addWidget(self.parallelism_spin)
+        self.commit_mode_combo = QComboBox()
+        self.commit_mode_combo.addItem("Tudo ou nada", COMMIT_ALL)
+        self.commit_mode_combo.addItem("Confirmar por partição", COMMIT_PARTITION)
+        self.commit_mode_combo.setToolTip(
+            "Tudo ou nada: só confirma se todas as partições gravarem sem erro. Com max_prepared_transactions "
+            "> 0 no servidor a confirmação usa PREPARE TRANSACTION; sem isso, uma falha durante a confirmação "
+            "(ex.: conexão perdida) pode deixar partições já confirmadas, informadas no erro. "
+            "Por partição: cada partição confirma sozinha e os erros são listados ao final."
+        )
+        parallel_layout.addWidget(self.commit_mode_combo)
+        parallel_layout.addStretch()
+        section_layout.addLayout(parallel_layout)
+
+        self.skip_existing_checkbox = QCheckBox("INSERT: inserir só linhas novas (chave = coluna de junção)")
+        self.skip_existing_checkbox.setToolTip(
+            "Envia as chaves da planilha para uma tabela temporária e, com um anti-join no servidor, "
+            "descarta as linhas cuja chave já existe na tabela de destino."
+        )
+        section_layout.addWidget(self.skip_existing_checkbox)
+
+        soft_delete_layout = QHBoxLayout()
+        self.soft_delete_checkbox = QCheckBox("SYNC: exclusão lógica em")
+        self.soft_delete_checkbox.setToolTip(
+            "Em vez de excluir as linhas ausentes da planilha, grava o valor 'excluído' na coluna escolhida; "
+            "linhas que voltam à planilha recebem o valor 'ativo'."
+        )
+        self.soft_delete_combo = QComboBox()
+        self.soft_delete_combo.setEnabled(False)
+        self.soft_deleted_edit = QLineEdit("false")
+        self.soft_deleted_edit.setEnabled(False)
+        self.soft_active_edit = QLineEdit("true")
+        self.soft_active_edit.setEnabled(False)
+        for widget in (self.soft_delete_combo, self.soft_deleted_edit, self.soft_active_edit):
+            self.soft_delete_checkbox.toggled.connect(widget.setEnabled)
+        soft_delete_layout.addWidget(self.soft_delete_checkbox)
+        soft_delete_layout.addWidget(self.soft_delete_combo)
+        soft_delete_layout.addWidget(QLabel("excluído"))
+        soft_delete_layout.addWidget(self.soft_deleted_edit)
+        soft_delete_layout.addWidget(QLabel("ativo"))
+        soft_delete_layout.addWidget(self.soft_active_edit)
+        soft_delete_layout.addStretch()
+        section_layout.addLayout(soft_delete_layout)
+
+        self.server_validation_checkbox = QCheckBox("Validar e resolver FKs no servidor (tabela de staging)")
+        self.server_validation_checkbox.setToolTip(
+            "INSERT: envia os dados brutos para uma tabela temporária, resolve as FKs e valida tamanho, "
+            "obrigatórios e tipos no PostgreSQL; só insere se não houver violações."
+        )
+        section_layout.addWidget(self.server_validation_checkbox)
+
+        self.isolate_errors_checkbox = QCheckBox("Isolar linhas com erro (grava as válidas e gera arquivo de rejeitados)")
+        self.isolate_errors_checkbox.setToolTip(
+            "Quando um lote falha, ele é dividido ao meio repetidamente (savepoints) até achar as linhas "
+            "recusadas pelo banco; as demais são confirmadas."
+        )
+        section_layout.addWidget(self.isolate_errors_checkbox)
+
+        bulk_layout = QHBoxLayout()
+        self.fast_bulk_checkbox = QCheckBox("Carga rápida (recria índices e roda ANALYZE ao final)")
+        self.fast_bulk_checkbox.setToolTip(
+            "INSERT: remove os índices secundários, carrega, recria os índices e roda ANALYZE numa única "
+            "transação. Indicado para cargas grandes em tabelas vazias ou de staging; bloqueia a tabela."
+        )
+        self.disable_triggers_checkbox = QCheckBox("Desativar triggers durante a carga")
+        self.disable_triggers_checkbox.setEnabled(False)
+        self.fast_bulk_checkbox.toggled.connect(self.disable_triggers_checkbox.setEnabled)
+        bulk_layout.addWidget(self.fast_bulk_checkbox)
+        bulk_layout.addWidget(self.disable_triggers_checkbox)
+        bulk_layout.addStretch()
+        section_layout.addLayout(bulk_layout)
+
         pre_validation_layout = QHBoxLayout()
         self.pre_validation_btn = QPushButton("Pré-validação...")
         self.pre_validation_btn.clicked.connect(self._open_pre_validation)
@@ -543,10 +745,40 @@ class MainWindow(QMainWindow):
         self.generate_sql_btn.clicked.connect(self._generate_preview)
         section_layout.addWidget(self.generate_sql_btn)
 
+        self.dry_run_btn = QPushButton("Simular no banco (dry-run)")
+        self.dry_run_btn.setToolTip(
+            "Executa uma amostra real numa transação desfeita ao final, com EXPLAIN ANALYZE, "
+            "e estima o tempo total e o volume de WAL."
+        )
+        self.dry_run_btn.clicked.connect(self._dry_run)
+        section_layout.addWidget(self.dry_run_btn)
+
         self.execute_btn = QPushButton("Executar")
         self.execute_btn.clicked.connect(self._execute)
         section_layout.addWidget(self.execute_btn)
 
+        batch_group = QGroupBox("Lote multi-tabela")
+        batch_layout = QVBoxLayout(batch_group)
+        self.batch_status = QLabel("Lote vazio")
+        self.batch_status.setWordWrap(True)
+        batch_layout.addWidget(self.batch_status)
+        batch_buttons = QHBoxLayout()
+        self.add_to_batch_btn = QPushButton("Adicionar mapeamento ao lote")
+        self.add_to_batch_btn.setToolTip(
+            "Guarda o mapeamento atual (aba -> tabela). O lote lê a planilha uma vez, ordena as tabelas pelas FKs, "
+            "grava em paralelo as independentes e usa os IDs gerados nas tabelas seguintes."
+        )
+        self.add_to_batch_btn.clicked.connect(self._add_to_batch)
+        batch_buttons.addWidget(self.add_to_batch_btn)
+        self.clear_batch_btn = QPushButton("Limpar lote")
+        self.clear_batch_btn.clicked.connect(self._clear_batch)
+        batch_buttons.addWidget(self.clear_batch_btn)
+        self.execute_batch_btn = QPushButton("Executar lote")
+        self.execute_batch_btn.clicked.connect(self._execute_batch)
+        batch_buttons.addWidget(self.execute_batch_btn)
+        batch_layout.addLayout(batch_buttons)
+        section_layout.addWidget(batch_group)
+
         return section
 
     # Preview panel
@@ -652,6 +884,9 @@ class MainWindow(QMainWindow):
         grid.addWidget(self.user_edit, 3, 1)
         grid.addWidget(QLabel("Senha"), 4, 0)
         grid.addWidget(self.pwd_edit, 4, 1)
+        grid.addWidget(QLabel("Driver"), 5, 0)
+        grid.addWidget(self.driver_combo, 5, 1)
+        grid.addWidget(self.async_commit_checkbox, 6, 0, 1, 2)
         layout.addLayout(grid)
 
         buttons = QHBoxLayout()
@@ -677,11 +912,19 @@ class MainWindow(QMainWindow):
             database = self.db_edit.text().strip()
             user = self.user_edit.text().strip()
             pwd = self.pwd_edit.text()
+            self.database.settings.driver = self.driver_combo.currentData() or DRIVER_PSYCOPG2
+            self.database.settings.bulk_synchronous_commit = "off" if self.async_commit_checkbox.isChecked() else None
             self.database.connect(host, port, database, user, pwd)
-            self._foreign_columns_cache = {}
+            self._connect_async_db(host, port, database, user, pwd)
+            # Generated keys are only valid on the database they were generated on.
+            self._generated_key_maps.clear()
+            self._refresh_key_map_hint()
             self._load_tables()
             connection_text = f"Conectado: {user or 'usuário'}@{host}:{port}/{database}"
-            self.connection_status_label.setText(connection_text)
+            health = self.database.health()
+            self.connection_status_label.setText(f"{connection_text} | {health.summary()}")
+            if health.server_version:
+                self.connection_status_label.setToolTip(f"PostgreSQL {health.server_version}")
             QMessageBox.information(self, "Banco", "Conexão realizada com sucesso")
             return True
         except Exception as exc:  # noqa: BLE001
@@ -690,6 +933,67 @@ class MainWindow(QMainWindow):
             self._set_db_step_ready(False)
             return False
 
+    def _connect_async_db(self, host: str, port: int, database: str, user: str, pwd: str) -> None:
+        """Open the asyncio pool used for concurrent lookups; the app keeps working without it."""
+        if not self.async_database.available:
+            return
+        try:
+            self._async_runner.run(self.async_database.connect(host, port, database, user, pwd))
+        except Exception:  # noqa: BLE001
+            traceback.print_exc()
+            self._async_runner.run(self.async_database.dispose())
+
+    def _set_actions_enabled(self, enabled: bool) -> None:
+        """Block the actions that read or write shared import state while a database call is awaited."""
+        for action in (
+            self.connection_btn,
+            self.import_excel_btn,
+            self.refresh_sheet_btn,
+            self.refresh_metadata_btn,
+            self.pre_validation_btn,
+            self.similarity_btn,
+            self.generate_sql_btn,
+            self.dry_run_btn,
+            self.execute_btn,
+            self.add_to_batch_btn,
+            self.clear_batch_btn,
+            self.execute_batch_btn,
+            self.export_csv_btn,
+            self.export_excel_btn,
+            self.open_excel_action,
+        ):
+            action.setEnabled(enabled)
+
+    def closeEvent(self, event) -> None:  # noqa: N802
+        if self._async_runner.busy:
+            # The awaiting call still runs on this window's state; it must finish (or be cancelled) first.
+            QMessageBox.information(self, "Importação", "Aguarde a operação em andamento terminar ou cancele-a.")
+            event.ignore()
+            return
+        try:
+            self._async_runner.run(self.async_database.dispose())
+            self.database.dispose()
+        finally:
+            self._async_runner.shutdown()
+        super().closeEvent(event)
+
+    def _refresh_database_metadata(self) -> None:
+        if not self.database.engine:
+            QMessageBox.warning(self, "Banco", "Conecte ao banco antes de atualizar a estrutura.")
+            return
+        selected = [item.text() for item in self.table_list.selectedItems()]
+        try:
+            self.database.refresh_metadata()
+            self.lookup_cache.clear()
+            self._load_tables()
+        except Exception as exc:  # noqa: BLE001
+            self._show_error("Erro ao atualizar estrutura", exc)
+            return
+        if selected:
+            matches = self.table_list.findItems(selected[0], Qt.MatchExactly)
+            if matches:
+                self.table_list.setCurrentItem(matches[0])
+
     def _load_tables(self) -> None:
         self.table_list.clear()
         self._set_db_step_ready(False)
@@ -757,7 +1061,7 @@ class MainWindow(QMainWindow):
             return False
         if all(val.startswith("Coluna_") for val in values):
             return False
-        new_header_row = current_header_row + 1
+        new_header_row = int(preview.sample.index[0])
         if new_header_row == current_header_row:
             return False
         # Update spin and rerun preview with the next row as header.
@@ -769,6 +1073,7 @@ class MainWindow(QMainWindow):
         df = preview.sample
         self._current_header_excel_row_value = preview.header_row
         self._current_first_data_row = first_data_row
+        self._current_preview_rows = [int(excel_row) for excel_row in df.index]
 
         self.sheet_preview_table.clear()
         total_rows = len(df.index)
@@ -782,7 +1087,7 @@ class MainWindow(QMainWindow):
         self.sheet_preview_table.setColumnCount(len(preview.columns))
         self.sheet_preview_table.setHorizontalHeaderLabels(preview.columns)
 
-        row_labels = [str(first_data_row + idx) for idx in range(len(df.index))]
+        row_labels = [str(excel_row) for excel_row in self._current_preview_rows]
         self.sheet_preview_table.setVerticalHeaderLabels(row_labels)
 
         for row_idx, (_, row) in enumerate(df.iterrows(), start=0):
@@ -892,60 +1197,13 @@ class MainWindow(QMainWindow):
         )
 
     def _excel_row_from_table_row(self, row_idx: int) -> int:
+        if 0 <= row_idx < len(self._current_preview_rows):
+            return self._current_preview_rows[row_idx]
         first_data_row = getattr(self, "_current_first_data_row", 2)
         return first_data_row + row_idx
 
     def _normalize_lookup_key(self, value: object) -> str:
-        if value is None:
-            return ""
-        try:
-            if pd.isna(value):
-                return ""
-        except Exception:
-            # pd.isna may not support the value type; ignore and continue.
-            pass
-        text = str(value)
-        if self._fk_trim_whitespace:
-            text = text.strip()
-        return text.casefold()
-
-    def _apply_fk_conversion(self, column: str, value: object) -> object:
-        if value is None:
-            return value
-        mapping = self._relation_conversions.get(column)
-        if not mapping:
-            return value
-        text = str(value)
-        if self._fk_trim_whitespace:
-            text = text.strip()
-        return mapping.get(text, value)
-
-    def _normalize_for_duplicates(self, value: object) -> str:
-        if value is None:
-            return ""
-        try:
-            if pd.isna(value):
-                return ""
-        except Exception:
-            pass
-        text = str(value)
-        text = " ".join(text.split())
-        normalized = unicodedata.normalize("NFKD", text)
-        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
-        return normalized.casefold()
-
-    def _is_nullish(self, value: object) -> bool:
-        if value is None:
-            return True
-        try:
-            if pd.isna(value):
-                return True
-        except Exception:
-            pass
-        text = str(value)
-        if not text.strip():
-            return True
-        return False
+        return normalize_lookup_key(value, self._fk_trim_whitespace)
 
     def _normalize_similarity_text(self, text: str) -> str:
         cleaned = " ".join(text.split())
@@ -969,19 +1227,6 @@ class MainWindow(QMainWindow):
             return True
         return False
 
-    def _trim_cell_whitespace(self, value: object) -> object:
-        if isinstance(value, str):
-            return value.strip()
-        return value
-
-    def _trim_dataframe_whitespace(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
-        target_columns = columns or list(df.columns)
-        for col in target_columns:
-            if col not in df.columns:
-                continue
-            df[col] = df[col].map(self._trim_cell_whitespace)
-        return df
-
     def _current_fk_columns(self) -> set[str]:
         cols: set[str] = set()
         for row in range(self.fk_table.rowCount()):
@@ -1114,6 +1359,39 @@ class MainWindow(QMainWindow):
             f"Arquivo de conversões carregado.\nColunas: {len(conversions)} | Substituições: {sum(len(m) for m in conversions.values())}",
         )
 
+    def _load_generated_key_maps(self) -> None:
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, "Importar chaves geradas", str(self.excel_file_path or Path.home()), "CSV (*.csv)"
+        )
+        for path in paths:
+            try:
+                key_map = GeneratedKeyMap.read_csv(Path(path))
+            except Exception as exc:  # noqa: BLE001
+                QMessageBox.warning(self, "Chaves geradas", f"Erro ao ler {path}: {exc}")
+                continue
+            if key_map.source is None or key_map.source != self.database.identity:
+                QMessageBox.warning(
+                    self,
+                    "Chaves geradas",
+                    f"{path} não foi gerado no banco conectado ({key_map.source or 'origem desconhecida'}); ignorado.",
+                )
+                continue
+            self._generated_key_maps[(key_map.table, key_map.primary_key)] = key_map
+        self._refresh_key_map_hint()
+
+    def _forget_key_maps(self, tables: set[str]) -> None:
+        """Drop the key maps of ``tables``: once written again they may share labels with other rows."""
+        for map_key in [map_key for map_key in self._generated_key_maps if map_key[0] in tables]:
+            del self._generated_key_maps[map_key]
+        self._refresh_key_map_hint()
+
+    def _refresh_key_map_hint(self) -> None:
+        if not self._generated_key_maps:
+            self.key_map_status.setText("Sem chaves geradas carregadas")
+            return
+        parts = [f"{table}.{pk}: {len(key_map.keys)}" for (table, pk), key_map in self._generated_key_maps.items()]
+        self.key_map_status.setText("Chaves geradas: " + ", ".join(parts))
+
     def _refresh_fk_table_options(self) -> None:
         tables = self.database.list_tables()
         self.fk_table_combo.blockSignals(True)
@@ -1134,11 +1412,7 @@ class MainWindow(QMainWindow):
         self.fk_label_combo.clear()
         if not table:
             return
-        columns = self._foreign_columns_cache.get(table)
-        if columns is None:
-            columns = self.database.get_columns(table)
-            self._foreign_columns_cache[table] = columns
-        for col in columns:
+        for col in self.database.get_columns(table):
             label = f"{col.name} ({col.type})"
             self.fk_id_combo.addItem(label, col.name)
             self.fk_label_combo.addItem(label, col.name)
@@ -1162,6 +1436,8 @@ class MainWindow(QMainWindow):
         self.fk_table.setItem(row, 2, QTableWidgetItem(foreign_table))
         self.fk_table.setItem(row, 3, QTableWidgetItem(foreign_id))
         self.fk_table.setItem(row, 4, QTableWidgetItem(foreign_label))
+        create_missing = "Sim" if self.fk_create_missing_checkbox.isChecked() else "Não"
+        self.fk_table.setItem(row, 5, QTableWidgetItem(create_missing))
         self._refresh_fk_target_options()
         self._refresh_default_column_options()
         self._refresh_required_columns_hint()
@@ -1185,6 +1461,7 @@ class MainWindow(QMainWindow):
             table_item = self.fk_table.item(row, 2)
             id_item = self.fk_table.item(row, 3)
             label_item = self.fk_table.item(row, 4)
+            create_item = self.fk_table.item(row, 5)
             if not target_item or not excel_item or not table_item or not id_item or not label_item:
                 continue
             lookups.append(
@@ -1194,6 +1471,7 @@ class MainWindow(QMainWindow):
                     foreign_table=table_item.text(),
                     foreign_id_column=id_item.text(),
                     foreign_label_column=label_item.text(),
+                    create_missing=bool(create_item and create_item.text() == "Sim"),
                 )
             )
         return lookups
@@ -1490,6 +1768,9 @@ class MainWindow(QMainWindow):
         self.pk_auto_checkbox.setChecked(False)
         self.insert_radio.setChecked(True)
         self.update_radio.setChecked(False)
+        self.sync_radio.setChecked(False)
+        self.delete_radio.setChecked(False)
+        self.soft_delete_checkbox.setChecked(False)
         self.sheet_columns_list.clearSelection()
         self.table_columns_list.clearSelection()
         self.mapping_table.clearSelection()
@@ -1505,6 +1786,8 @@ class MainWindow(QMainWindow):
         self._last_skipped_null_rows = 0
         self._last_conversion_file = None
         self._relation_conversions = {}
+        self._fuzzy_indexes = {}
+        self._fuzzy_conversion_file = None
         self._refresh_fk_conversion_hint()
 
     def _on_table_selected(self) -> None:
@@ -1517,6 +1800,7 @@ class MainWindow(QMainWindow):
         self.columns_list.clear()
         self.table_columns_list.clear()
         self.join_combo.clear()
+        self.soft_delete_combo.clear()
         self.mapping_table.setRowCount(0)
         self.defaults_table.setRowCount(0)
         self.fk_table.setRowCount(0)
@@ -1532,6 +1816,7 @@ class MainWindow(QMainWindow):
             self.columns_list.addItem(label)
             self.table_columns_list.addItem(col.name)
             self.join_combo.addItem(col.name)
+            self.soft_delete_combo.addItem(col.name)
         self._set_combo_tooltip(self.join_combo)
         if self.primary_key_column:
             self.pk_auto_checkbox.setEnabled(True)
@@ -1591,6 +1876,15 @@ class MainWindow(QMainWindow):
         self._refresh_default_column_options()
         self._refresh_required_columns_hint()
 
+    def _current_operation(self) -> str:
+        if self.update_radio.isChecked():
+            return "UPDATE"
+        if self.sync_radio.isChecked():
+            return "SYNC"
+        if self.delete_radio.isChecked():
+            return "DELETE"
+        return "INSERT"
+
     def _collect_mapping(self) -> MappingSelection | None:
         sheet_items = self.sheet_list.selectedItems()
         table_items = self.table_list.selectedItems()
@@ -1605,14 +1899,39 @@ class MainWindow(QMainWindow):
                 mapping.append((sheet_col_item.text(), table_col_item.text()))
         defaults = self._collect_default_values()
         fk_lookups = self._collect_fk_lookups()
-        join_column = self.join_combo.currentText() if self.update_radio.isChecked() else None
+        operation = self._current_operation()
+        join_column = self.join_combo.currentText() if operation in ("UPDATE", "SYNC", "DELETE") else None
         mapping_targets = {table_col for _, table_col in mapping}
         covered_join = mapping_targets | set(defaults.keys()) | {fk.target_column for fk in fk_lookups}
         if join_column and join_column not in covered_join:
             QMessageBox.warning(
                 self,
                 "Mapeamento",
-                "Para UPDATE, a coluna de junção precisa estar mapeada/definida para evitar falhas",
+                f"Para {operation}, a coluna de junção precisa estar mapeada/definida para evitar falhas",
+            )
+            return None
+        soft_delete_column = (
+            self.soft_delete_combo.currentText() or None
+            if operation == "SYNC" and self.soft_delete_checkbox.isChecked()
+            else None
+        )
+        if soft_delete_column and soft_delete_column in covered_join:
+            QMessageBox.warning(
+                self,
+                "Mapeamento",
+                "A coluna de exclusão lógica é preenchida pelo SYNC e não pode estar mapeada/definida",
+            )
+            return None
+        skip_existing_key = (
+            self.join_combo.currentText() or None
+            if operation == "INSERT" and self.skip_existing_checkbox.isChecked()
+            else None
+        )
+        if skip_existing_key and skip_existing_key not in covered_join:
+            QMessageBox.warning(
+                self,
+                "Mapeamento",
+                "Para inserir só linhas novas, a coluna de chave precisa estar mapeada/definida",
             )
             return None
         autogenerate_pk = bool(
@@ -1625,7 +1944,7 @@ class MainWindow(QMainWindow):
         if not mapping and not defaults and not fk_lookups:
             QMessageBox.warning(self, "Mapeamento", "Adicione ao menos um mapeamento ou valor padrão")
             return None
-        if not self.update_radio.isChecked():
+        if operation in ("INSERT", "SYNC"):
             missing_required = self._missing_required_columns(mapping, defaults, autogenerate_pk, fk_lookups)
             if missing_required:
                 QMessageBox.warning(
@@ -1650,7 +1969,7 @@ class MainWindow(QMainWindow):
             column_mapping=mapping,
             default_values=defaults,
             fk_lookups=fk_lookups,
-            operation="UPDATE" if self.update_radio.isChecked() else "INSERT",
+            operation=operation,
             join_column=join_column,
             primary_key=self.primary_key_column,
             autogenerate_pk=autogenerate_pk,
@@ -1662,6 +1981,17 @@ class MainWindow(QMainWindow):
             split_operator=self._split_operator if self._split_enabled else None,
             split_length=self._split_length if self._split_enabled else None,
             split_extra_column=self._split_extra_name if self._split_enabled else None,
+            parallelism=self.parallelism_spin.value(),
+            commit_mode=self.commit_mode_combo.currentData() or COMMIT_ALL,
+            server_side_validation=self.server_validation_checkbox.isChecked() and operation == "INSERT",
+            isolate_errors=self.isolate_errors_checkbox.isChecked(),
+            fast_bulk_load=self.fast_bulk_checkbox.isChecked() and operation == "INSERT",
+            disable_triggers=self.fast_bulk_checkbox.isChecked() and self.disable_triggers_checkbox.isChecked(),
+            coalesce_policy=self.coalesce_combo.currentData() or COALESCE_NONE,
+            skip_existing_key=skip_existing_key,
+            soft_delete_column=soft_delete_column,
+            soft_deleted_value=self.soft_deleted_edit.text().strip() if soft_delete_column else None,
+            soft_active_value=self.soft_active_edit.text().strip() if soft_delete_column else None,
         )
 
     def _current_sheet_columns(self) -> List[str]:
@@ -1686,10 +2016,10 @@ class MainWindow(QMainWindow):
         if column not in df.columns:
             raise ValueError(f"Coluna '{column}' não encontrada na seleção atual")
         # Sempre ignora espaços extras no cálculo de duplicados para não contar valores iguais como distintos.
-        df = self._trim_dataframe_whitespace(df, [column])
+        df = trim_whitespace(df, [column])
         if self._similarity_replacements:
-            df = self._apply_similarity_replacements(df, self._similarity_replacements)
-        normalized_series = df[column].map(self._normalize_for_duplicates)
+            df = replace_values(df, self._similarity_replacements)
+        normalized_series = df[column].map(normalize_for_duplicates)
         total_rows = len(normalized_series.index)
         unique_rows = len(normalized_series.drop_duplicates().index)
         return total_rows, unique_rows
@@ -1710,7 +2040,7 @@ class MainWindow(QMainWindow):
         if column not in df.columns:
             raise ValueError(f"Coluna '{column}' não encontrada na seleção atual")
         if self._pre_validation_trim_whitespace:
-            df = self._trim_dataframe_whitespace(df, [column])
+            df = trim_whitespace(df, [column])
 
         values: List[str] = []
         for raw in df[column]:
@@ -1892,6 +2222,7 @@ class MainWindow(QMainWindow):
                 for fk in selection.fk_lookups:
                     text.append(
                         f"- {fk.target_column} <= {fk.foreign_table}.{fk.foreign_id_column} via {fk.foreign_label_column} = Excel[{fk.excel_column}]"
+                        + (" (descrições ausentes serão criadas)" if fk.create_missing else "")
                     )
             if selection.remove_duplicate_rows and selection.duplicate_check_column:
                 text.append("")
@@ -1910,11 +2241,77 @@ class MainWindow(QMainWindow):
                     removed = max(total - unique, 0)
                     duplicate_summary += f" (previsto remover {removed} de {total} linhas)"
                 text.append(duplicate_summary)
+            if selection.operation == "SYNC" and selection.join_column and self.database.engine:
+                records = self._build_records_for_selection(selection)
+                progress = self._create_progress_dialog("Pré-visualização", "Calculando as diferenças no banco...")
+                try:
+                    diff = self._async_runner.call(
+                        TableSynchronizer(self.database).preview,
+                        selection.table_name,
+                        records,
+                        selection.join_column,
+                        self._soft_delete_for(selection),
+                    )
+                finally:
+                    progress.close()
+                text.extend(["", diff.summary()])
             text.extend(["", "SQL estimado:", sql_example])
             self.preview_text.setPlainText("\n".join(text))
         except Exception as exc:  # noqa: BLE001
             self._show_error("Erro ao pré-visualizar", exc)
 
+    def _dry_run(self) -> None:
+        selection = self._collect_mapping()
+        if not selection or not self.excel_reader:
+            return
+        if not self.database.engine:
+            QMessageBox.warning(self, "Dry-run", "Conecte ao banco antes de simular.")
+            return
+        if selection.operation == "SYNC":
+            QMessageBox.information(
+                self, "Dry-run", "Para SYNC, use 'Gerar pré-visualização': ela calcula as diferenças no banco."
+            )
+            return
+        if selection.operation in ("UPDATE", "DELETE") and not selection.join_column:
+            QMessageBox.warning(self, selection.operation, "Selecione uma coluna de junção")
+            return
+        progress: QProgressDialog | None = None
+        try:
+            self._cancel_requested = False
+            progress = self._create_progress_dialog("Dry-run", "Executando amostra no banco (será desfeita)...")
+            records = self._build_records_resolving_typos(selection, cancel_checker=lambda: bool(self._cancel_requested))
+            if self._cancel_requested:
+                return
+            if selection.operation == "DELETE":
+                delete_report = self._async_runner.call(
+                    KeyDeleter(self.database).preview, selection.table_name, records, [selection.join_column]
+                )
+                self.preview_text.setPlainText(
+                    f"Simulação (dry-run) de DELETE em {selection.table_name} — transação desfeita ao final\n"
+                    + delete_report.summary()
+                )
+                return
+            report = self._async_runner.call(
+                DryRunner(self.database).run,
+                selection.operation,
+                selection.table_name,
+                records,
+                join_column=selection.join_column,
+                autogenerate_pk=selection.autogenerate_pk,
+                primary_key=selection.primary_key,
+                coalesce_policy=selection.coalesce_policy,
+            )
+            self.preview_text.setPlainText(report.summary())
+        except RuntimeError as exc:
+            if "cancelada" not in str(exc).lower():
+                self._show_error("Erro no dry-run", exc)
+        except Exception as exc:  # noqa: BLE001
+            self._show_error("Erro no dry-run", exc)
+        finally:
+            if progress:
+                progress.close()
+            self._cancel_requested = False
+
     def _build_sql_example(self, selection: MappingSelection) -> str:
         cols: List[str] = []
         for _, c in selection.column_mapping:
@@ -1935,49 +2332,63 @@ class MainWindow(QMainWindow):
                 cols.append(c)
         if selection.operation == "INSERT":
             generated_cols: List[str] = []
-            generated_values: List[str] = []
-            if (
-                selection.autogenerate_pk
-                and selection.table_name == "estoque"
-                and selection.primary_key == "codigo_fixo"
-            ):
-                generated_cols.append("codigo_fixo")
-                generated_values.append("LPAD(nextval('public.codigo_fixo_estoque_seq'::regclass)::text, 5, '0')")
+            reservation = ""
+            spec = (
+                self.database.generated_key_spec(selection.table_name, selection.primary_key)
+                if selection.autogenerate_pk and selection.primary_key
+                else None
+            )
+            if spec:
+                generated_cols.append(spec.column)
+                reservation = (
+                    f"-- {spec.column} reservado em lote: "
+                    f"SELECT nextval('{spec.sequence}') FROM generate_series(1, <linhas>);\n"
+                )
             all_cols = [*generated_cols, *cols]
-            placeholders = ", ".join([*generated_values, *(f":{c}" for c in cols)])
-            return f"INSERT INTO {selection.table_name} ({', '.join(all_cols)}) VALUES ({placeholders});"
+            placeholders = ", ".join(f":{c}" for c in all_cols)
+            return f"{reservation}INSERT INTO {selection.table_name} ({', '.join(all_cols)}) VALUES ({placeholders});"
+        if selection.operation == "DELETE":
+            key = selection.join_column
+            return (
+                f"-- chaves da planilha copiadas (COPY) para tmp_{selection.table_name}\n"
+                f"DELETE FROM {selection.table_name} t USING tmp_{selection.table_name} s WHERE t.{key} = s.{key};"
+            )
+        if selection.operation == "SYNC":
+            staged = f"tmp_{selection.table_name}"
+            key = selection.join_column
+            set_clause = ", ".join(f"{c} = s.{c}" for c in cols if c != key)
+            removal = (
+                f"UPDATE {selection.table_name} t SET {selection.soft_delete_column} = :excluido"
+                if selection.soft_delete_column
+                else f"DELETE FROM {selection.table_name} t"
+            )
+            return (
+                f"-- planilha copiada (COPY) para {staged}; tudo numa transação\n"
+                f"{removal} WHERE NOT EXISTS (SELECT 1 FROM {staged} s WHERE s.{key} = t.{key});\n"
+                f"UPDATE {selection.table_name} t SET {set_clause} FROM {staged} s "
+                f"WHERE s.{key} = t.{key} AND ROW(t.*) IS DISTINCT FROM ROW(s.*);\n"
+                f"INSERT INTO {selection.table_name} ({', '.join(cols)}) SELECT {', '.join(cols)} FROM {staged} s "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {selection.table_name} t WHERE t.{key} = s.{key});"
+            )
         else:
             set_clause = ", ".join(f"{c} = :{c}" for c in cols if c != selection.join_column)
             return f"UPDATE {selection.table_name} SET {set_clause} WHERE {selection.join_column} = :{selection.join_column};"
 
-    def _validate_record_lengths(self, records: List[Dict[str, object]], selection: MappingSelection) -> None:
+    def _validate_record_lengths(
+        self,
+        records: List[Dict[str, object]],
+        selection: MappingSelection,
+        rows: Optional[Sequence[int]] = None,
+    ) -> None:
         limits = {col.name: col.max_length for col in self.table_columns if col.max_length}
         if not limits:
             return
-        first_excel_row = selection.header_row + 1
-        too_long: List[tuple[int, str, int, str]] = []
-        for idx, record in enumerate(records):
-            for col_name, max_len in limits.items():
-                if col_name not in record:
-                    continue
-                value = record[col_name]
-                if value is None:
-                    continue
-                text_value = str(value)
-                if len(text_value) > max_len:
-                    excel_row = first_excel_row + idx
-                    too_long.append((excel_row, col_name, max_len, text_value))
-        if too_long:
-            lines = []
-            for excel_row, col_name, max_len, text_value in too_long[:5]:
-                preview = text_value if len(text_value) <= 40 else f"{text_value[:37]}..."
-                lines.append(
-                    f"Linha {excel_row} coluna '{col_name}': {len(text_value)} > {max_len} caracteres (valor: {preview})"
-                )
-            remaining = len(too_long) - len(lines)
-            if remaining > 0:
-                lines.append(f"...mais {remaining} ocorrencias com tamanho acima do limite.")
-            raise ValueError("Valores excedem o tamanho permitido para a coluna:\n" + "\n".join(lines))
+        rows = self._last_record_rows if rows is None else rows
+        if len(rows) != len(records):
+            rows = [selection.header_row + 1 + idx for idx in range(len(records))]
+        validator = ValidateLengths(limits)
+        validator.check(records, rows)
+        validator.finish()
 
     def _execute(self) -> None:
         selection = self._collect_mapping()
@@ -1986,30 +2397,242 @@ class MainWindow(QMainWindow):
         progress: QProgressDialog | None = None
         try:
             self._cancel_requested = False
+            self._streamed_rows = 0
+            self._last_created_fk_labels = {}
             progress = self._create_progress_dialog("Importação", "Processando dados e enviando para o banco...")
-            records = self._build_records_for_selection(
-                selection, cancel_checker=lambda: bool(self._cancel_requested)
-            )
+            streamed = self._streams_insert(selection)
+            records: List[Dict[str, object]] = []
+            coalesce_stats: CoalesceStats | None = None
+            if not streamed:
+                records = self._build_records_resolving_typos(
+                    selection,
+                    cancel_checker=lambda: bool(self._cancel_requested),
+                    resolve_fk=not selection.server_side_validation,
+                    # A DELETE or SYNC must not add rows to lookup tables as a side effect.
+                    create_missing_fk=selection.operation in ("INSERT", "UPDATE"),
+                    coalesce_policy=(
+                        selection.coalesce_policy if selection.operation in ("UPDATE", "SYNC") else COALESCE_NONE
+                    ),
+                )
+                coalesce_stats = self._last_coalesce_stats
             if self._cancel_requested:
                 QMessageBox.information(self, "Importação", "Operação cancelada.")
                 return
-            self._validate_record_lengths(records, selection)
             affected = 0
-            if selection.operation == "INSERT":
-                affected = self.database.execute_insert(
+            generated_keys: List[object] | None = None
+            exclusive = False
+            staging_report: StagingReport | None = None
+            rejected: List[RejectedRow] = []
+            skipped_existing = 0
+            sync_diff: SyncDiff | None = None
+            delete_report: DeleteReport | None = None
+            self._forget_key_maps({selection.table_name})
+            if streamed:
+                affected = self._execute_streamed_insert(selection)
+            elif selection.operation == "DELETE":
+                if not selection.join_column:
+                    QMessageBox.warning(self, "DELETE", "Selecione uma coluna de junção")
+                    return
+                deleter = KeyDeleter(self.database)
+                estimate = self._async_runner.call(deleter.preview, selection.table_name, records, [selection.join_column])
+                answer = QMessageBox.question(
+                    self,
+                    "DELETE",
+                    f"{estimate.summary()}\n\nConfirmar a exclusão em {selection.table_name}?",
+                )
+                if answer != QMessageBox.Yes:
+                    QMessageBox.information(self, "Importação", "Operação cancelada.")
+                    return
+                delete_report = self._async_runner.call(
+                    deleter.apply,
                     selection.table_name,
                     records,
+                    [selection.join_column],
+                    commit_mode=selection.commit_mode,
+                )
+                affected = delete_report.deleted_rows
+            elif selection.operation == "SYNC":
+                self._validate_record_lengths(records, selection)
+                if not selection.join_column:
+                    QMessageBox.warning(self, "SYNC", "Selecione uma coluna de chave")
+                    return
+                sync_diff = self._async_runner.call(
+                    TableSynchronizer(self.database).apply,
+                    selection.table_name,
+                    records,
+                    selection.join_column,
+                    self._soft_delete_for(selection),
                     autogenerate_pk=selection.autogenerate_pk,
                     primary_key=selection.primary_key,
                 )
+                affected = sync_diff.to_insert + sync_diff.to_update + sync_diff.to_delete
+            elif selection.server_side_validation:
+                staging_report = self._async_runner.call(
+                    StagingPipeline(self.database).run,
+                    selection.table_name,
+                    records,
+                    self._last_record_rows,
+                    [
+                        StagingLookup(fk.target_column, fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column)
+                        for fk in selection.fk_lookups
+                    ],
+                    trim_whitespace=self._fk_trim_whitespace,
+                    autogenerate_pk=selection.autogenerate_pk,
+                    primary_key=selection.primary_key,
+                )
+                if not staging_report.ok:
+                    report_path = self._write_staging_violations_file(selection, staging_report)
+                    QMessageBox.warning(
+                        self,
+                        "Importação",
+                        f"Nenhum registro foi inserido. Violações encontradas: {len(staging_report.violations)}\n"
+                        f"{staging_report.summary()}\n\nRelatório: {report_path}",
+                    )
+                    return
+                affected = staging_report.inserted
+            elif selection.operation == "INSERT":
+                self._validate_record_lengths(records, selection)
+                if selection.skip_existing_key:
+                    new_indexes = self._async_runner.call(
+                        find_new_rows, self.database, selection.table_name, records, [selection.skip_existing_key]
+                    )
+                    skipped_existing = len(records) - len(new_indexes)
+                    records = [records[idx] for idx in new_indexes]
+                    self._last_record_rows = [self._last_record_rows[idx] for idx in new_indexes]
+                key_spec = (
+                    self.database.generated_key_spec(selection.table_name, selection.primary_key)
+                    if selection.autogenerate_pk and selection.primary_key
+                    else None
+                )
+                key_column = self._find_column_info(selection.primary_key) if selection.primary_key else None
+                generates_keys = bool(key_spec) or bool(selection.autogenerate_pk and key_column and key_column.default)
+                # Key maps may replace FK lookups only when no older row can share a label.
+                exclusive = generates_keys and not self._async_runner.call(
+                    self.database.table_has_rows, selection.table_name
+                )
+                if key_spec and selection.primary_key:
+                    # Keys reserved in one round trip so they can be written back to a file.
+                    generated_keys = self._async_runner.call(
+                        self.database.allocate_generated_keys, selection.table_name, selection.primary_key, len(records)
+                    )
+                # Runs off the Qt thread; the event loop keeps the window and progress dialog alive.
+                try:
+                    if not key_spec and selection.autogenerate_pk and key_column and key_column.default:
+                        # Non-sequence defaults (e.g. UUIDs) are materialized in a staged column and read back.
+                        generated_keys = self._async_runner.call(
+                            insert_returning_keys,
+                            self.database,
+                            selection.table_name,
+                            records,
+                            key_column.name,
+                            parallelism=selection.parallelism,
+                            isolate_errors=selection.isolate_errors,
+                            fast_bulk_load=selection.fast_bulk_load,
+                            disable_triggers=selection.disable_triggers,
+                        )
+                        affected = len(generated_keys)
+                    else:
+                        affected = self._async_runner.call(
+                            self.database.execute_insert,
+                            selection.table_name,
+                            records,
+                            autogenerate_pk=selection.autogenerate_pk,
+                            primary_key=selection.primary_key,
+                            parallelism=selection.parallelism,
+                            commit_mode=selection.commit_mode,
+                            row_numbers=self._last_record_rows,
+                            generated_keys=generated_keys,
+                            isolate_errors=selection.isolate_errors,
+                            fast_bulk_load=selection.fast_bulk_load,
+                            disable_triggers=selection.disable_triggers,
+                        )
+                except RowRejectionError as rejection:
+                    affected, rejected = rejection.committed, rejection.rejected
             else:
+                self._validate_record_lengths(records, selection)
                 if not selection.join_column:
                     QMessageBox.warning(self, "UPDATE", "Selecione uma coluna de junção")
                     return
-                affected = self.database.execute_update(selection.table_name, records, selection.join_column)
+                temp_index = self._offer_temporary_join_index(selection, len(records))
+                try:
+                    affected = self._async_runner.call(
+                        self.database.execute_update,
+                        selection.table_name,
+                        records,
+                        selection.join_column,
+                        parallelism=selection.parallelism,
+                        commit_mode=selection.commit_mode,
+                        row_numbers=self._last_record_rows,
+                        isolate_errors=selection.isolate_errors,
+                    )
+                except RowRejectionError as rejection:
+                    affected, rejected = rejection.committed, rejection.rejected
+                finally:
+                    if temp_index:
+                        try:
+                            self._async_runner.call(self.database.drop_temporary_index, temp_index)
+                        except Exception as drop_exc:  # noqa: BLE001
+                            QMessageBox.warning(
+                                self, "Índice temporário", f"Não foi possível remover o índice {temp_index}: {drop_exc}"
+                            )
             msg = f"Registros processados: {affected}"
+            if sync_diff:
+                msg += "\n" + sync_diff.summary()
+            if self._fuzzy_conversion_file:
+                msg += f"\nArquivo de conversões (FK): {self._fuzzy_conversion_file}"
+            for name, count in self._last_created_fk_labels.items():
+                msg += f"\nDescrições criadas em {name}: {count}"
+            if delete_report:
+                msg += "\n" + delete_report.summary()
+                if delete_report.unmatched and selection.join_column:
+                    try:
+                        unmatched_path = self._write_unmatched_keys_file(
+                            selection,
+                            selection.join_column,
+                            [records[idx] for idx in delete_report.unmatched],
+                            [self._last_record_rows[idx] for idx in delete_report.unmatched],
+                        )
+                        msg += f"\nChaves não encontradas: {unmatched_path}"
+                    except Exception as unmatched_exc:  # noqa: BLE001
+                        QMessageBox.warning(
+                            self, "DELETE", f"Não foi possível salvar as chaves não encontradas: {unmatched_exc}"
+                        )
+            if skipped_existing:
+                msg += f"\nLinhas ignoradas por já existirem na tabela: {skipped_existing}"
+            if coalesce_stats and coalesce_stats.avoided_writes:
+                msg += f"\nGravações evitadas por chaves repetidas: {coalesce_stats.avoided_writes}"
+            if selection.fast_bulk_load and self.database.last_bulk_load:
+                msg += "\n" + self.database.last_bulk_load.summary()
+            if rejected:
+                msg += f"\nLinhas rejeitadas pelo banco: {len(rejected)}"
+                try:
+                    reject_path = self._write_rejected_rows_file(selection, rejected)
+                    msg += f"\nArquivo de rejeitados: {reject_path}"
+                except Exception as reject_exc:  # noqa: BLE001
+                    QMessageBox.warning(self, "Rejeitados", f"Não foi possível salvar as linhas rejeitadas: {reject_exc}")
             if self._last_skipped_null_rows:
                 msg += f"\nLinhas ignoradas por estarem vazias: {self._last_skipped_null_rows}"
+            if staging_report and staging_report.type_checks_skipped:
+                msg += "\nValidação de tipos no servidor requer PostgreSQL 16+ (não executada)."
+            if generated_keys and selection.primary_key:
+                rejected_indexes = {row.index for row in rejected}
+                kept = [idx for idx in range(len(generated_keys)) if idx not in rejected_indexes]
+                key_map = GeneratedKeyMap(
+                    table=selection.table_name,
+                    primary_key=selection.primary_key,
+                    rows=[self._last_record_rows[idx] for idx in kept],
+                    keys=[generated_keys[idx] for idx in kept],
+                    records=[records[idx] for idx in kept],
+                    source=self.database.identity,
+                    exclusive=exclusive,
+                )
+                # Later imports in this session resolve FK descriptions of this table from memory.
+                self._generated_key_maps[(key_map.table, key_map.primary_key)] = key_map
+                try:
+                    keys_path = self._write_generated_keys_file(selection, key_map)
+                    msg += f"\nChaves geradas: {keys_path}"
+                except Exception as keys_exc:  # noqa: BLE001
+                    QMessageBox.warning(self, "Chaves geradas", f"Não foi possível salvar as chaves geradas: {keys_exc}")
             if selection.similarity_replacements:
                 try:
                     path = self._write_similarity_conversion_file(selection.similarity_replacements)
@@ -2025,16 +2648,208 @@ class MainWindow(QMainWindow):
             self._reset_after_execute()
         except RuntimeError as exc:
             if "cancelada" in str(exc).lower():
-                QMessageBox.information(self, "Importação", "Operação cancelada.")
+                QMessageBox.information(self, "Importação", "Operação cancelada." + self._streamed_rows_note())
             else:
                 self._show_error("Erro na importação", exc)
+                self._warn_streamed_rows()
         except Exception as exc:  # noqa: BLE001
             self._show_error("Erro na importação", exc)
+            self._warn_streamed_rows()
         finally:
+            # Even a failed import may have committed partitions; cached lookups of the table are stale.
+            self.lookup_cache.invalidate(selection.table_name)
             if progress:
                 progress.close()
             self._cancel_requested = False
 
+    def _streams_insert(self, selection: MappingSelection) -> bool:
+        """Plain INSERT committed per partition: each chunk is written as soon as it is transformed.
+
+        The other INSERT options work on the whole sheet at once (one staging transaction, the
+        anti-join against existing keys, bisection of rejected rows, index rebuilds around the
+        load, the generated-keys file, one insert of the missing FK labels), so they keep the
+        materialized path.
+        """
+        return (
+            selection.operation == "INSERT"
+            and selection.commit_mode == COMMIT_PARTITION
+            and not selection.server_side_validation
+            and not selection.skip_existing_key
+            and not selection.isolate_errors
+            and not selection.fast_bulk_load
+            and not (selection.autogenerate_pk and selection.primary_key)
+            and not any(fk.create_missing for fk in selection.fk_lookups)
+        )
+
+    def _execute_streamed_insert(self, selection: MappingSelection) -> int:
+        """INSERT each transformed chunk in its own transaction; the sheet is never held whole."""
+        try:
+            return self._write_streamed_chunks(selection)
+        except UnresolvedForeignKeyError as exc:
+            # Nothing committed yet: the fuzzy suggestions can still fix the sheet before any write.
+            if self._streamed_rows or not exc.missing or not self._resolve_fk_typos(exc):
+                raise
+        return self._write_streamed_chunks(selection)
+
+    def _write_streamed_chunks(self, selection: MappingSelection) -> int:
+        self._last_record_rows = []
+        chunks = self._iter_record_chunks(
+            selection,
+            cancel_checker=lambda: bool(self._cancel_requested),
+            fail_fast=True,
+        )
+        with closing(chunks):
+            for chunk in chunks:
+                if not chunk.records:
+                    continue
+                # Checked per chunk: a later chunk's problem must not surface after this one is committed.
+                self._validate_record_lengths(chunk.records, selection, chunk.rows)
+                self._streamed_rows += self._async_runner.call(
+                    self.database.execute_insert,
+                    selection.table_name,
+                    chunk.records,
+                    parallelism=selection.parallelism,
+                    commit_mode=selection.commit_mode,
+                    row_numbers=chunk.rows,
+                )
+        return self._streamed_rows
+
+    def _streamed_rows_note(self) -> str:
+        if not self._streamed_rows:
+            return ""
+        return f"\nRegistros já confirmados antes da interrupção: {self._streamed_rows}"
+
+    def _warn_streamed_rows(self) -> None:
+        if self._streamed_rows:
+            QMessageBox.warning(self, "Importação", self._streamed_rows_note().strip())
+
+    def _soft_delete_for(self, selection: MappingSelection) -> SoftDelete | None:
+        if not selection.soft_delete_column:
+            return None
+        return SoftDelete(selection.soft_delete_column, selection.soft_deleted_value, selection.soft_active_value)
+
+    def _add_to_batch(self) -> None:
+        selection = self._collect_mapping()
+        if not selection:
+            return
+        error = batch_support_error(selection)
+        if error:
+            QMessageBox.warning(self, "Lote", error)
+            return
+        self._batch_selections = [s for s in self._batch_selections if s.table_name != selection.table_name]
+        self._batch_selections.append(selection)
+        self._refresh_batch_hint()
+
+    def _clear_batch(self) -> None:
+        self._batch_selections = []
+        self._refresh_batch_hint()
+
+    def _refresh_batch_hint(self) -> None:
+        if not self._batch_selections:
+            self.batch_status.setText("Lote vazio")
+            return
+        parts = [f"{s.sheet_name} -> {s.table_name} ({s.operation})" for s in self._batch_selections]
+        self.batch_status.setText("Lote: " + "; ".join(parts))
+
+    def _execute_batch(self) -> None:
+        if not self._batch_selections or not self.excel_reader:
+            QMessageBox.warning(self, "Lote", "Adicione ao menos um mapeamento ao lote.")
+            return
+        progress: QProgressDialog | None = None
+        try:
+            self._cancel_requested = False
+            job = MultiTableJob(self.database, self._batch_selections, lookup_cache=self.lookup_cache)
+            progress = self._create_progress_dialog("Lote", "Lendo a planilha e gravando as tabelas em ordem...")
+            # One parse of the workbook serves every mapping of the batch.
+            self._async_runner.call(
+                self.excel_reader.cache_workbook, sorted({s.sheet_name for s in self._batch_selections})
+            )
+            self._forget_key_maps({s.table_name for s in self._batch_selections})
+            for level in job.levels:
+                prepared: List[PreparedTable] = []
+                for selection in level:
+                    # Keys generated by earlier levels resolve this level's FK descriptions in memory.
+                    self._generated_key_maps.update(job.key_maps)
+                    records = self._build_records_resolving_typos(
+                        selection, cancel_checker=lambda: bool(self._cancel_requested), create_missing_fk=True
+                    )
+                    prepared.append(PreparedTable(selection, records, list(self._last_record_rows)))
+                if self._cancel_requested:
+                    raise RuntimeError("Operação cancelada pelo usuário")
+                if not self._async_runner.call(job.write_level, prepared):
+                    break
+            self._generated_key_maps.update(job.key_maps)
+            self._refresh_key_map_hint()
+            msg = job.report.summary()
+            by_table = {s.table_name: s for s in self._batch_selections}
+            for result in job.report.results:
+                if result.rejected:
+                    try:
+                        reject_path = self._write_rejected_rows_file(by_table[result.table], result.rejected)
+                        msg += f"\nArquivo de rejeitados ({result.table}): {reject_path}"
+                    except Exception as reject_exc:  # noqa: BLE001
+                        msg += f"\nNão foi possível salvar as linhas rejeitadas de {result.table}: {reject_exc}"
+                if result.key_map is None:
+                    continue
+                try:
+                    keys_path = self._write_generated_keys_file(by_table[result.table], result.key_map)
+                    msg += f"\nChaves geradas ({result.table}): {keys_path}"
+                except Exception as keys_exc:  # noqa: BLE001
+                    msg += f"\nNão foi possível salvar as chaves geradas de {result.table}: {keys_exc}"
+            if job.report.ok:
+                QMessageBox.information(self, "Lote", msg)
+                self._clear_batch()
+            else:
+                QMessageBox.warning(self, "Lote", msg)
+        except RuntimeError as exc:
+            if "cancelada" in str(exc).lower():
+                QMessageBox.information(self, "Lote", "Operação cancelada.")
+            else:
+                self._show_error("Erro no lote", exc)
+        except Exception as exc:  # noqa: BLE001
+            self._show_error("Erro no lote", exc)
+        finally:
+            self.excel_reader.clear_cache()
+            if progress:
+                progress.close()
+            self._cancel_requested = False
+
+    def _offer_temporary_join_index(self, selection: MappingSelection, update_rows: int) -> str | None:
+        """Ask to index an unindexed join column for the duration of the UPDATE; returns the index name."""
+        if not selection.join_column:
+            return None
+        advice = self.database.join_index_advice(selection.table_name, selection.join_column, update_rows)
+        if not advice.recommend_index:
+            return None
+        answer = QMessageBox.question(
+            self,
+            "Índice da coluna de junção",
+            advice.describe()
+            + "\n\nCriar um índice temporário (CONCURRENTLY, sem bloquear a tabela) durante a importação e removê-lo "
+            "ao final?",
+        )
+        if answer != QMessageBox.Yes:
+            return None
+        try:
+            return self._async_runner.call(
+                self.database.create_temporary_index, selection.table_name, selection.join_column
+            )
+        except BlockingIndexBuildError as exc:
+            answer = QMessageBox.question(
+                self,
+                "Índice da coluna de junção",
+                f"{exc}\n\nUm índice comum bloqueia INSERT/UPDATE/DELETE de outros usuários em "
+                f"{selection.table_name} enquanto é criado. Criar mesmo assim? (Não: continuar sem índice)",
+            )
+            if answer != QMessageBox.Yes:
+                return None
+            return self._async_runner.call(
+                self.database.create_temporary_index,
+                selection.table_name,
+                selection.join_column,
+                allow_blocking=True,
+            )
+
     def _show_error(self, title: str, exc: Exception) -> None:
         traceback.print_exc()
         details = traceback.format_exc()
@@ -2066,53 +2881,6 @@ class MainWindow(QMainWindow):
 
         dialog.exec()
 
-    def _apply_similarity_replacements(
-        self, df: pd.DataFrame, replacements: Dict[str, Dict[str, str]]
-    ) -> pd.DataFrame:
-        if not replacements:
-            return df
-        for column, mapping in replacements.items():
-            if column not in df.columns or not mapping:
-                continue
-            df[column] = df[column].map(lambda value: mapping.get(value, value) if isinstance(value, str) else value)
-        return df
-
-    def _apply_split_rule(self, df: pd.DataFrame, selection: MappingSelection) -> pd.DataFrame:
-        if not selection.split_column or selection.split_length is None or not selection.split_extra_column:
-            return df
-        column = selection.split_column
-        extra_col = selection.split_extra_column
-        if column not in df.columns:
-            raise ValueError(f"Coluna '{column}' não encontrada para separação por tamanho")
-        # Avoid collision
-        if extra_col in df.columns:
-            extra_col = self._next_extra_column_name()
-            selection.split_extra_column = extra_col
-        df[extra_col] = None
-        for idx, val in df[column].items():
-            if val is None:
-                continue
-            try:
-                if pd.isna(val):
-                    continue
-            except Exception:
-                pass
-            text = str(val)
-            if selection.trim_whitespace:
-                text = text.strip()
-            length = len(text)
-            if (selection.split_operator == "gt" and length > selection.split_length) or (
-                selection.split_operator == "lt" and length < selection.split_length
-            ):
-                df.at[idx, extra_col] = val
-                df.at[idx, column] = None
-        # Register virtual column so UI knows
-        if extra_col not in self._virtual_extra_columns:
-            self._virtual_extra_columns.add(extra_col)
-            self.sheet_columns_list.addItem(extra_col)
-            self._refresh_fk_excel_options()
-        return df
-
     def _similarity_conversion_path(self) -> Path | None:
         if not self.excel_file_path:
             return None
@@ -2171,123 +2939,322 @@ class MainWindow(QMainWindow):
         self,
         selection: MappingSelection,
         cancel_checker: Optional[Callable[[], bool]] = None,
+        resolve_fk: bool = True,
+        create_missing_fk: bool = False,
+        coalesce_policy: str = COALESCE_NONE,
     ) -> List[Dict[str, object]]:
-        # Carrega todas as colunas necessárias (mapeamento + lookups de FK)
-        df = self.excel_reader._read_dataframe(
-            selection.sheet_name,
-            selection.header_row,
-            data_start_row=selection.data_start_row,
-            data_end_row=selection.data_end_row,
-            col_start=selection.start_column,
-            col_end=selection.end_column,
-        )
-        if selection.trim_whitespace:
-            df = self._trim_dataframe_whitespace(df)
-        if selection.similarity_replacements:
-            df = self._apply_similarity_replacements(df, selection.similarity_replacements)
-        df = self._apply_split_rule(df, selection)
-        if selection.remove_duplicate_rows and selection.duplicate_check_column:
-            if selection.duplicate_check_column not in df.columns:
-                raise ValueError(
-                    f"Coluna '{selection.duplicate_check_column}' não encontrada para remover duplicados"
+        """Records of the mapped sheet; with ``coalesce_policy`` repeated join keys are folded as chunks arrive."""
+        records: List[Dict[str, object]] = []
+        rows: List[int] = []
+        coalescer: RecordCoalescer | None = None
+        if coalesce_policy != COALESCE_NONE and selection.join_column:
+            coalescer = RecordCoalescer(selection.join_column, coalesce_policy)
+        # FK ids of created labels are filled in after the last chunk, so those records are folded at the end.
+        deferred = create_missing_fk and any(fk.create_missing for fk in selection.fk_lookups)
+        with closing(self._iter_record_chunks(selection, cancel_checker, resolve_fk, create_missing_fk)) as chunks:
+            for chunk in chunks:
+                if coalescer is not None and not deferred:
+                    coalescer.feed(chunk.records, chunk.rows)
+                    continue
+                records.extend(chunk.records)
+                rows.extend(chunk.rows)
+        if coalescer is not None:
+            if deferred:
+                coalescer.feed(records, rows)
+            records, rows = coalescer.result()
+        self._last_coalesce_stats = coalescer.stats if coalescer is not None else None
+        self._last_record_rows = rows
+        return records
+
+    def _iter_record_chunks(
+        self,
+        selection: MappingSelection,
+        cancel_checker: Optional[Callable[[], bool]] = None,
+        resolve_fk: bool = True,
+        create_missing_fk: bool = False,
+        fail_fast: bool = False,
+    ) -> Iterator[Chunk]:
+        """Transformed chunks of the mapped sheet; statistics are set once the iteration ends."""
+        prefetcher: LookupPrefetcher | None = None
+        if resolve_fk and selection.fk_lookups:
+            # Lookup tables download on pooled connections while the sheet is parsed below.
+            prefetcher = LookupPrefetcher(
+                self.database,
+                TARGETED_LOOKUP_MIN_ROWS,
+                trim_whitespace=self._fk_trim_whitespace,
+                cache=self.lookup_cache,
+            ).start(
+                [(fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column) for fk in selection.fk_lookups],
+                [selection.table_name],
+            )
+        try:
+            yield from self._assemble_chunks(
+                selection, cancel_checker, resolve_fk, prefetcher, create_missing_fk, fail_fast
+            )
+        finally:
+            if prefetcher:
+                prefetcher.shutdown()
+
+    def _build_records_resolving_typos(self, selection: MappingSelection, **kwargs: object) -> List[Dict[str, object]]:
+        """Build records; on unresolved FK descriptions offer fuzzy matches and retry once."""
+        try:
+            return self._build_records_for_selection(selection, **kwargs)
+        except UnresolvedForeignKeyError as exc:
+            if not exc.missing or not self._resolve_fk_typos(exc):
+                raise
+        return self._build_records_for_selection(selection, **kwargs)
+
+    def _resolve_fk_typos(self, error: UnresolvedForeignKeyError) -> bool:
+        suggestions = self._suggest_fk_matches(error.missing)
+        if not suggestions:
+            return False
+        dialog = FuzzyMatchDialog(self, suggestions)
+        if not dialog.exec():
+            return False
+        accepted = dialog.accepted_matches()
+        if not accepted:
+            return False
+        for column, mapping in accepted.items():
+            self._relation_conversions.setdefault(column, {}).update(mapping)
+        self._refresh_fk_conversion_hint()
+        try:
+            self._fuzzy_conversion_file = self._write_fk_conversion_file()
+        except Exception as exc:  # noqa: BLE001
+            QMessageBox.warning(self, "Conversões", f"Não foi possível salvar o arquivo de conversões (FK): {exc}")
+        return True
+
+    def _suggest_fk_matches(
+        self, missing: Dict[tuple[str, str, str, str], Dict[str, str]]
+    ) -> List[tuple[str, str, List[FuzzyMatch]]]:
+        suggestions: List[tuple[str, str, List[FuzzyMatch]]] = []
+        for (excel_column, table, id_column, label_column), values in missing.items():
+            key = (table, id_column, label_column)
+            server_matches = None
+            if key not in self._fuzzy_indexes:
+                # Only the unresolved values travel; pg_trgm ranks them against the table server-side.
+                server_matches = self.database.similar_lookup_labels(
+                    table,
+                    id_column,
+                    label_column,
+                    list(values.values()),
+                    limit=FUZZY_MAX_CANDIDATES,
+                    threshold=FUZZY_MIN_SIMILARITY,
                 )
-            dedup_key = f"__dupkey_{selection.duplicate_check_column}"
-            df[dedup_key] = df[selection.duplicate_check_column].map(self._normalize_for_duplicates)
-            total_rows = len(df.index)
-            df = df.drop_duplicates(subset=[dedup_key], keep="first")
-            df = df.reset_index(drop=True)
-            df = df.drop(columns=[dedup_key])
-            self._pre_validation_last_result = (total_rows, len(df.index))
-        column_mapping = selection.column_mapping
-        if selection.autogenerate_pk and selection.primary_key:
-            column_mapping = [(s, t) for s, t in selection.column_mapping if t != selection.primary_key]
-        needed_excel_cols = {s for s, _ in column_mapping} | {fk.excel_column for fk in selection.fk_lookups}
-        missing_excel = [col for col in needed_excel_cols if col not in df.columns]
-        if missing_excel:
-            raise ValueError(f"Colunas da planilha não encontradas: {', '.join(missing_excel)}")
+            index: TrigramIndex | None = None
+            if server_matches is None:
+                index = self._fuzzy_indexes.get(key)
+                if index is None:
+                    # Without pg_trgm: built once per lookup table from the streamed label list.
+                    index = TrigramIndex(self.database.iter_lookup_values(table, id_column, label_column))
+                    self._fuzzy_indexes[key] = index
+            for sheet_text, lookup_text in values.items():
+                if index is not None:
+                    matches = index.best_matches(lookup_text)
+                else:
+                    matches = self._distinct_fuzzy_matches(server_matches.get(lookup_text, []))
+                if matches:
+                    suggestions.append((excel_column, sheet_text, matches))
+        return suggestions
 
-        records: List[Dict[str, object]] = []
-        source_columns_for_null_check = [s for s, _ in column_mapping]
-        skipped_null_rows = 0
-        for _, row in df.iterrows():
-            if source_columns_for_null_check:
-                if all(self._is_nullish(row.get(col)) for col in source_columns_for_null_check):
-                    skipped_null_rows += 1
+    def _distinct_fuzzy_matches(self, ranked: List[tuple[object, str, float]]) -> List[FuzzyMatch]:
+        matches: List[FuzzyMatch] = []
+        seen: set[str] = set()
+        for ident, label, score in ranked:
+            if label.casefold() not in seen:
+                seen.add(label.casefold())
+                matches.append(FuzzyMatch(label, ident, score))
+        return matches
+
+    def _write_fk_conversion_file(self) -> Path | None:
+        if not self.excel_file_path or not self._relation_conversions:
+            return None
+        base = Path(self.excel_file_path)
+        target_path = base.with_name(f"{base.stem}_conversoes_fk.csv")
+        rows = [
+            {"coluna_excel": column, "valor_original": src, "valor_corrigido": dst}
+            for column, mapping in self._relation_conversions.items()
+            for src, dst in mapping.items()
+        ]
+        pd.DataFrame(rows, columns=["coluna_excel", "valor_original", "valor_corrigido"]).to_csv(
+            target_path, index=False
+        )
+        self._last_conversion_file = target_path
+        return target_path
+
+    def _assemble_chunks(
+        self,
+        selection: MappingSelection,
+        cancel_checker: Optional[Callable[[], bool]],
+        resolve_fk: bool,
+        prefetcher: LookupPrefetcher | None,
+        create_missing_fk: bool = False,
+        fail_fast: bool = False,
+    ) -> Iterator[Chunk]:
+        # One lookup state per import: every chunk shares the validated cache entries.
+        states: Dict[tuple[str, str, str], PrefetchedLookup] = {}
+        pipeline = ImportPipeline.for_selection(
+            self.excel_reader,
+            selection,
+            resolver=(lambda wanted: self._load_fk_lookup_cache(wanted, prefetcher, states)) if resolve_fk else None,
+            conversions=self._relation_conversions,
+            fk_trim_whitespace=self._fk_trim_whitespace,
+            create_labels=self._insert_missing_fk_labels if create_missing_fk else None,
+            rename_extra_column=self._next_extra_column_name,
+            cancel_checker=cancel_checker,
+            fail_fast=fail_fast,
+        )
+        try:
+            yield from pipeline.iter_chunks()
+        finally:
+            split = pipeline.stage(SplitByLength)
+            if split is not None:
+                self._register_split_column(selection, split.extra_column)
+            dedup = pipeline.stage(DropDuplicates)
+            if dedup is not None:
+                self._pre_validation_last_result = (dedup.total, dedup.kept)
+            mapper = pipeline.stage(MapColumns)
+            self._last_skipped_null_rows = mapper.skipped_rows if mapper else 0
+            resolver = pipeline.stage(ResolveForeignKeys)
+            if resolver is not None and resolve_fk:
+                self._last_created_fk_labels = resolver.created
+
+    def _register_split_column(self, selection: MappingSelection, extra_col: str) -> None:
+        # The stage may have renamed the extra column to avoid a collision with the sheet.
+        selection.split_extra_column = extra_col
+        if extra_col not in self._virtual_extra_columns:
+            self._virtual_extra_columns.add(extra_col)
+            self.sheet_columns_list.addItem(extra_col)
+            self._refresh_fk_excel_options()
+
+    def _insert_missing_fk_labels(
+        self, fk: ForeignKeyLookup, labels: List[str]
+    ) -> tuple[List[tuple[object, object]], int]:
+        result = self.database.insert_lookup_labels(
+            fk.foreign_table,
+            fk.foreign_id_column,
+            fk.foreign_label_column,
+            labels,
+            trim_whitespace=self._fk_trim_whitespace,
+        )
+        self.lookup_cache.invalidate(fk.foreign_table)
+        return result.pairs, result.inserted
+
+    def _load_fk_lookup_cache(
+        self,
+        wanted: Dict[tuple[str, str, str], set[str]],
+        prefetcher: LookupPrefetcher | None = None,
+        states: Dict[tuple[str, str, str], PrefetchedLookup] | None = None,
+    ) -> Dict[tuple[str, str, str], Dict[str, object]]:
+        """Build normalized label -> id dictionaries for the ``wanted`` labels of each lookup.
+
+        ``states`` keeps each lookup's cache entry across calls of one import, so later chunks
+        neither re-validate the on-disk cache nor overwrite it with an older entry.
+        """
+        trim = self._fk_trim_whitespace
+        states = {} if states is None else states
+        entries: Dict[tuple[str, str, str], LookupCacheEntry | None] = {}
+        signatures: Dict[tuple[str, str, str], str | None] = {}
+        prefetched: Dict[tuple[str, str, str], List[tuple[object, object]]] = {}
+        missing: Dict[tuple[str, str, str], set[str]] = {}
+        from_key_maps: Dict[tuple[str, str, str], tuple[Dict[str, object], List[str]]] = {}
+        for key, labels in wanted.items():
+            if not labels:
+                continue
+            key_map = find_key_map(self._generated_key_maps, *key, self.database.identity)
+            if key_map is not None:
+                # Keys generated by an earlier import of the lookup table: no database round trip.
+                cache, duplicates = key_map.lookup_dict(key[2], trim)
+                if labels <= cache.keys():
+                    from_key_maps[key] = (cache, duplicates)
                     continue
-            if cancel_checker and cancel_checker():
-                raise RuntimeError("Operação cancelada pelo usuário")
-            record: Dict[str, object] = {}
-            for sheet_col, table_col in column_mapping:
-                if sheet_col in row:
-                    record[table_col] = self.excel_reader._normalize_cell(row[sheet_col])
-            records.append(record)
-        self._last_skipped_null_rows = skipped_null_rows
-
-        # Aplica valores padrão
-        if selection.default_values:
-            for record in records:
-                for col, value in selection.default_values.items():
-                    record.setdefault(col, value)
-
-        # Aplica lookups de FK (descrição -> ID)
-        if selection.fk_lookups:
-            lookup_cache: Dict[tuple[str, str, str], Dict[str, object]] = {}
-            for fk in selection.fk_lookups:
-                key = (fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column)
-                if key not in lookup_cache:
-                    cache: Dict[str, object] = {}
-                    duplicates: List[str] = []
-                    for ident, label in self.database.fetch_lookup_values(
-                        fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column
-                    ):
-                        normalized = self._normalize_lookup_key(label)
-                        if not normalized:
-                            continue
-                        existing = cache.get(normalized)
-                        if existing is None:
-                            cache[normalized] = ident
-                        elif existing != ident:
-                            duplicates.append(str(label))
-                    if duplicates:
-                        raise ValueError(
-                            f"Valores duplicados na tabela {fk.foreign_table} para a coluna de descrição "
-                            f"{fk.foreign_label_column}: {', '.join(sorted(set(duplicates)))}"
-                        )
-                    lookup_cache[key] = cache
-            unresolved: List[str] = []
-            first_excel_row = selection.data_start_row
-            for idx, (_, row) in enumerate(df.iterrows()):
-                excel_row = first_excel_row + idx
-                for fk in selection.fk_lookups:
-                    raw_value = row.get(fk.excel_column)
-                    raw_value = self._apply_fk_conversion(fk.excel_column, raw_value)
-                    normalized = self._normalize_lookup_key(raw_value)
-                    if not normalized:
-                        unresolved.append(
-                            f"Linha {excel_row} coluna '{fk.excel_column}' vazia para preencher {fk.target_column}"
-                        )
-                        continue
-                    key = (fk.foreign_table, fk.foreign_id_column, fk.foreign_label_column)
-                    mapped = lookup_cache.get(key, {}).get(normalized)
-                    if mapped is None:
-                        preview = str(raw_value)
-                        unresolved.append(
-                            f"Linha {excel_row}: valor '{preview}' não encontrado em "
-                            f"{fk.foreign_table}.{fk.foreign_label_column} para preencher {fk.target_column}"
+            state = states.get(key)
+            if state is None:
+                state = prefetcher.lookup(key) if prefetcher else PrefetchedLookup(*self.lookup_cache.load(key, trim))
+                states[key] = state
+            entries[key], signatures[key] = state.entry, state.signature
+            if state.entry is not None and state.entry.covers(labels):
+                continue
+            if state.pairs is not None:
+                prefetched[key] = state.pairs
+            # A cache entry only needs the labels it cannot resolve; those are fetched again, never assumed absent.
+            missing[key] = state.entry.unresolved(labels) if state.entry is not None else labels
+        targeted = {
+            key: key not in prefetched and (entries[key] is not None or self._lookup_is_targeted(key[0], labels))
+            for key, labels in missing.items()
+        }
+        targeted_keys = [key for key in missing if targeted[key]]
+        if self.async_database.engine and len(targeted_keys) > 1:
+            # Independent targeted lookups run concurrently over the async pool.
+            results = self._async_runner.run(
+                self.async_database.gather(
+                    *(
+                        self.async_database.fetch_lookup_values(
+                            key[0], key[1], key[2], labels=missing[key], trim_whitespace=trim
                         )
-                    else:
-                        records[idx][fk.target_column] = mapped
-            if unresolved:
-                details = "\n".join(unresolved[:5])
-                remaining = len(unresolved) - len(unresolved[:5])
-                if remaining > 0:
-                    details += f"\n...mais {remaining} ocorrências sem correspondência."
-                raise ValueError("Não foi possível resolver os relacionamentos FK:\n" + details)
-
-        # Remove PK se marcada como auto-gerada
-        if selection.autogenerate_pk and selection.primary_key:
-            records = [{k: v for k, v in record.items() if k != selection.primary_key} for record in records]
-        return records
+                        for key in targeted_keys
+                    )
+                )
+            )
+            prefetched.update(zip(targeted_keys, results))
+        lookup_cache: Dict[tuple[str, str, str], Dict[str, object]] = {}
+        for key, labels in wanted.items():
+            table, id_column, label_column = key
+            if not labels:
+                lookup_cache[key] = {}
+                continue
+            entry = entries.get(key)
+            if key in from_key_maps:
+                cache, duplicates = from_key_maps[key]
+            elif key not in missing and entry is not None:
+                cache, duplicates = entry.values, entry.duplicates
+            else:
+                pairs = prefetched.get(key)
+                if pairs is None:
+                    pairs = self._fetch_fk_lookup_pairs(table, id_column, label_column, missing[key], targeted[key])
+                if targeted[key] and entry is not None:
+                    cache, duplicates = dict(entry.values), list(entry.duplicates)
+                    add_lookup_pairs(cache, duplicates, pairs, trim)
+                    complete = entry.complete
+                else:
+                    cache, duplicates = build_lookup_dict(pairs, trim)
+                    complete = not targeted[key]
+                refreshed = LookupCacheEntry(
+                    signature=signatures.get(key),
+                    saved_at=time.time(),
+                    values=cache,
+                    duplicates=duplicates,
+                    complete=complete,
+                )
+                self.lookup_cache.store(key, trim, refreshed)
+                states[key] = PrefetchedLookup(refreshed, signatures.get(key))
+            # Only labels referenced by the sheet can make the import ambiguous.
+            duplicates = [label for label in duplicates if self._normalize_lookup_key(label) in labels]
+            if duplicates:
+                raise ValueError(
+                    f"Valores duplicados na tabela {table} para a coluna de descrição "
+                    f"{label_column}: {', '.join(sorted(set(duplicates)))}"
+                )
+            lookup_cache[key] = cache
+        return lookup_cache
+
+    def _lookup_is_targeted(self, table: str, labels: set[str]) -> bool:
+        metadata = self.database.get_table_metadata(table)
+        estimated_rows = metadata.estimated_rows if metadata else -1
+        return estimated_rows < 0 or estimated_rows > max(TARGETED_LOOKUP_MIN_ROWS, len(labels) * 4)
+
+    def _fetch_fk_lookup_pairs(
+        self, table: str, id_column: str, label_column: str, labels: set[str], targeted: bool
+    ) -> Iterable[tuple[object, object]]:
+        if not labels:
+            return []
+        # Streamed: pairs are folded into the lookup dict batch by batch, never materialized.
+        return self.database.iter_lookup_values(
+            table,
+            id_column,
+            label_column,
+            labels=labels if targeted else None,
+            trim_whitespace=self._fk_trim_whitespace,
+        )
 
     def _export_mapped_data(self, kind: str) -> None:
         selection = self._collect_mapping()
@@ -2322,6 +3289,52 @@ class MainWindow(QMainWindow):
         except Exception as exc:  # noqa: BLE001
             self._show_error("Erro ao exportar", exc)
 
+    def _write_generated_keys_file(self, selection: MappingSelection, key_map: GeneratedKeyMap) -> Path:
+        target_path = Path(self._default_export_path("csv", selection).replace("_mapeado.csv", "_chaves_geradas.csv"))
+        return key_map.write_csv(target_path)
+
+    def _write_unmatched_keys_file(
+        self, selection: MappingSelection, key_column: str, records: List[Dict[str, object]], rows: Sequence[int]
+    ) -> Path:
+        df = pd.DataFrame(
+            {
+                "linha_excel": list(rows),
+                key_column: [self._normalize_value_for_export(record.get(key_column)) for record in records],
+            }
+        )
+        target_path = Path(
+            self._default_export_path("csv", selection).replace("_mapeado.csv", "_nao_encontrados.csv")
+        )
+        df.to_csv(target_path, index=False)
+        return target_path
+
+    def _write_rejected_rows_file(self, selection: MappingSelection, rejected: List[RejectedRow]) -> Path:
+        df = pd.DataFrame(
+            [
+                {
+                    "linha_excel": item.row,
+                    "erro": item.message,
+                    **{col: self._normalize_value_for_export(value) for col, value in item.record.items()},
+                }
+                for item in rejected
+            ]
+        )
+        target_path = Path(self._default_export_path("csv", selection).replace("_mapeado.csv", "_rejeitados.csv"))
+        df.to_csv(target_path, index=False)
+        return target_path
+
+    def _write_staging_violations_file(self, selection: MappingSelection, report: StagingReport) -> Path:
+        df = pd.DataFrame(
+            [
+                {"linha_excel": v.row, "coluna": v.column, "tipo": v.kind, "valor": v.value, "detalhe": v.detail}
+                for v in report.violations
+            ],
+            columns=["linha_excel", "coluna", "tipo", "valor", "detalhe"],
+        )
+        target_path = Path(self._default_export_path("csv", selection).replace("_mapeado.csv", "_violacoes.csv"))
+        df.to_csv(target_path, index=False)
+        return target_path
+
     def _normalize_value_for_export(self, value: object) -> object:
         if isinstance(value, bool):
             return "true" if value else "false"
@@ -2384,6 +3397,62 @@ class SimilarValuesDialog(QDialog):
         layout.addLayout(buttons)
 
 
+class FuzzyMatchDialog(QDialog):
+    """Lets the user pick, for each unresolved FK description, one of the closest lookup labels."""
+
+    def __init__(self, parent: QWidget, suggestions: List[tuple[str, str, List[FuzzyMatch]]]) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Descrições não encontradas")
+        self.resize(900, 600)
+        self.setMinimumSize(720, 480)
+        self._suggestions = suggestions
+
+        layout = QVBoxLayout(self)
+        header = QLabel(
+            f"{len(suggestions)} descrições da planilha não existem na tabela relacionada, mas há valores "
+            "parecidos. Escolha a correção de cada uma (as aceitas são salvas num arquivo de conversões)."
+        )
+        header.setWordWrap(True)
+        layout.addWidget(header)
+
+        self.table = QTableWidget(len(suggestions), 3)
+        self.table.setMinimumHeight(360)
+        self.table.setHorizontalHeaderLabels(["Coluna Excel", "Valor na planilha", "Correção"])
+        self._combos: List[QComboBox] = []
+        for row, (column, value, matches) in enumerate(suggestions):
+            self.table.setItem(row, 0, QTableWidgetItem(column))
+            self.table.setItem(row, 1, QTableWidgetItem(value))
+            combo = QComboBox()
+            for match in matches:
+                combo.addItem(f"{match.label} ({match.score:.0%})", match.label)
+            combo.addItem("(não corrigir)", None)
+            self.table.setCellWidget(row, 2, combo)
+            self._combos.append(combo)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        apply_btn = QPushButton("Aplicar correções")
+        cancel_btn = QPushButton("Cancelar")
+        apply_btn.clicked.connect(self.accept)
+        cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(apply_btn)
+        buttons.addStretch()
+        buttons.addWidget(cancel_btn)
+        layout.addLayout(buttons)
+
+    def accepted_matches(self) -> Dict[str, Dict[str, str]]:
+        accepted: Dict[str, Dict[str, str]] = {}
+        for (column, value, _), combo in zip(self._suggestions, self._combos):
+            label = combo.currentData()
+            if label is not None:
+                accepted.setdefault(column, {})[value] = label
+        return accepted
+
+
 class PreValidationDialog(QDialog):
     def __init__(
         self,
@@ -0,0 +1,69 @@
+import pytest
+
+from src.core.coalesce import (
+    COALESCE_LAST,
+    COALESCE_MERGE_NON_NULL,
+    COALESCE_NONE,
+    RecordCoalescer,
+    coalesce_records,
+)
+
+RECORDS = [
+    {"codigo": 1, "nome": "Ana", "email": "ana@x.com"},
+    {"codigo": 2, "nome": "Eva", "email": None},
+    {"codigo": 1, "nome": "Ana Maria", "email": None},
+]
+
+
+def test_last_keeps_the_last_occurrence_in_first_occurrence_order():
+    records, rows, stats = coalesce_records(RECORDS, "codigo", COALESCE_LAST, [10, 11, 12])
+    assert records == [{"codigo": 1, "nome": "Ana Maria", "email": None}, {"codigo": 2, "nome": "Eva", "email": None}]
+    # Errors are reported on the row whose values were written.
+    assert rows == [12, 11]
+    assert (stats.input_rows, stats.output_rows, stats.avoided_writes) == (3, 2, 1)
+
+
+def test_merge_non_null_keeps_values_later_rows_leave_empty():
+    records, rows, stats = coalesce_records(RECORDS, "codigo", COALESCE_MERGE_NON_NULL, [10, 11, 12])
+    assert records[0] == {"codigo": 1, "nome": "Ana Maria", "email": "ana@x.com"}
+    assert rows == [12, 11]
+    assert stats.avoided_writes == 1
+
+
+def test_none_passes_every_row_through():
+    records, rows, stats = coalesce_records(RECORDS, "codigo", COALESCE_NONE, [10, 11, 12])
+    assert records == RECORDS
+    assert rows == [10, 11, 12]
+    assert stats.avoided_writes == 0
+
+
+def test_rows_without_key_are_never_merged():
+    records, rows, stats = coalesce_records([{"codigo": None, "nome": "A"}, {"nome": "B"}, {"codigo": None}], "codigo")
+    assert [record.get("nome") for record in records] == ["A", "B", None]
+    # Without explicit row numbers the input position (1-based) is tracked.
+    assert rows == [1, 2, 3]
+    assert stats.avoided_writes == 0
+
+
+def test_input_records_are_not_modified():
+    original = [dict(record) for record in RECORDS]
+    coalesce_records(RECORDS, "codigo", COALESCE_MERGE_NON_NULL)
+    assert RECORDS == original
+
+
+def test_feeding_several_chunks_coalesces_across_them():
+    coalescer = RecordCoalescer("codigo", COALESCE_MERGE_NON_NULL)
+    coalescer.feed(RECORDS[:2], [10, 11])
+    coalescer.feed([RECORDS[2], {"codigo": 2, "nome": None, "email": "eva@x.com"}], [12, 13])
+    records, rows = coalescer.result()
+    assert records == [
+        {"codigo": 1, "nome": "Ana Maria", "email": "ana@x.com"},
+        {"codigo": 2, "nome": "Eva", "email": "eva@x.com"},
+    ]
+    assert rows == [12, 13]
+    assert coalescer.stats.avoided_writes == 2
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="desconhecida"):
+        RecordCoalescer("codigo", "first")
@@ -0,0 +1,79 @@
+import datetime
+
+from openpyxl import Workbook
+import pandas as pd
+import pytest
+
+from src.excel.reader import ExcelReader
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Dados"
+    sheet.append(["Relatório"])
+    sheet.append([])
+    sheet.append(["id", "nome", "nome", None, "valor", "data"])
+    sheet.append([1, "Ana ", "x", None, 1.5, datetime.datetime(2024, 1, 2)])
+    sheet.append([])
+    sheet.append([2.0, "NA", "y", "z", None, None])
+    sheet.append([3, "#N/A", "", None, "2", None])
+    sheet.append([4, "Eva", None, None, 7, None])
+    path = tmp_path / "dados.xlsx"
+    workbook.save(path)
+    return path
+
+
+def streamed(reader: ExcelReader, chunk_rows: int, **kwargs) -> pd.DataFrame:
+    return pd.concat(list(reader.iter_dataframe("Dados", 3, chunk_rows, **kwargs)))
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"col_start": 2, "col_end": 5}, {"data_end_row": 6}])
+def test_streamed_chunks_match_read_dataframe(workbook_path, kwargs):
+    cached = ExcelReader(workbook_path)
+    cached.cache_workbook(["Dados"])
+    expected = cached._read_dataframe("Dados", 3, **kwargs)
+    chunks = list(ExcelReader(workbook_path).iter_dataframe("Dados", 3, 2, **kwargs))
+    result = pd.concat(chunks)
+    assert all(len(chunk.index) <= 2 for chunk in chunks)
+    assert list(result.columns) == list(expected.columns)
+    assert result.where(result.notna(), None).values.tolist() == expected.where(expected.notna(), None).values.tolist()
+
+
+def test_streamed_chunks_are_indexed_by_excel_row(workbook_path):
+    result = streamed(ExcelReader(workbook_path), 3)
+    assert result.index.tolist() == [4, 6, 7, 8]
+    assert result["nome"].tolist() == ["Ana ", None, None, "Eva"]
+
+
+def test_data_start_row_skips_by_excel_row(workbook_path):
+    result = streamed(ExcelReader(workbook_path), 10, data_start_row=7)
+    assert result.index.tolist() == [7, 8]
+
+
+def test_cached_sheet_is_sliced(workbook_path):
+    reader = ExcelReader(workbook_path)
+    reader.cache_workbook(["Dados"])
+    result = streamed(reader, 3)
+    assert result.index.tolist() == [4, 6, 7, 8]
+    assert result["id"].tolist() == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("data_start_row", [None, 5, 7, 8])
+def test_data_start_row_is_an_excel_row_in_every_path(workbook_path, data_start_row):
+    cached = ExcelReader(workbook_path)
+    cached.cache_workbook(["Dados"])
+    from_cache = streamed(cached, 3, data_start_row=data_start_row)
+    from_stream = streamed(ExcelReader(workbook_path), 3, data_start_row=data_start_row)
+    from_file = ExcelReader(workbook_path)._read_dataframe("Dados", 3, data_start_row=data_start_row)
+    for result in (from_cache, from_file):
+        assert result.index.tolist() == from_stream.index.tolist()
+        assert result["id"].tolist() == from_stream["id"].tolist()
+
+
+def test_empty_range_yields_one_empty_frame(workbook_path):
+    chunks = list(ExcelReader(workbook_path).iter_dataframe("Dados", 3, 10, data_end_row=3))
+    assert len(chunks) == 1
+    assert chunks[0].empty
+    assert "nome" in chunks[0].columns
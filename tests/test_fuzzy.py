@@ -0,0 +1,54 @@
+import pytest
+
+from src.core.fuzzy import FUZZY_MIN_SIMILARITY, TrigramIndex, trigrams
+
+CITIES = [(1, "São Paulo"), (2, "Paulista"), (3, "Paulistana"), (4, "Rio de Janeiro"), (5, "Pauliceia")]
+
+
+def test_trigrams_pad_words_like_pg_trgm():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("a-b") == {"  a", " a ", "  b", " b "}
+    assert trigrams("") == set()
+
+
+def test_trigrams_ignore_case_and_accents():
+    assert trigrams("SÃO PAULO") == trigrams("sao paulo")
+    assert trigrams("Ação") == trigrams("acao")
+
+
+def test_best_matches_ranks_by_similarity():
+    matches = TrigramIndex(CITIES).best_matches("Paulista", threshold=0.0)
+    # Best first, cut at FUZZY_MAX_CANDIDATES: "São Paulo" shares fewer trigrams and is left out.
+    assert [match.label for match in matches] == ["Paulista", "Paulistana", "Pauliceia"]
+    assert matches[0].score == 1.0
+    assert matches[0].score > matches[1].score > matches[2].score
+    assert TrigramIndex(CITIES).best_matches("Paulista", limit=1)[0].ident == 2
+
+
+def test_best_matches_applies_the_threshold():
+    index = TrigramIndex(CITIES)
+    scores = {match.label: match.score for match in index.best_matches("Paulista", limit=10, threshold=0.0)}
+    assert scores["Pauliceia"] < FUZZY_MIN_SIMILARITY
+    assert "Pauliceia" not in [match.label for match in index.best_matches("Paulista", limit=10)]
+    cutoff = scores["Paulistana"]
+    assert [match.label for match in index.best_matches("Paulista", limit=10, threshold=cutoff)] == [
+        "Paulista",
+        "Paulistana",
+    ]
+    assert index.best_matches("Belo Horizonte") == []
+
+
+def test_accented_query_matches_unaccented_label():
+    match = TrigramIndex(CITIES).best_matches("sao paulo")[0]
+    assert (match.label, match.ident, match.score) == ("São Paulo", 1, 1.0)
+
+
+@pytest.mark.parametrize("label", [None, "", "  ", "--"])
+def test_index_skips_labels_without_trigrams(label):
+    assert len(TrigramIndex([(1, label), (2, "Livros")])) == 1
+
+
+def test_index_keeps_the_first_of_labels_differing_only_in_case():
+    index = TrigramIndex([(1, "Livros "), (2, "LIVROS"), (3, "Jogos")])
+    assert len(index) == 2
+    assert index.best_matches("livros")[0].ident == 1
@@ -0,0 +1,52 @@
+from src.core.key_map import GeneratedKeyMap, find_key_map
+
+SOURCE = "localhost:5432/loja"
+
+
+def make_map(**options) -> GeneratedKeyMap:
+    return GeneratedKeyMap(
+        "categoria",
+        "id",
+        [2, 3, 5],
+        [10, 11, 12],
+        [{"nome": " Livros ", "sigla": "LV"}, {"nome": "Jogos", "sigla": None}, {"nome": "livros", "sigla": "LI"}],
+        **options,
+    )
+
+
+def test_csv_round_trip(tmp_path):
+    original = make_map(source=SOURCE, exclusive=True)
+    loaded = GeneratedKeyMap.read_csv(original.write_csv(tmp_path / "chaves.csv"))
+    assert (loaded.table, loaded.primary_key) == ("categoria", "id")
+    assert loaded.rows == [2, 3, 5]
+    # Read as text: the file does not keep the key type.
+    assert loaded.keys == ["10", "11", "12"]
+    assert loaded.records[1] == {"nome": "Jogos", "sigla": None}
+    assert (loaded.source, loaded.exclusive) == (SOURCE, True)
+
+
+def test_read_csv_without_origin_columns_is_untagged(tmp_path):
+    path = tmp_path / "chaves.csv"
+    path.write_text("linha_excel,categoria.id,nome\n2,10,Livros\n", encoding="utf-8")
+    loaded = GeneratedKeyMap.read_csv(path)
+    assert loaded.records == [{"nome": "Livros"}]
+    assert (loaded.source, loaded.exclusive) == (None, False)
+
+
+def test_lookup_dict_normalizes_labels_and_reports_duplicates():
+    values, duplicates = make_map().lookup_dict("nome")
+    assert values["jogos"] == 11
+    assert values["livros"] == 10
+    assert [label.strip().lower() for label in duplicates] == ["livros"]
+
+
+def test_find_key_map_requires_same_database_and_exclusive_table():
+    key = ("categoria", "id")
+    exclusive = {key: make_map(source=SOURCE, exclusive=True)}
+    assert find_key_map(exclusive, *key, "nome", SOURCE) is exclusive[key]
+    assert find_key_map(exclusive, *key, "descricao", SOURCE) is None
+    assert find_key_map(exclusive, *key, "nome", "localhost:5432/outra") is None
+    assert find_key_map(exclusive, *key, "nome", None) is None
+    # Rows already in the table may share a label with the mapped ones.
+    shared = {key: make_map(source=SOURCE)}
+    assert find_key_map(shared, *key, "nome", SOURCE) is None
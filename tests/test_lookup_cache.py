@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+import time
+
+import pytest
+
+from src.db.lookup_cache import (
+    STATS_TTL_SECONDS,
+    VALIDATE_STATS,
+    VALIDATE_TTL,
+    VALIDATE_XMIN,
+    XMIN_MAX_ROWS,
+    LookupCache,
+    LookupCacheEntry,
+)
+
+CATEGORY = ("categoria", "id", "nome")
+
+
+class FakeProvider:
+    def __init__(self, database: str = "loja", estimated_rows: float = -1.0) -> None:
+        self.engine = SimpleNamespace(url=SimpleNamespace(host="localhost", port=5432, database=database))
+        self.estimated_rows = estimated_rows
+
+    def get_table_metadata(self, table, schema="public"):
+        return SimpleNamespace(estimated_rows=self.estimated_rows)
+
+
+def make_cache(tmp_path, validation=VALIDATE_TTL, provider=None, signature="s1", **kwargs) -> LookupCache:
+    cache = LookupCache(provider or FakeProvider(), tmp_path, validation=validation, **kwargs)
+    cache.signature = lambda table, validation=None: None if cache.validation == VALIDATE_TTL else signature
+    return cache
+
+
+def entry(values, signature="s1", age=0.0, complete=False) -> LookupCacheEntry:
+    return LookupCacheEntry(signature=signature, saved_at=time.time() - age, values=values, complete=complete)
+
+
+def test_entry_covers_only_labels_it_found():
+    cached = entry({"livros": 1, "jogos": 2}, complete=True)
+    assert cached.covers({"livros"})
+    # Not found before is not "absent": the label may have been inserted since.
+    assert not cached.covers({"livros", "revista"})
+    assert cached.unresolved({"livros", "revista"}) == {"revista"}
+
+
+def test_store_and_load_round_trip(tmp_path):
+    cache = make_cache(tmp_path, VALIDATE_STATS)
+    cache.store(CATEGORY, True, entry({"livros": 1}))
+    loaded, signature = cache.load(CATEGORY, True)
+    assert loaded is not None and loaded.values == {"livros": 1}
+    assert signature == "s1"
+    assert cache.load(CATEGORY, False)[0] is None
+
+
+def test_load_misses_changed_signature(tmp_path):
+    make_cache(tmp_path, VALIDATE_STATS).store(CATEGORY, True, entry({"livros": 1}))
+    loaded, signature = make_cache(tmp_path, VALIDATE_STATS, signature="s2").load(CATEGORY, True)
+    assert loaded is None
+    assert signature == "s2"
+
+
+@pytest.mark.parametrize(
+    "validation, age, hit",
+    [
+        (VALIDATE_TTL, STATS_TTL_SECONDS + 60, True),
+        (VALIDATE_TTL, 25 * 3600, False),
+        # Stats counters lag, so those entries expire much sooner whatever ttl_seconds says.
+        (VALIDATE_STATS, STATS_TTL_SECONDS - 60, True),
+        (VALIDATE_STATS, STATS_TTL_SECONDS + 60, False),
+    ],
+)
+def test_load_expires_by_ttl(tmp_path, validation, age, hit):
+    cache = make_cache(tmp_path, validation)
+    cache.store(CATEGORY, True, entry({"livros": 1}, signature=None if validation == VALIDATE_TTL else "s1", age=age))
+    assert (cache.load(CATEGORY, True)[0] is not None) is hit
+
+
+def test_xmin_only_for_small_tables(tmp_path):
+    assert make_cache(tmp_path, VALIDATE_XMIN, FakeProvider(estimated_rows=10)).validation_for("t") == VALIDATE_XMIN
+    large = FakeProvider(estimated_rows=XMIN_MAX_ROWS + 1)
+    assert make_cache(tmp_path, VALIDATE_XMIN, large).validation_for("t") == VALIDATE_STATS
+    assert make_cache(tmp_path, VALIDATE_XMIN, FakeProvider()).validation_for("t") == VALIDATE_STATS
+
+
+def test_invalidate_drops_every_entry_of_the_table_only(tmp_path):
+    cache = make_cache(tmp_path)
+    other_db = make_cache(tmp_path, provider=FakeProvider(database="outra"))
+    cache.store(CATEGORY, True, entry({"livros": 1}))
+    cache.store(("categoria", "codigo", "sigla"), False, entry({"lv": 1}))
+    cache.store(("autor", "id", "nome"), True, entry({"ana": 1}))
+    other_db.store(CATEGORY, True, entry({"livros": 7}))
+    cache.invalidate("categoria")
+    assert cache.load(CATEGORY, True)[0] is None
+    assert cache.load(("categoria", "codigo", "sigla"), False)[0] is None
+    assert cache.load(("autor", "id", "nome"), True)[0] is not None
+    assert other_db.load(CATEGORY, True)[0] is not None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.store(CATEGORY, True, entry({"livros": 1}))
+    next(tmp_path.glob("*.pickle")).write_bytes(b"not a pickle")
+    assert cache.load(CATEGORY, True)[0] is None
@@ -0,0 +1,35 @@
+from contextlib import nullcontext
+
+from src.db import metadata
+from src.db.metadata import SchemaMetadataCache, TableMetadata
+
+
+class FakeEngine:
+    def connect(self):
+        return nullcontext(object())
+
+
+def test_missing_table_reloads_only_when_the_schema_changed(monkeypatch):
+    signatures = iter(["v1", "v1", "v2"])
+    loads = []
+    monkeypatch.setattr(metadata, "schema_signature", lambda conn, schema: next(signatures))
+
+    def load(conn, schema):
+        loads.append(schema)
+        tables = {"clientes": TableMetadata(schema=schema, name="clientes", oid=1, estimated_rows=10.0)}
+        if len(loads) > 1:
+            tables["pedidos"] = TableMetadata(schema=schema, name="pedidos", oid=2, estimated_rows=0.0)
+        return metadata.SchemaMetadata(schema, tables, f"v{len(loads)}", 0.0, 0.0)
+
+    monkeypatch.setattr(metadata, "load_schema_metadata", load)
+    cache = SchemaMetadataCache(FakeEngine(), ddl_check_interval=3600)
+    assert cache.table("clientes") is not None
+    # Unchanged fingerprint: no reload, and the miss is remembered without another check.
+    assert cache.table("outra") is None
+    assert cache.table("outra") is None
+    assert cache.table("pedidos") is None
+    assert loads == ["public"]
+    # "pedidos" was created meanwhile: the fingerprint changed, so the schema is reloaded.
+    assert cache.table("itens") is None
+    assert loads == ["public", "public"]
+    assert cache.table("pedidos") is not None
@@ -0,0 +1,125 @@
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pytest
+
+from src.core import multi_table
+from src.core.coalesce import COALESCE_LAST
+from src.core.mapping import ForeignKeyLookup, MappingSelection
+from src.core.multi_table import MultiTableJob, PreparedTable
+from src.db.lookup_cache import VALIDATE_TTL, LookupCache, LookupCacheEntry
+from src.db.provider import RejectedRow, RowRejectionError
+
+
+def make_selection(table: str, operation: str = "INSERT", **options) -> MappingSelection:
+    return MappingSelection(
+        sheet_name="Dados",
+        table_name=table,
+        header_row=1,
+        data_start_row=None,
+        data_end_row=None,
+        start_column=None,
+        end_column=None,
+        column_mapping=[("Codigo", "codigo"), ("Nome", "nome")],
+        default_values={},
+        operation=operation,
+        join_column="codigo" if operation == "UPDATE" else None,
+        primary_key=None,
+        autogenerate_pk=False,
+        fk_lookups=options.pop("fk_lookups", []),
+        trim_whitespace=False,
+        remove_duplicate_rows=False,
+        duplicate_check_column=None,
+        similarity_replacements={},
+        split_column=None,
+        split_operator=None,
+        split_length=None,
+        split_extra_column=None,
+        **options,
+    )
+
+
+class FakeProvider:
+    def __init__(self) -> None:
+        self.writes: List[Dict[str, object]] = []
+        self.engine = SimpleNamespace(url=SimpleNamespace(host="localhost", port=5432, database="loja"))
+
+    def get_table_metadata(self, table, schema="public"):
+        return None
+
+    def max_parallelism(self) -> int:
+        return 1
+
+    def execute_insert(self, table, records, schema="public", **options):
+        self.writes.append({"records": list(records), **options})
+        if options.get("isolate_errors"):
+            rejected = RejectedRow(0, options["row_numbers"][0], dict(records[0]), "erro")
+            raise RowRejectionError([rejected], len(records) - 1)
+        return len(records)
+
+    def execute_update(self, table, records, join_column, schema="public", **options):
+        self.writes.append({"records": list(records), **options})
+        return len(records)
+
+
+def run(provider: FakeProvider, selection: MappingSelection, records, rows):
+    job = MultiTableJob(provider, [selection])
+    job.write_level([PreparedTable(selection, records, rows)])
+    return job.report.results[0]
+
+
+def test_batch_insert_skips_existing_keys(monkeypatch):
+    monkeypatch.setattr(multi_table, "find_new_rows", lambda provider, table, records, keys, schema: [1])
+    provider = FakeProvider()
+    records = [{"codigo": 1, "nome": "Ana"}, {"codigo": 2, "nome": "Eva"}]
+    result = run(provider, make_selection("clientes", skip_existing_key="codigo"), records, [2, 3])
+    assert provider.writes[0]["records"] == [{"codigo": 2, "nome": "Eva"}]
+    assert provider.writes[0]["row_numbers"] == [3]
+    assert (result.affected, result.skipped_existing) == (1, 1)
+
+
+def test_batch_update_coalesces_repeated_keys():
+    provider = FakeProvider()
+    records = [{"codigo": 1, "nome": "Ana"}, {"codigo": 1, "nome": "Ana Maria"}]
+    result = run(provider, make_selection("clientes", "UPDATE", coalesce_policy=COALESCE_LAST), records, [2, 3])
+    assert provider.writes[0]["records"] == [{"codigo": 1, "nome": "Ana Maria"}]
+    assert provider.writes[0]["row_numbers"] == [3]
+    assert result.avoided_writes == 1
+
+
+def test_batch_insert_reports_isolated_rows():
+    provider = FakeProvider()
+    records = [{"codigo": 1, "nome": "Ana"}, {"codigo": 2, "nome": "Eva"}]
+    result = run(provider, make_selection("clientes", isolate_errors=True), records, [2, 3])
+    assert provider.writes[0]["isolate_errors"] is True
+    assert result.error is None
+    assert result.affected == 1
+    assert [row.row for row in result.rejected] == [2]
+
+
+def test_batch_refuses_server_side_validation():
+    with pytest.raises(ValueError, match="Validação no servidor"):
+        MultiTableJob(FakeProvider(), [make_selection("clientes", server_side_validation=True)])
+
+
+def test_next_level_lookups_see_rows_written_by_the_previous_level(tmp_path):
+    provider = FakeProvider()
+    cache = LookupCache(provider, tmp_path, validation=VALIDATE_TTL)
+    key = ("categoria", "id", "nome")
+    # Saved before the batch: "Revista" is not there yet.
+    cache.store(key, True, LookupCacheEntry(None, time.time(), {"livros": 1}, complete=True))
+    categorias = make_selection("categoria")
+    produtos = make_selection("produto", fk_lookups=[ForeignKeyLookup("categoria_id", "Categoria", *key)])
+    job = MultiTableJob(provider, [produtos, categorias], lookup_cache=cache)
+    seen = {}
+
+    def build_records(selection, key_maps):
+        seen[selection.table_name] = cache.load(key, True)[0]
+        return [{"codigo": 1, "nome": "Revista"}], [2]
+
+    assert job.run(build_records).ok
+    assert [level[0].table_name for level in job.levels] == ["categoria", "produto"]
+    assert seen["categoria"] is not None
+    # The entry saved before "categoria" was written must not answer the lookups of "produto".
+    assert seen["produto"] is None
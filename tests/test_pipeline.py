@@ -0,0 +1,232 @@
+from typing import Dict, List, Set
+
+import pandas as pd
+import pytest
+
+from src.core.lookups import UnresolvedForeignKeyError
+from src.core.mapping import ForeignKeyLookup
+from src.core.pipeline import (
+    ApplyDefaults,
+    Chunk,
+    DropColumns,
+    DropDuplicates,
+    ImportPipeline,
+    MapColumns,
+    ResolveForeignKeys,
+    SplitByLength,
+    Stage,
+    ValidateLengths,
+)
+
+CATEGORY = ("categoria", "id", "nome")
+
+
+def make_chunk(data: Dict[str, List[object]], first_row: int = 2) -> Chunk:
+    frame = pd.DataFrame(data, dtype=object)
+    frame.index = range(first_row, first_row + len(frame.index))
+    return Chunk(frame, list(frame.index))
+
+
+def mapped_chunk(values: List[object], first_row: int = 2) -> Chunk:
+    chunk = make_chunk({"cat": values}, first_row)
+    chunk.records = [{} for _ in values]
+    return chunk
+
+
+def category_lookup(create_missing: bool = False) -> ForeignKeyLookup:
+    return ForeignKeyLookup("categoria_id", "cat", *CATEGORY, create_missing=create_missing)
+
+
+class FakeResolver:
+    def __init__(self, labels: Dict[str, object]) -> None:
+        self.labels = labels
+        self.calls: List[Set[str]] = []
+
+    def __call__(self, wanted):
+        assert set(wanted) == {CATEGORY}
+        self.calls.append(set(wanted[CATEGORY]))
+        return {CATEGORY: {label: self.labels[label] for label in wanted[CATEGORY] if label in self.labels}}
+
+
+def test_stage_is_abstract():
+    with pytest.raises(TypeError):
+        Stage()
+
+
+def test_drop_duplicates_across_chunks():
+    stage = DropDuplicates("nome")
+    first = stage.process(make_chunk({"nome": ["Ana", "Bruno", " ana "]}, first_row=2))
+    second = stage.process(make_chunk({"nome": ["BRUNO", "Carla", "Ána"]}, first_row=5))
+    assert first.rows == [2, 3]
+    assert second.rows == [6]
+    assert second.frame["nome"].tolist() == ["Carla"]
+    assert (stage.total, stage.kept) == (6, 3)
+
+
+def test_drop_duplicates_missing_column():
+    with pytest.raises(ValueError):
+        DropDuplicates("outra").process(make_chunk({"nome": ["Ana"]}))
+
+
+def test_split_by_length_moves_long_values():
+    stage = SplitByLength("nome", "gt", 3, "extra_1", trim_whitespace=True)
+    chunk = stage.process(make_chunk({"nome": ["Ana ", "Bruno", None]}))
+    assert chunk.frame["nome"].tolist() == ["Ana ", None, None]
+    assert chunk.frame["extra_1"].tolist() == [None, "Bruno", None]
+
+
+def test_split_by_length_renames_colliding_column_once():
+    names = iter(["extra_2", "extra_3"])
+    stage = SplitByLength("nome", "lt", 4, "extra_1", rename=lambda: next(names))
+    stage.process(make_chunk({"nome": ["Ana", "Bruno"], "extra_1": ["x", "y"]}))
+    chunk = stage.process(make_chunk({"nome": ["Eva"], "extra_1": ["z"]}, first_row=4))
+    assert stage.extra_column == "extra_2"
+    assert chunk.frame["extra_2"].tolist() == ["Eva"]
+    assert chunk.frame["extra_1"].tolist() == ["z"]
+
+
+def test_map_columns_skips_empty_rows_and_keeps_excel_rows():
+    stage = MapColumns([("Nome", "nome"), ("Idade", "idade")], lambda value: None if pd.isna(value) else value)
+    chunk = stage.process(make_chunk({"Nome": ["Ana", " ", None, "Eva"], "Idade": [30, None, None, None]}, 10))
+    assert chunk.records == [{"nome": "Ana", "idade": 30}, {"nome": "Eva", "idade": None}]
+    assert chunk.rows == [10, 13]
+    assert stage.skipped_rows == 2
+
+
+def test_map_columns_reports_missing_columns():
+    stage = MapColumns([("Nome", "nome")], lambda value: value, extra_columns=["Categoria"])
+    with pytest.raises(ValueError, match="Categoria"):
+        stage.process(make_chunk({"Nome": ["Ana"]}))
+
+
+def test_defaults_and_drop_columns():
+    chunk = mapped_chunk(["a", "b"])
+    chunk.records = [{"id": 1, "ativo": False}, {"id": 2}]
+    chunk = ApplyDefaults({"ativo": True}).process(chunk)
+    chunk = DropColumns(["id"]).process(chunk)
+    assert chunk.records == [{"ativo": False}, {"ativo": True}]
+
+
+def test_resolve_foreign_keys_requests_each_label_once():
+    resolver = FakeResolver({"livros": 1, "jogos": 2})
+    stage = ResolveForeignKeys([category_lookup()], resolver)
+    first = stage.process(mapped_chunk(["Livros", "jogos "]))
+    second = stage.process(mapped_chunk(["LIVROS", "Jogos"], first_row=4))
+    stage.finish()
+    assert [record["categoria_id"] for record in first.records + second.records] == [1, 2, 1, 2]
+    assert resolver.calls == [{"livros", "jogos"}]
+
+
+def test_resolve_foreign_keys_applies_conversions():
+    stage = ResolveForeignKeys([category_lookup()], FakeResolver({"livros": 1}), {"cat": {"Livro": "Livros"}})
+    chunk = stage.process(mapped_chunk(["Livro"]))
+    assert chunk.records == [{"categoria_id": 1}]
+
+
+def test_resolve_foreign_keys_raises_unresolved_in_finish():
+    stage = ResolveForeignKeys([category_lookup()], FakeResolver({"livros": 1}))
+    stage.process(mapped_chunk(["Livros", "Revista"]))
+    stage.process(mapped_chunk([None], first_row=4))
+    with pytest.raises(UnresolvedForeignKeyError) as excinfo:
+        stage.finish()
+    message = str(excinfo.value)
+    assert "Linha 3: valor 'Revista'" in message
+    assert "Linha 4 coluna 'cat' vazia" in message
+    assert excinfo.value.missing == {("cat", *CATEGORY): {"Revista": "Revista"}}
+
+
+def test_resolve_foreign_keys_fail_fast_raises_with_the_chunk():
+    stage = ResolveForeignKeys([category_lookup()], FakeResolver({}), fail_fast=True)
+    with pytest.raises(UnresolvedForeignKeyError):
+        stage.process(mapped_chunk(["Revista"]))
+
+
+def test_resolve_foreign_keys_creates_missing_labels():
+    created: List[List[str]] = []
+
+    def create(fk, labels):
+        created.append(labels)
+        # "Jornal" was created meanwhile by another importer: its pair comes back, but not as inserted.
+        return [(10 + idx, label) for idx, label in enumerate(labels)], int(labels != ["Jornal"])
+
+    stage = ResolveForeignKeys(
+        [category_lookup(create_missing=True)], FakeResolver({"livros": 1}), create_labels=create
+    )
+    first = stage.process(mapped_chunk(["Livros", "Revista ", "revista"]))
+    second = stage.process(mapped_chunk(["Revista", "Jornal"], first_row=5))
+    assert created == []
+    stage.finish()
+    # One insert for the whole stream; the records already yielded get the ids afterwards.
+    assert created == [["Revista", "Jornal"]]
+    assert [record["categoria_id"] for record in first.records + second.records] == [1, 10, 10, 10, 11]
+    assert stage.created == {"categoria.nome": 1}
+
+
+def test_resolve_foreign_keys_creates_nothing_when_other_labels_are_unresolved():
+    created: List[List[str]] = []
+    lookups = [category_lookup(create_missing=True), ForeignKeyLookup("autor_id", "autor", "autor", "id", "nome")]
+    stage = ResolveForeignKeys(
+        lookups,
+        lambda wanted: {key: {} for key in wanted},
+        create_labels=lambda fk, labels: created.append(labels) or ([], 0),
+    )
+    chunk = make_chunk({"cat": ["Revista"], "autor": ["Ana"]})
+    chunk.records = [{}]
+    stage.process(chunk)
+    with pytest.raises(UnresolvedForeignKeyError):
+        stage.finish()
+    assert created == []
+
+
+def test_resolve_foreign_keys_without_resolver_keeps_descriptions():
+    stage = ResolveForeignKeys([category_lookup()], None, {"cat": {"Livro": "Livros"}})
+    chunk = stage.process(mapped_chunk(["Livro", " ", "Jogos"]))
+    assert [record["categoria_id"] for record in chunk.records] == ["Livros", None, "Jogos"]
+
+
+def test_validate_lengths_collects_across_chunks():
+    stage = ValidateLengths({"nome": 3})
+    stage.check([{"nome": "Ana"}, {"nome": "Bruno"}], [2, 3])
+    stage.check([{"nome": None}, {"nome": "Carla"}], [4, 5])
+    with pytest.raises(ValueError) as excinfo:
+        stage.finish()
+    message = str(excinfo.value)
+    assert "Linha 3 coluna 'nome': 5 > 3" in message
+    assert "Linha 5 coluna 'nome'" in message
+
+
+def test_validate_lengths_passes():
+    stage = ValidateLengths({"nome": 5})
+    stage.check([{"nome": "Bruno"}, {"outra": "muito longa"}], [2, 3])
+    stage.finish()
+
+
+def test_pipeline_streams_chunks_and_runs_finish_after_last():
+    source = [
+        make_chunk({"Nome": ["Ana", "Bruno"], "Cat": ["Livros", "Revista"]}, 2),
+        make_chunk({"Nome": ["ana", "Eva"], "Cat": ["Livros", "Livros"]}, 4),
+    ]
+    pipeline = ImportPipeline(
+        source,
+        [
+            DropDuplicates("Nome"),
+            MapColumns([("Nome", "nome")], lambda value: value, ["Cat"]),
+            ResolveForeignKeys(
+                [ForeignKeyLookup("categoria_id", "Cat", *CATEGORY)], FakeResolver({"livros": 1, "revista": 2})
+            ),
+        ],
+    )
+    records, rows = pipeline.run()
+    assert records == [
+        {"nome": "Ana", "categoria_id": 1},
+        {"nome": "Bruno", "categoria_id": 2},
+        {"nome": "Eva", "categoria_id": 1},
+    ]
+    assert rows == [2, 3, 5]
+    assert set(pipeline.timings) == {"DropDuplicates", "MapColumns", "ResolveForeignKeys"}
+
+
+def test_pipeline_cancel_checker_stops_before_next_chunk():
+    pipeline = ImportPipeline([make_chunk({"Nome": ["Ana"]})], [], cancel_checker=lambda: True)
+    with pytest.raises(RuntimeError, match="cancelada"):
+        pipeline.run()
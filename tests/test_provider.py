@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+from decimal import Decimal
+
+from src.core.lookups import normalize_lookup_key
+from src.db.provider import DatabaseProvider, lookup_key_sql, lookup_label_params, partition_key_text
+
+
+def test_partition_key_text_matches_values_the_database_compares_equal():
+    assert len({partition_key_text(value) for value in (5, "5", 5.0, Decimal("5.00"), " 5 ")}) == 1
+    assert partition_key_text("Abc ") == partition_key_text("abc")
+    assert partition_key_text(None) == ""
+    assert partition_key_text("NaN") != partition_key_text(None)
+    assert partition_key_text(5) != partition_key_text(50)
+
+
+def test_partition_by_key_keeps_equal_keys_together():
+    provider = DatabaseProvider()
+    records = [{"id": value, "uf": uf} for value, uf in [(1, "SP"), ("1", "sp"), (2, "RJ"), (1.0, "SP ")]]
+    partitions = provider._partition_by_key(records, ["id", "uf"], 4)
+    assert sorted(idx for part in partitions for idx in part) == [0, 1, 2, 3]
+    assert any({0, 1, 3} <= set(part) for part in partitions)
+
+
+def test_lookup_keys_fold_like_the_server():
+    # lower(btrim(label, ' \t\n\r\xa0')) on the server; casefold() would send 'strasse'.
+    assert normalize_lookup_key(" STRAẞE\xa0") == "straße"
+    assert normalize_lookup_key("Straße") == "straße"
+    assert normalize_lookup_key("x\u2003") == "x\u2003"
+    assert lookup_label_params(["straße", "", "straße", "água"]) == [["straße", "água"]]
+
+
+class FakeResult(list):
+    def all(self):
+        return list(self)
+
+
+class FakeConnection:
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append((sql, params))
+        if sql.startswith("INSERT"):
+            taken = {normalize_lookup_key(label) for _, label in self.existing}
+            new = [label for label in params["labels"] if normalize_lookup_key(label) not in taken]
+            return FakeResult((10 + idx, label) for idx, label in enumerate(new))
+        if sql.startswith("SELECT id AS id"):
+            return FakeResult(row for row in self.existing if normalize_lookup_key(row[1]) in params["labels"])
+        return FakeResult()
+
+
+def test_insert_lookup_labels_matches_existing_rows_like_the_lookups(monkeypatch):
+    provider = DatabaseProvider()
+    conn = FakeConnection([(1, " Livros")])
+    provider.engine = object()
+    monkeypatch.setattr(provider, "generated_key_spec", lambda *args: None)
+    monkeypatch.setattr(provider, "get_table_metadata", lambda *args: None)
+
+    @contextmanager
+    def transaction():
+        yield conn
+
+    monkeypatch.setattr(provider, "_write_transaction", transaction)
+    created = provider.insert_lookup_labels("categoria", "id", "nome", ["livros", "Jogos", "JOGOS "])
+    assert created.pairs == [(10, "Jogos"), (1, " Livros")]
+    assert created.inserted == 1
+    insert_sql = next(sql for sql, _ in conn.statements if sql.startswith("INSERT"))
+    assert f"{lookup_key_sql('t.nome')} = {lookup_key_sql('l.label')}" in insert_sql
+    select_sql, params = conn.statements[-1]
+    assert lookup_key_sql("nome") in select_sql
+    assert params == {"labels": ["livros"]}